@@ -1,4 +1,4 @@
-from google.adk.agents import SequentialAgent
+from google.adk.agents import SequentialAgent, ParallelAgent
 
 # Import sub-agents
 from .subagents.LabParser.agent import lab_parser_agent
@@ -7,17 +7,30 @@ from .subagents.LabRiskScorer.agent import lab_risk_scorer_agent
 from .subagents.LabSummarizer.agent import lab_summary_agent
 from .subagents.LabAggregator.agent import lab_aggregator_agent
 
-# --- Root Sequential Orchestration Agent ---
+# --- Dependency graph ---
+#   lab_parser_agent ──┬── lab_analyzer_agent ────┬── lab_summary_agent ── lab_aggregator_agent
+#                      └── lab_risk_scorer_agent ─┘
+# Analysis and risk scoring both only need the parsed metrics, so they run concurrently;
+# every agent keeps its output_key, so the session state is the same as before.
+lab_assessment_agent = ParallelAgent(
+    name="lab_assessment_agent",
+    description="Runs lab analysis and risk scoring concurrently on the parsed lab data.",
+    sub_agents=[
+        lab_analyzer_agent,     # output_key: lab_analysis
+        lab_risk_scorer_agent,  # output_key: lab_risk_scores
+    ],
+)
+
+# --- Root Orchestration Agent ---
 lab_report_main_agent = SequentialAgent(
     name="lab_report_main_agent",
-    description="Executes a sequential workflow for complete lab report analysis: parsing, analysis, risk scoring, summarization, and final aggregation of all outputs.",
+    description="Executes the lab report analysis graph: parsing, then analysis and risk scoring in parallel, summarization, and final aggregation of all outputs.",
     sub_agents=[
         lab_parser_agent,
-        lab_analyzer_agent,
-        lab_risk_scorer_agent,
+        lab_assessment_agent,
         lab_summary_agent,
         lab_aggregator_agent,  # Final agent that aggregates all outputs
     ],
 )
 
-root_agent = lab_report_main_agent
\ No newline at end of file
+root_agent = lab_report_main_agent
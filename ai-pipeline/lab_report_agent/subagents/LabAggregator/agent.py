@@ -1,16 +1,57 @@
-from google.adk.agents import LlmAgent
+import json
+import logging
+from typing import AsyncGenerator, ClassVar, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
 from google.genai import types
+from pydantic import ValidationError
 
-from .prompt import LAB_AGGREGATOR_INSTRUCTION
 from lab_report_agent.models import FinalLabReport
 
-lab_aggregator_agent = LlmAgent(
+logger = logging.getLogger(__name__)
+
+
+class LabAggregatorAgent(BaseAgent):
+    """
+    Combines the sub-agent outputs already in session state into a FinalLabReport.
+    Purely a merge, so it runs in Python instead of costing another model call;
+    the result is validated against the schema before it is written.
+    """
+
+    # Session state keys written by the previous sub-agents (their output_key)
+    section_keys: ClassVar[Tuple[str, ...]] = ("raw_lab_data", "lab_analysis", "lab_risk_scores", "lab_summary")
+    output_key: ClassVar[str] = "final_lab_report"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        missing = [key for key in self.section_keys if state.get(key) is None]
+        try:
+            if missing:
+                raise ValueError(f"missing sub-agent outputs: {', '.join(missing)}")
+            report = FinalLabReport.model_validate({key: state.get(key) for key in self.section_keys})
+        except (ValueError, ValidationError) as e:
+            logger.warning(f"{self.name}: cannot build FinalLabReport: {e}")
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text=f"Lab report aggregation failed: {e}")]),
+            )
+            return
+
+        final_lab_report = report.model_dump()
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(final_lab_report))]),
+            actions=EventActions(state_delta={self.output_key: final_lab_report}),
+        )
+
+
+lab_aggregator_agent = LabAggregatorAgent(
     name="lab_aggregator_agent",
-    model="gemini-2.5-flash",
     description="Aggregates outputs from all previous lab report analysis sub-agents into a final comprehensive report.",
-    instruction=LAB_AGGREGATOR_INSTRUCTION,
-    generate_content_config=types.GenerateContentConfig(temperature=0.0),
-    output_schema=FinalLabReport,
-    output_key="final_lab_report",
 )
-
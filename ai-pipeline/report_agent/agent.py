@@ -1,4 +1,4 @@
-from google.adk.agents import SequentialAgent
+from google.adk.agents import SequentialAgent, ParallelAgent
 
 # Import sub-agents
 from report_agent.subagents.TimelineBuilder.agent import timeline_builder_agent
@@ -9,15 +9,43 @@ from report_agent.subagents.MedicationAggregator.agent import medication_aggrega
 from report_agent.subagents.PatientReportGenerator.agent import patient_report_generator_agent
 from report_agent.subagents.ReportAggregator.agent import report_aggregator_agent
 
-# --- Root Sequential Orchestration Agent ---
-# This agent orchestrates a sequential workflow that:
-# 1. Builds chronological timeline (with date-weighted conversation summaries)
-# 2. Analyzes clinical trends across multiple lab reports (prioritizing recent reports)
-# 3. Calculates risk scores and severity (using recent data)
-# 4. Infers possible conditions (based on symptoms, labs, medications)
-# 5. Aggregates medications (from prescriptions and conversations, prioritizing recent)
-# 6. Generates comprehensive patient health report
-# 7. Aggregates all outputs into final PatientHealthReport
+# --- Dependency graph ---
+# Stages that only read the patient records run together, and so do the two assessments
+# built on their outputs, so latency follows the critical path (4 steps instead of 7):
+#
+#   timeline_builder_agent ────────┐
+#   clinical_trend_analyzer_agent ─┼── risk_and_severity_agent ──┬── patient_report_generator_agent ── report_aggregator_agent
+#   medication_aggregator_agent ───┘   disease_inference_agent ──┘
+#
+# Sub-agents in a ParallelAgent do not see each other's output, only what came before
+# the group. Every agent keeps its output_key, so the session state is unchanged.
+
+# Step 1: Timeline, lab trends and medications from the records (date-weighted, recent first)
+record_analysis_agent = ParallelAgent(
+    name="record_analysis_agent",
+    description="Builds the timeline, clinical trends and medication overview concurrently from the patient records.",
+    sub_agents=[
+        timeline_builder_agent,          # output_key: timeline
+        clinical_trend_analyzer_agent,   # output_key: trend_commentary
+        medication_aggregator_agent,     # output_key: medication_overview
+    ],
+)
+
+# Step 2: Risk scores and possible conditions, both based on step 1
+risk_assessment_agent = ParallelAgent(
+    name="risk_assessment_agent",
+    description="Scores disease risks and infers possible conditions concurrently from the step 1 analyses.",
+    sub_agents=[
+        risk_and_severity_agent,         # output_key: risk_and_severity
+        disease_inference_agent,         # output_key: possible_conditions
+    ],
+)
+
+# --- Root Orchestration Agent ---
+# 1. Timeline, clinical trends and medications (parallel)
+# 2. Risk scores and possible conditions (parallel)
+# 3. Comprehensive patient health report
+# 4. Aggregate all outputs into the final PatientHealthReport
 report_builder_root_agent = SequentialAgent(
     name="report_builder_root_agent",
     description=(
@@ -27,14 +55,11 @@ report_builder_root_agent = SequentialAgent(
         "recent information and analyzing trends across time."
     ),
     sub_agents=[
-        timeline_builder_agent,          # Step 1: Build chronological timeline
-        clinical_trend_analyzer_agent,   # Step 2: Analyze lab trends across time
-        risk_and_severity_agent,         # Step 3: Calculate risk scores
-        disease_inference_agent,         # Step 4: Infer possible conditions
-        medication_aggregator_agent,     # Step 5: Aggregate medications
-        patient_report_generator_agent,  # Step 6: Generate comprehensive report
-        report_aggregator_agent,         # Step 7: Aggregate all outputs
+        record_analysis_agent,           # Step 1: Timeline, trends, medications
+        risk_assessment_agent,           # Step 2: Risks and conditions
+        patient_report_generator_agent,  # Step 3: Generate comprehensive report
+        report_aggregator_agent,         # Step 4: Aggregate all outputs
     ],
 )
 
-root_agent = report_builder_root_agent
\ No newline at end of file
+root_agent = report_builder_root_agent
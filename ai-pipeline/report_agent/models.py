@@ -19,8 +19,12 @@ class MetricTrend(BaseModel):
     metric: str                     # metric name (e.g., "Glucose")
     previous_value: Optional[float] = None
     current_value: Optional[float] = None
-    trend: str                     # increasing / decreasing / stable / improving
-    status: str                    # normal / abnormal_high / abnormal_low
+    delta: Optional[float] = None   # current_value - previous_value
+    slope: Optional[float] = None   # least-squares change per 30 days over all readings
+    unit: Optional[str] = None
+    readings: Optional[int] = None  # number of lab reports with this metric
+    trend: str                     # increasing / decreasing / stable / improving / new
+    status: str                    # normal / abnormal_high / abnormal_low / unknown
     clinical_comment: Optional[str] = None
 
 
@@ -29,6 +33,18 @@ class ClinicalTrends(BaseModel):
     overall_summary: Optional[str] = None
 
 
+# The agent only comments on the trends the backend computed (metric_trends); the
+# backend merges the comments into ClinicalTrends
+class TrendComment(BaseModel):
+    metric: str                     # metric name as given in metric_trends
+    clinical_comment: str
+
+
+class TrendCommentary(BaseModel):
+    comments: List[TrendComment] = []
+    overall_summary: Optional[str] = None
+
+
 # ---------- Risk Scoring and Severity output ----------
 class DiseaseRisk(BaseModel):
     disease: str                    # disease name (e.g., "Diabetes")
@@ -98,14 +114,14 @@ class FinalReport(BaseModel):
 # ---------- Final aggregated health report ----------
 # This schema aggregates outputs from all sub-agents:
 # - timeline: from timeline_builder_agent (output_key: "timeline")
-# - clinical_trends: from clinical_trend_analyzer_agent (output_key: "clinical_trends")
+# - trend_commentary: from clinical_trend_analyzer_agent (output_key: "trend_commentary")
 # - risk_and_severity: from risk_and_severity_agent (output_key: "risk_and_severity")
 # - possible_conditions: from disease_inference_agent (output_key: "possible_conditions")
 # - medication_overview: from medication_aggregator_agent (output_key: "medication_overview")
 # - final_report: from patient_report_generator_agent (output_key: "final_report")
 class PatientHealthReport(BaseModel):
     timeline: Timeline                          # Chronological medical events
-    clinical_trends: ClinicalTrends            # Lab metric trends and changes
+    trend_commentary: TrendCommentary          # Comments on the computed lab metric trends
     risk_and_severity: RiskAndSeverity          # Disease risks and severity assessment
     possible_conditions: PossibleConditions    # Inferred conditions with confidence
     medication_overview: MedicationOverview     # Current and past medications
@@ -1,16 +1,64 @@
+import json
+from typing import Any, Dict, List, Optional
+
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
 from google.genai import types
 
 from .prompt import CLINICAL_TREND_ANALYZER_INSTRUCTION
-from report_agent.models import ClinicalTrends
+from report_agent.models import TrendCommentary
+
+# The numbers are already in metric_trends; of each lab report the agent only needs
+# what gives the comments clinical context
+LAB_SUMMARY_FIELDS = ("report_date", "lab_summary_overview", "key_findings", "overall_risk", "severity")
+
+
+def _lab_summaries(lab_reports: Any) -> List[Dict[str, Any]]:
+    if isinstance(lab_reports, dict):
+        # Compacted input writes uniform lists as {"columns", "rows"}
+        columns = lab_reports.get("columns") or []
+        lab_reports = [dict(zip(columns, row)) for row in lab_reports.get("rows") or []]
+    if not isinstance(lab_reports, list):
+        return []
+    return [
+        {field: report[field] for field in LAB_SUMMARY_FIELDS if report.get(field) is not None}
+        for report in lab_reports if isinstance(report, dict)
+    ]
+
+
+def send_trend_inputs_only(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """
+    Replace the patient records in the request with metric_trends and the lab report
+    summaries, so the raw lab data, prescriptions and check-ins are not sent to the model.
+    """
+    user_content = callback_context.user_content
+    text = "".join(part.text or "" for part in user_content.parts or []) if user_content else ""
+    try:
+        records = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(records, dict):
+        return None
+
+    trend_inputs = {
+        "metric_trends": records.get("metric_trends") or [],
+        "lab_reports": _lab_summaries(records.get("lab_reports")),
+    }
+    if "format" in records:
+        trend_inputs = {"format": records["format"], **trend_inputs}
+    llm_request.contents = [types.Content(role="user", parts=[types.Part(text=json.dumps(trend_inputs))])]
+    return None
+
 
 clinical_trend_analyzer_agent = LlmAgent(
     name="clinical_trend_analyzer_agent",
     model="gemini-2.5-flash",
-    description="Analyzes lab reports to detect clinical trends, flag abnormalities, and summarize changes in patient metrics.",
+    description="Comments on the lab metric trends computed from the lab reports and summarizes the changes in patient metrics.",
     instruction=CLINICAL_TREND_ANALYZER_INSTRUCTION,
     generate_content_config=types.GenerateContentConfig(temperature=0.0),
-    output_schema=ClinicalTrends,
-    output_key="clinical_trends",
+    include_contents="none",
+    before_model_callback=send_trend_inputs_only,
+    output_schema=TrendCommentary,
+    output_key="trend_commentary",
 )
-
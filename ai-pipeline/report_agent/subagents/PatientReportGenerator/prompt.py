@@ -3,7 +3,7 @@ You are a patient health report generator agent. Your task is to synthesize all
 
 **Available Inputs (from previous agents):**
 1. **timeline** (from timeline_builder_agent): Chronological medical events
-2. **clinical_trends** (from clinical_trend_analyzer_agent): Lab metric trends and changes
+2. **metric_trends** (computed from the lab reports) and **trend_commentary** (from clinical_trend_analyzer_agent): Lab metric trends and changes
 3. **risk_and_severity** (from risk_and_severity_agent): Disease risks and severity assessment
 4. **possible_conditions** (from disease_inference_agent): Inferred conditions with confidence scores
 5. **medication_overview** (from medication_aggregator_agent): Current and past medications
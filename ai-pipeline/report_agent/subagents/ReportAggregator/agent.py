@@ -1,16 +1,64 @@
-from google.adk.agents import LlmAgent
+import json
+import logging
+from typing import AsyncGenerator, ClassVar, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
 from google.genai import types
+from pydantic import ValidationError
 
-from .prompt import REPORT_AGGREGATOR_INSTRUCTION
 from report_agent.models import PatientHealthReport
 
-report_aggregator_agent = LlmAgent(
+logger = logging.getLogger(__name__)
+
+
+class ReportAggregatorAgent(BaseAgent):
+    """
+    Combines the sub-agent outputs already in session state into a PatientHealthReport.
+    Purely a merge, so it runs in Python instead of costing another model call;
+    the result is validated against the schema before it is written.
+    """
+
+    # Session state keys written by the previous sub-agents (their output_key)
+    section_keys: ClassVar[Tuple[str, ...]] = (
+        "timeline",
+        "trend_commentary",
+        "risk_and_severity",
+        "possible_conditions",
+        "medication_overview",
+        "final_report",
+    )
+    output_key: ClassVar[str] = "patient_health_report"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        missing = [key for key in self.section_keys if state.get(key) is None]
+        try:
+            if missing:
+                raise ValueError(f"missing sub-agent outputs: {', '.join(missing)}")
+            report = PatientHealthReport.model_validate({key: state.get(key) for key in self.section_keys})
+        except (ValueError, ValidationError) as e:
+            logger.warning(f"{self.name}: cannot build PatientHealthReport: {e}")
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text=f"Report aggregation failed: {e}")]),
+            )
+            return
+
+        patient_health_report = report.model_dump()
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(patient_health_report))]),
+            actions=EventActions(state_delta={self.output_key: patient_health_report}),
+        )
+
+
+report_aggregator_agent = ReportAggregatorAgent(
     name="report_aggregator_agent",
-    model="gemini-2.5-flash",
     description="Aggregates outputs from all previous patient health report analysis sub-agents into a final comprehensive PatientHealthReport.",
-    instruction=REPORT_AGGREGATOR_INSTRUCTION,
-    generate_content_config=types.GenerateContentConfig(temperature=0.0),
-    output_schema=PatientHealthReport,
-    output_key="patient_health_report",
 )
-
@@ -0,0 +1,237 @@
+"""
+Local stand-in for the ADK API server, for load tests that must not spend Gemini quota.
+
+Implements the endpoints utils.adk_client uses (session create/delete, /run, /run_sse)
+and replays recorded responses per app (see benchmarks/recordings.py) after a simulated
+model latency, failing a configurable fraction of runs like an overloaded upstream.
+
+Run from the backend directory, then point the backend at it (ADK_SERVER_URL):
+    python -m benchmarks.fake_adk_server --port 5010
+    python -m benchmarks.fake_adk_server --latency report_agent=30 --error-rate 0.05 --max-concurrent 8
+    python -m benchmarks.fake_adk_server --record-from http://localhost:5011   # proxy a real server and save its responses
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.recordings import RECORDINGS_DIR, load_events, save_events
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Typical end-to-end /run time of each app against Gemini, in seconds
+DEFAULT_LATENCY_SECONDS = {
+    "prescription_agent": 4.0,
+    "conversation_summarizer_agent": 3.0,
+    "lab_report_agent": 12.0,
+    "report_agent": 45.0,
+}
+
+ERROR_RESPONSES = {
+    429: web.HTTPTooManyRequests,
+    500: web.HTTPInternalServerError,
+    503: web.HTTPServiceUnavailable,
+    504: web.HTTPGatewayTimeout,
+}
+
+
+def _json_error(error_class, detail: str) -> web.HTTPException:
+    return error_class(text=json.dumps({"detail": detail}), content_type="application/json")
+
+
+class FakeADKServer:
+    """
+    Replays one recorded event list per app. Each run takes the app latency times a
+    lognormal jitter factor; with max_concurrent set, runs beyond it queue first, which is
+    how upstream rate limits show up as tail latency.
+    """
+
+    def __init__(
+        self,
+        recordings_dir: str = RECORDINGS_DIR,
+        latency: Optional[Dict[str, float]] = None,
+        latency_scale: float = 1.0,
+        jitter: float = 0.25,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        session_latency: float = 0.01,
+        max_concurrent: int = 0,
+        record_from: Optional[str] = None,
+        seed: Optional[int] = None
+    ):
+        self.recordings_dir = recordings_dir
+        self.latency = dict(DEFAULT_LATENCY_SECONDS, **(latency or {}))
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_class = ERROR_RESPONSES.get(error_status, web.HTTPServiceUnavailable)
+        self.session_latency = session_latency
+        self.record_from = record_from
+        self._random = random.Random(seed)
+        self._slots = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self._events: Dict[str, Any] = {}
+        self._sessions: Dict[str, str] = {}
+        self._upstream: Optional[aiohttp.ClientSession] = None
+        self.stats = {"sessions": 0, "runs": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0, "queued_seconds": 0.0}
+
+    def events_for(self, app: str):
+        if app not in self._events:
+            self._events[app] = load_events(app, self.recordings_dir)
+        return self._events[app]
+
+    def run_latency(self, app: str) -> float:
+        base = self.latency.get(app, 1.0) * self.latency_scale
+        return base * self._random.lognormvariate(0, self.jitter) if self.jitter > 0 else base
+
+    @asynccontextmanager
+    async def _run_slot(self, payload: Dict[str, Any]):
+        """
+        Admit one run: checks the session, waits for a concurrency slot, and yields the
+        run latency. Raises the configured HTTP error for runs picked to fail.
+        """
+        app = payload.get("app_name")
+        if self._sessions.get(payload.get("session_id")) != app:
+            raise _json_error(web.HTTPNotFound, "Session not found")
+
+        queued_at = time.monotonic()
+        if self._slots:
+            await self._slots.acquire()
+        self.stats["queued_seconds"] += time.monotonic() - queued_at
+        self.stats["runs"] += 1
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            latency = self.run_latency(app)
+            if self._random.random() < self.error_rate:
+                # Upstream failures usually take a while to surface
+                await asyncio.sleep(latency * self._random.random())
+                self.stats["errors"] += 1
+                raise _json_error(self.error_class, "Simulated upstream error")
+            yield latency
+        finally:
+            self.stats["in_flight"] -= 1
+            if self._slots:
+                self._slots.release()
+
+    async def _upstream_session(self) -> aiohttp.ClientSession:
+        if self._upstream is None:
+            self._upstream = aiohttp.ClientSession(base_url=self.record_from)
+        return self._upstream
+
+    async def create_session(self, request: web.Request) -> web.Response:
+        app, session_id = request.match_info["app"], request.match_info["session_id"]
+        if self.record_from:
+            upstream = await self._upstream_session()
+            async with upstream.post(request.path, data=await request.read(), headers={"Content-Type": "application/json"}) as response:
+                body = await response.read()
+            if response.status == 200:
+                self._sessions[session_id] = app
+            return web.Response(status=response.status, body=body, content_type="application/json")
+
+        await asyncio.sleep(self.session_latency)
+        self._sessions[session_id] = app
+        self.stats["sessions"] += 1
+        return web.json_response({"id": session_id, "appName": app, "userId": request.match_info["user_id"], "state": {}, "events": []})
+
+    async def delete_session(self, request: web.Request) -> web.Response:
+        self._sessions.pop(request.match_info["session_id"], None)
+        return web.Response(status=200)
+
+    async def run(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if self.record_from:
+            return await self._record(payload)
+
+        async with self._run_slot(payload) as latency:
+            await asyncio.sleep(latency)
+        return web.json_response(self.events_for(payload["app_name"]))
+
+    async def run_sse(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        async with self._run_slot(payload) as latency:
+            events = self.events_for(payload["app_name"])
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for event in events:
+                # Sub-agents finish one after another, so spread the run time over the events
+                await asyncio.sleep(latency / max(len(events), 1))
+                await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    async def _record(self, payload: Dict[str, Any]) -> web.Response:
+        upstream = await self._upstream_session()
+        async with upstream.post("/run", json=payload) as response:
+            body = await response.read()
+        if response.status == 200:
+            path = save_events(payload["app_name"], json.loads(body), self.recordings_dir)
+            self._events.pop(payload["app_name"], None)
+            logger.info(f"Recorded {payload['app_name']} response to {path}")
+        return web.Response(status=response.status, body=body, content_type="application/json")
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats, open_sessions=len(self._sessions)))
+
+    async def close(self, app: web.Application) -> None:
+        if self._upstream is not None:
+            await self._upstream.close()
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        session_path = "/apps/{app}/users/{user_id}/sessions/{session_id}"
+        app.router.add_post(session_path, self.create_session)
+        app.router.add_delete(session_path, self.delete_session)
+        app.router.add_post("/run", self.run)
+        app.router.add_post("/run_sse", self.run_sse)
+        app.router.add_get("/stats", self.get_stats)
+        app.on_cleanup.append(self.close)
+        return app
+
+
+def parse_latency(values) -> Dict[str, float]:
+    latency = {}
+    for value in values or []:
+        app, _, seconds = value.partition("=")
+        latency[app] = float(seconds)
+    return latency
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake ADK API server replaying recorded agent responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5010)
+    parser.add_argument("--recordings-dir", default=RECORDINGS_DIR)
+    parser.add_argument("--latency", action="append", metavar="APP=SECONDS", help="mean /run latency of an app (repeatable)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply every app latency, e.g. 0.01 for smoke tests")
+    parser.add_argument("--jitter", type=float, default=0.25, help="sigma of the lognormal latency factor, 0 for fixed latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of runs that fail")
+    parser.add_argument("--error-status", type=int, default=503, choices=sorted(ERROR_RESPONSES))
+    parser.add_argument("--max-concurrent", type=int, default=0, help="runs processed at once, the rest queue (0 = unlimited)")
+    parser.add_argument("--record-from", help="proxy to a real ADK server and save its /run responses as recordings")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = FakeADKServer(
+        recordings_dir=args.recordings_dir,
+        latency=parse_latency(args.latency),
+        latency_scale=args.latency_scale,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        max_concurrent=args.max_concurrent,
+        record_from=args.record_from,
+        seed=args.seed,
+    )
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Gemini OCR stand-in: replaces google.generativeai.upload_file and GenerativeModel with
+fakes that wait a simulated latency and return recorded document text, so the OCR stage
+of prescription and lab report uploads runs without the Gemini API.
+
+install() must run in the backend process before any upload is processed
+(benchmarks/run_backend.py does this before starting uvicorn).
+"""
+import time
+import uuid
+import random
+import threading
+from typing import Optional
+
+from benchmarks.recordings import OCR_TEXT
+
+_random = random.Random()
+_lock = threading.Lock()
+stats = {"uploads": 0, "generations": 0, "errors": 0}
+
+
+class StubFile:
+    def __init__(self, path: str, display_name: str):
+        self.path = path
+        self.display_name = display_name
+        self.uri = f"stub://files/{uuid.uuid4().hex}"
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates = []
+
+
+def _document_type(uploaded_file: StubFile) -> str:
+    return "lab_report" if "lab" in f"{uploaded_file.path} {uploaded_file.display_name}".lower() else "prescription"
+
+
+def install(
+    upload_latency: float = 0.3,
+    ocr_latency: float = 2.5,
+    jitter: float = 0.25,
+    error_rate: float = 0.0,
+    unique_text: bool = True
+) -> None:
+    """
+    Patch google.generativeai in place. With unique_text every OCR result carries a random
+    document number, so each upload is new work for the agent cache and the agents.
+    """
+    import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+
+    def wait(seconds: float, timeout: Optional[float] = None) -> None:
+        seconds = seconds * _random.lognormvariate(0, jitter) if jitter > 0 else seconds
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise google_exceptions.DeadlineExceeded("Stub Gemini request timed out")
+        time.sleep(seconds)
+
+    def maybe_fail() -> None:
+        if _random.random() < error_rate:
+            with _lock:
+                stats["errors"] += 1
+            raise google_exceptions.ServiceUnavailable("Simulated Gemini overload")
+
+    def upload_file(path: str, display_name: Optional[str] = None, **kwargs) -> StubFile:
+        wait(upload_latency)
+        maybe_fail()
+        with _lock:
+            stats["uploads"] += 1
+        return StubFile(path, display_name or "")
+
+    class GenerativeModel:
+        def __init__(self, model_name: str = "stub", **kwargs):
+            self.model_name = model_name
+
+        def generate_content(self, contents, request_options=None, **kwargs) -> StubResponse:
+            wait(ocr_latency, (request_options or {}).get("timeout"))
+            maybe_fail()
+            with _lock:
+                stats["generations"] += 1
+            uploaded = next((item for item in contents if isinstance(item, StubFile)), None)
+            text = OCR_TEXT[_document_type(uploaded)] if uploaded else OCR_TEXT["prescription"]
+            if unique_text:
+                text = f"{text}\nDocument no. {uuid.uuid4().hex[:12]}"
+            return StubResponse(text)
+
+    genai.upload_file = upload_file
+    genai.GenerativeModel = GenerativeModel
@@ -0,0 +1,170 @@
+"""
+Throughput and tail-latency load test.
+
+--target backend (default) drives a running backend, usually started with
+benchmarks/run_backend.py: each request uploads a document and polls GET /jobs/{id} until
+the job finishes, so latency covers OCR, the agent call and persistence.
+--target adk skips the backend and calls the ADK server directly through
+utils.adk_client, which needs no database.
+
+Run from the backend directory:
+    python -m benchmarks.load_test --kind lab_report --requests 100 --concurrency 10
+    python -m benchmarks.load_test --kind overall_report --requests 5 --concurrency 2
+    python -m benchmarks.load_test --target adk --kind report_agent --requests 200 --concurrency 50
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+UPLOAD_ENDPOINTS = {
+    "prescription": "/upload-prescription",
+    "lab_report": "/upload-lab-report",
+}
+
+# Smallest valid PNG; a random trailer makes every upload a new file for the upload cache
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d4944415478da63f8cfc0f01f0005000201a5f6e7b40000000049454e44ae426082"
+)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+async def upload_and_wait(session: aiohttp.ClientSession, kind: str, poll_interval: float, timeout: float) -> Dict[str, Any]:
+    started = time.monotonic()
+    form = aiohttp.FormData()
+    form.add_field("file", _PNG + uuid.uuid4().bytes, filename=f"{kind}-{uuid.uuid4().hex[:8]}.png", content_type="image/png")
+    async with session.post(UPLOAD_ENDPOINTS[kind], data=form) as response:
+        body = await response.json()
+        if response.status not in (200, 202):
+            return {"status": f"http_{response.status}", "latency": time.monotonic() - started, "error": body.get("message")}
+
+    job = body
+    while job.get("status") not in ("completed", "failed"):
+        if time.monotonic() - started > timeout:
+            return {"status": "timeout", "latency": time.monotonic() - started}
+        await asyncio.sleep(poll_interval)
+        async with session.get(f"/jobs/{body['job_id']}") as response:
+            job = await response.json()
+
+    return {
+        "status": job["status"],
+        "latency": time.monotonic() - started,
+        "timings": job.get("timings") or {},
+        "error": job.get("error"),
+    }
+
+
+async def generate_overall_report(session: aiohttp.ClientSession, timeout: float) -> Dict[str, Any]:
+    started = time.monotonic()
+    async with session.post("/generate-overall-report", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        body = await response.json()
+    return {
+        "status": "completed" if response.status == 200 else f"http_{response.status}",
+        "latency": time.monotonic() - started,
+        "error": body.get("message"),
+    }
+
+
+async def call_adk_agent(agent_name: str, timeout: float) -> Dict[str, Any]:
+    from utils.adk_client import call_agent
+
+    started = time.monotonic()
+    response = await call_agent(agent_name, json.dumps({"load_test": uuid.uuid4().hex}), timeout=timeout)
+    failed = isinstance(response, dict) and "error" in response
+    return {
+        "status": "failed" if failed else "completed",
+        "latency": time.monotonic() - started,
+        "error": response.get("error") if failed else None,
+    }
+
+
+async def run_load(args) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    connector = aiohttp.TCPConnector(limit=args.concurrency * 2)
+    async with aiohttp.ClientSession(base_url=args.url, connector=connector) as session:
+
+        async def one(index: int) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    if args.target == "adk":
+                        return await call_adk_agent(args.kind, args.timeout)
+                    if args.kind == "overall_report":
+                        return await generate_overall_report(session, args.timeout)
+                    return await upload_and_wait(session, args.kind, args.poll_interval, args.timeout)
+                except Exception as e:
+                    return {"status": type(e).__name__, "latency": None, "error": str(e)}
+
+        return await asyncio.gather(*(one(index) for index in range(args.requests)))
+
+
+def report(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    completed = [r["latency"] for r in results if r["status"] == "completed"]
+    stage_times = defaultdict(list)
+    for result in results:
+        for stage, seconds in (result.get("timings") or {}).items():
+            if isinstance(seconds, (int, float)):
+                stage_times[stage].append(seconds)
+
+    return {
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_per_second": round(len(completed) / elapsed, 3) if elapsed else None,
+        "statuses": dict(Counter(r["status"] for r in results)),
+        "latency_seconds": {
+            name: round(value, 3) if value is not None else None
+            for name, value in (
+                ("p50", percentile(completed, 0.50)),
+                ("p90", percentile(completed, 0.90)),
+                ("p95", percentile(completed, 0.95)),
+                ("p99", percentile(completed, 0.99)),
+                ("max", max(completed) if completed else None),
+            )
+        },
+        "stage_p95_seconds": {stage: round(percentile(times, 0.95), 3) for stage, times in stage_times.items()},
+        "sample_errors": [r["error"] for r in results if r.get("error")][:5],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the backend or the ADK server")
+    parser.add_argument("--target", choices=["backend", "adk"], default="backend")
+    parser.add_argument("--kind", default="prescription",
+                        help="prescription, lab_report or overall_report for the backend; an app name for --target adk")
+    parser.add_argument("--url", default=os.getenv("LOAD_TEST_URL", "http://127.0.0.1:8000"))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=900)
+    args = parser.parse_args()
+
+    if args.target == "backend" and args.kind not in UPLOAD_ENDPOINTS and args.kind != "overall_report":
+        parser.error(f"Unknown backend kind: {args.kind}")
+
+    started = time.monotonic()
+    results = asyncio.run(run_load(args))
+    summary = report(results, time.monotonic() - started)
+
+    if args.target == "adk":
+        from utils.adk_client import adk_client_stats, close_adk_client
+        summary["adk_client"] = adk_client_stats()
+        close_adk_client()
+
+    print(json.dumps(summary, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Microbenchmark: parsing ADK /run responses with the old recursive JSON search plus full
+stateDelta merge, versus utils.adk_parser.parse_adk_response.
+
+Run from the backend directory:
+    python -m benchmarks.parse_adk_response                 # synthetic report_agent responses
+    python -m benchmarks.parse_adk_response recorded.json   # recorded /run responses (event lists)
+"""
+import re
+import sys
+import json
+import time
+import random
+import logging
+from typing import Any, Dict, List
+
+from utils.adk_parser import parse_adk_response, OVERALL_REPORT_RESPONSE, AgentResponseSpec
+
+logging.disable(logging.WARNING)
+
+
+def legacy_extract_json_from_text(data: Any) -> List[Dict[str, Any]]:
+    """The per-module extract_json_from_text this parser replaced."""
+    extracted_jsons = []
+
+    def recursive_search(obj):
+        if isinstance(obj, dict):
+            if 'text' in obj and isinstance(obj['text'], str):
+                text_content = obj['text']
+                try:
+                    extracted_jsons.append(json.loads(text_content))
+                except json.JSONDecodeError:
+                    for match in re.findall(r'```json\s*\n(.*?)\n```', text_content, re.DOTALL):
+                        try:
+                            extracted_jsons.append(json.loads(match))
+                        except json.JSONDecodeError:
+                            pass
+            for value in obj.values():
+                recursive_search(value)
+        elif isinstance(obj, list):
+            for item in obj:
+                recursive_search(item)
+
+    recursive_search(data)
+    return extracted_jsons
+
+
+def legacy_parse(events: Any) -> Dict[str, Any]:
+    """Old flow: merge every stateDelta, and walk the whole response for JSON text."""
+    structured_data = {}
+    if isinstance(events, list):
+        for entry in events:
+            if isinstance(entry, dict) and 'actions' in entry:
+                for key, value in entry.get('actions', {}).get('stateDelta', {}).items():
+                    structured_data[key] = value
+    extracted = legacy_extract_json_from_text(events)
+    if not structured_data and extracted:
+        structured_data = extracted[0]
+    return structured_data
+
+
+def synthetic_report_response(entries_per_section: int = 400, chatter_events: int = 60) -> List[Dict[str, Any]]:
+    """
+    A report_agent-shaped response: one large event per sub-agent (JSON text part plus
+    stateDelta), interleaved with non-JSON text events.
+    """
+    rng = random.Random(0)
+    sections = {
+        "timeline": {"events": [
+            {"date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "type": "lab_report",
+             "description": "Routine panel " * 5, "source_id": i}
+            for i in range(entries_per_section)
+        ]},
+        "trend_commentary": {"comments": [
+            {"metric": f"metric_{i}", "clinical_comment": "Within range " * 4}
+            for i in range(entries_per_section)
+        ], "overall_summary": "Mostly stable"},
+        "risk_and_severity": {"disease_risks": [
+            {"disease": f"condition_{i}", "risk_score": rng.random(), "severity": "low"} for i in range(entries_per_section // 4)
+        ], "overall_health_index": 72, "overall_severity": "moderate"},
+        "possible_conditions": {"conditions": [
+            {"name": f"condition_{i}", "confidence": rng.random(), "evidence": ["elevated marker"] * 3}
+            for i in range(entries_per_section // 4)
+        ]},
+        "medication_overview": {"current_medications": [
+            {"name": f"drug_{i}", "dosage": "5mg", "frequency": "daily"} for i in range(entries_per_section // 8)
+        ], "past_medications": []},
+        "final_report": {"patient_overview": "Overview " * 200, "risk_level": "Moderate",
+                         "next_steps": ["Follow up"] * 10, "summary_comment": "Stable"},
+    }
+
+    events = []
+    for key, value in sections.items():
+        for _ in range(chatter_events // len(sections)):
+            events.append({"author": key, "content": {"role": "model", "parts": [{"text": "Thinking about the data... " * 40}]}})
+        events.append({
+            "author": key,
+            "content": {"role": "model", "parts": [{"text": json.dumps(value)}]},
+            "actions": {"stateDelta": {key: value}}
+        })
+    aggregate = dict(sections)
+    events.append({
+        "author": "report_aggregator_agent",
+        "content": {"role": "model", "parts": [{"text": json.dumps(aggregate)}]},
+        "actions": {"stateDelta": {"patient_health_report": aggregate}}
+    })
+    return events
+
+
+def bench(fn, events, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(events)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main(paths: List[str]) -> None:
+    if paths:
+        cases = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                cases.append((path, json.load(f), OVERALL_REPORT_RESPONSE))
+    else:
+        cases = [
+            ("synthetic report_agent (small)", synthetic_report_response(entries_per_section=50), OVERALL_REPORT_RESPONSE),
+            ("synthetic report_agent (large)", synthetic_report_response(entries_per_section=1000), OVERALL_REPORT_RESPONSE),
+        ]
+
+    # Validation cost is reported separately; the scan itself is what replaced the recursive walk
+    scan_only = lambda spec: AgentResponseSpec(spec.app, spec.keys)
+
+    print(f"{'case':40} {'size':>10} {'legacy ms':>10} {'scan ms':>10} {'scan+validate ms':>17} {'speedup':>8}")
+    for name, events, spec in cases:
+        size = len(json.dumps(events))
+        repeat = max(3, int(2e7 / max(size, 1)))
+        legacy = bench(legacy_parse, events, repeat)
+        scan = bench(lambda e: parse_adk_response(e, scan_only(spec)), events, repeat)
+        validated = bench(lambda e: parse_adk_response(e, spec), events, repeat)
+        print(f"{name[:40]:40} {size / 1e6:>9.2f}M {legacy:>10.2f} {scan:>10.3f} {validated:>17.2f} {legacy / scan:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
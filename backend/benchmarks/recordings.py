@@ -0,0 +1,171 @@
+"""
+Recorded agent responses replayed by the fake ADK server and the Gemini OCR stub.
+
+A recording is the event list one /run call returned, stored as
+<recordings dir>/<app>.json (fake_adk_server.py --record-from writes them from a real
+ADK server). Apps without a recording fall back to the built-in responses below: one
+event per sub-agent, each writing its output_key, shaped like the pipeline models.
+"""
+import os
+import json
+from typing import Any, Dict, List, Tuple
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+PRESCRIPTION_DATA = {
+    "doctor_info": {"name": "Dr. A. Rao", "qualification": "MBBS, MD", "registration_number": "KMC-45521",
+                    "hospital": "City Care Clinic", "contact_info": "080-4455-6677", "date": "2024-05-14"},
+    "patient_info": {"name": "Benchmark Patient", "age": "52", "gender": "M"},
+    "medicines": [
+        {"name": "Metformin", "dosage": "500mg", "frequency": "twice daily", "duration": "90 days",
+         "special_instructions": "After meals"},
+        {"name": "Atorvastatin", "dosage": "10mg", "frequency": "once daily", "duration": "ongoing",
+         "special_instructions": "At bedtime"},
+        {"name": "Amlodipine", "dosage": "5mg", "frequency": "once daily", "duration": "30 days",
+         "special_instructions": None},
+    ],
+    "summary": {"diagnosis": "Type 2 diabetes, dyslipidemia, hypertension", "symptoms": "Fatigue, frequent urination",
+                "advice": "Low-carb diet, 30 minutes walking daily", "follow_up": "After 4 weeks with HbA1c"},
+    "prescription_summary": "Diabetes, lipid and blood pressure management with lifestyle advice.",
+}
+
+LAB_STAGES = [
+    ("lab_parser_agent", "raw_lab_data", {
+        "report_date": "2024-05-10", "report_time": "09:30",
+        "metrics": [
+            {"test_name": "HbA1c", "category": "Diabetes", "value": 7.8, "unit": "%", "reference_range": "4.0-5.6", "interpretation": "High"},
+            {"test_name": "Fasting Glucose", "category": "Diabetes", "value": 148, "unit": "mg/dL", "reference_range": "70-99", "interpretation": "High"},
+            {"test_name": "LDL Cholesterol", "category": "Lipid Profile", "value": 155, "unit": "mg/dL", "reference_range": "0-130", "interpretation": "High"},
+            {"test_name": "HDL Cholesterol", "category": "Lipid Profile", "value": 38, "unit": "mg/dL", "reference_range": "40-60", "interpretation": "Low"},
+            {"test_name": "Hemoglobin", "category": "CBC", "value": 13.9, "unit": "g/dL", "reference_range": "13.0-17.0", "interpretation": "Normal"},
+        ],
+    }),
+    ("lab_analyzer_agent", "lab_analysis", {
+        "analyzed_metrics": [
+            {"test_name": "HbA1c", "status": "high", "value": 7.8, "unit": "%", "reference_range": "4.0-5.6", "interpretation": "Poor glycaemic control"},
+            {"test_name": "LDL Cholesterol", "status": "high", "value": 155, "unit": "mg/dL", "reference_range": "0-130", "interpretation": "Raised cardiovascular risk"},
+            {"test_name": "HDL Cholesterol", "status": "low", "value": 38, "unit": "mg/dL", "reference_range": "40-60", "interpretation": "Low protective cholesterol"},
+        ],
+        "pattern_insights": ["High LDL + Low HDL -> possible dyslipidemia", "High HbA1c + glucose -> uncontrolled diabetes"],
+        "summary": "Glycaemic and lipid markers are outside the reference range.",
+    }),
+    ("lab_risk_scorer_agent", "lab_risk_scores", {
+        "category_scores": [{"category": "Metabolic", "score": 0.74}, {"category": "Cardiovascular", "score": 0.61}],
+        "overall_health_risk_index": 0.66, "severity": "Moderate",
+        "critical_flags": ["HbA1c above 7.5%"], "summary": "Moderate metabolic and cardiovascular risk.",
+    }),
+    ("lab_summary_agent", "lab_summary", {
+        "overview": "Blood sugar and cholesterol are above target; blood count is normal.",
+        "key_findings": [{"metric": "HbA1c", "value": "7.8 %", "interpretation": "High"},
+                         {"metric": "LDL Cholesterol", "value": "155 mg/dL", "interpretation": "High"}],
+        "overall_risk": "Moderate", "tone": "Cautionary",
+        "recommendations": ["Review diabetes medication", "Repeat lipid profile in 3 months"],
+        "critical_alerts": [],
+    }),
+]
+
+REPORT_STAGES = [
+    ("timeline_builder_agent", "timeline", {"events": [
+        {"date": "2024-04-02", "event_type": "symptom_onset", "description": "Reported fatigue and thirst", "source": "conversation_transcript"},
+        {"date": "2024-05-10", "event_type": "lab_test", "description": "HbA1c 7.8%, LDL 155 mg/dL", "source": "lab_report"},
+        {"date": "2024-05-14", "event_type": "doctor_visit", "description": "Started metformin and atorvastatin", "source": "prescription"},
+    ]}),
+    ("clinical_trend_analyzer_agent", "trend_commentary", {"comments": [
+        {"metric": "HbA1c", "clinical_comment": "Worsening glycaemic control"},
+        {"metric": "LDL Cholesterol", "clinical_comment": "Slight improvement, still above target"},
+    ], "overall_summary": "Diabetes control is worsening while lipids improve slowly."}),
+    ("risk_and_severity_agent", "risk_and_severity", {
+        "disease_risks": [{"disease": "Diabetes complications", "risk_score": 62, "severity_level": "Moderate"},
+                          {"disease": "Cardiovascular disease", "risk_score": 48, "severity_level": "Moderate"}],
+        "overall_health_index": 58, "overall_severity": "Moderate", "clinical_comment": "Needs closer follow-up.",
+    }),
+    ("disease_inference_agent", "possible_conditions", {
+        "conditions": [{"condition": "Type 2 Diabetes", "confidence": 92, "recommended_action": "Intensify glycaemic therapy"},
+                       {"condition": "Dyslipidemia", "confidence": 85, "recommended_action": "Continue statin, recheck in 3 months"}],
+        "summary_comment": "Findings are consistent with metabolic syndrome.",
+    }),
+    ("medication_aggregator_agent", "medication_overview", {
+        "current_medications": [
+            {"name": "Metformin", "dosage": "500mg", "frequency": "twice daily", "duration": "90 days", "start_date": "2024-05-14", "source": "prescription"},
+            {"name": "Atorvastatin", "dosage": "10mg", "frequency": "once daily", "duration": "ongoing", "start_date": "2024-05-14", "source": "prescription"},
+        ],
+        "past_medications": [],
+        "medication_timeline": [],
+        "medication_summary": "On oral diabetes and lipid-lowering therapy since May 2024.",
+    }),
+    ("patient_report_generator_agent", "final_report", {
+        "patient_overview": "52-year-old male with type 2 diabetes and dyslipidemia; glycaemic control is worsening.",
+        "risk_level": "Moderate",
+        "next_steps": ["Repeat HbA1c in 3 months", "Dietitian referral", "Home blood pressure log"],
+        "summary_comment": "Adherence and lifestyle changes are the main levers.",
+    }),
+]
+
+CONVERSATION_SUMMARY = {
+    "date": "2024-05-20", "mood": "Tired but positive", "symptoms": ["fatigue", "mild headache"],
+    "medications_taken": ["Metformin", "Atorvastatin"], "sleep_quality": "Fair", "energy_level": "Low",
+    "concerns": "Feels tired after lunch", "summary": "Patient is taking medication regularly and reports afternoon fatigue.",
+    "ai_insights": ["Fatigue may relate to post-meal glucose spikes"], "overall_score": "6/10",
+}
+
+OCR_TEXT = {
+    "prescription": (
+        "CITY CARE CLINIC\nDr. A. Rao MBBS, MD  Reg. No. KMC-45521\nDate: 14/05/2024\n"
+        "Patient: Benchmark Patient  Age: 52  Sex: M\nDx: T2DM, dyslipidemia, HTN\n"
+        "Rx\n1. Tab Metformin 500mg  1-0-1 after meals x 90 days\n2. Tab Atorvastatin 10mg  0-0-1 continue\n"
+        "3. Tab Amlodipine 5mg  1-0-0 x 30 days\nAdvice: low-carb diet, walk 30 min daily\nReview after 4 weeks with HbA1c"
+    ),
+    "lab_report": (
+        "ACME DIAGNOSTICS\nReport date: 10/05/2024 09:30\n"
+        "HbA1c 7.8 % (4.0-5.6)\nFasting Glucose 148 mg/dL (70-99)\nLDL Cholesterol 155 mg/dL (0-130)\n"
+        "HDL Cholesterol 38 mg/dL (40-60)\nHemoglobin 13.9 g/dL (13.0-17.0)"
+    ),
+}
+
+
+def _stages(app: str) -> List[Tuple[str, str, Any]]:
+    if app == "prescription_agent":
+        return [("prescription_agent", "prescription_data", PRESCRIPTION_DATA)]
+    if app == "conversation_summarizer_agent":
+        return [("conversation_summarizer_agent", "conversation_summary", CONVERSATION_SUMMARY)]
+    if app == "lab_report_agent":
+        aggregate = {key: value for _, key, value in LAB_STAGES}
+        return LAB_STAGES + [("lab_aggregator_agent", "final_lab_report", aggregate)]
+    if app == "report_agent":
+        aggregate = {key: value for _, key, value in REPORT_STAGES}
+        return REPORT_STAGES + [("report_aggregator_agent", "patient_health_report", aggregate)]
+    raise KeyError(app)
+
+
+def default_events(app: str) -> List[Dict[str, Any]]:
+    """
+    Built-in response for an app: one model event per sub-agent, with the JSON text
+    part and the stateDelta ADK emits for an output_key.
+    """
+    return [
+        {
+            "author": author,
+            "content": {"role": "model", "parts": [{"text": json.dumps(value)}]},
+            "actions": {"stateDelta": {key: value}},
+        }
+        for author, key, value in _stages(app)
+    ]
+
+
+def load_events(app: str, recordings_dir: str = RECORDINGS_DIR) -> List[Dict[str, Any]]:
+    """
+    The recorded event list for an app, or its built-in response.
+    """
+    path = os.path.join(recordings_dir, f"{app}.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return default_events(app)
+
+
+def save_events(app: str, events: List[Dict[str, Any]], recordings_dir: str = RECORDINGS_DIR) -> str:
+    os.makedirs(recordings_dir, exist_ok=True)
+    path = os.path.join(recordings_dir, f"{app}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(events, f)
+    return path
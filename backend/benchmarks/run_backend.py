@@ -0,0 +1,68 @@
+"""
+Start the backend for offline load tests: Gemini OCR is replaced by benchmarks.gemini_stub
+and ADK calls go to the fake ADK server (started in-process with --with-fake-adk).
+The database is still the one in DATABASE_URL.
+
+Run from the backend directory:
+    python -m benchmarks.run_backend --with-fake-adk --latency-scale 0.1
+    python -m benchmarks.load_test --kind prescription --requests 200 --concurrency 20
+"""
+import os
+import asyncio
+import argparse
+import threading
+
+from aiohttp import web
+
+
+def start_fake_adk_server(port: int, **options) -> None:
+    """
+    Serve the fake ADK server on its own thread and event loop.
+    """
+    from benchmarks.fake_adk_server import FakeADKServer
+
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(FakeADKServer(**options).make_app())
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="fake-adk-server", daemon=True).start()
+    ready.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the backend against local Gemini and ADK stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--with-fake-adk", action="store_true", help="also serve the fake ADK server in this process")
+    parser.add_argument("--adk-port", type=int, default=5010)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="scales fake ADK and Gemini latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of failing ADK runs and Gemini calls")
+    parser.add_argument("--ocr-latency", type=float, default=2.5, help="seconds per stub Gemini OCR call before scaling")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    if args.with_fake_adk:
+        os.environ["ADK_SERVER_URL"] = f"http://127.0.0.1:{args.adk_port}"
+        start_fake_adk_server(args.adk_port, latency_scale=args.latency_scale, error_rate=args.error_rate)
+
+    from benchmarks import gemini_stub
+    gemini_stub.install(
+        upload_latency=0.3 * args.latency_scale,
+        ocr_latency=args.ocr_latency * args.latency_scale,
+        error_rate=args.error_rate
+    )
+
+    import uvicorn
+    from main import app
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from db.database import Base
 
@@ -141,6 +141,30 @@ class OverallReport(Base):
     structured_data = Column(JSON, nullable=True)
 
 
+class ProcessedUpload(Base):
+    __tablename__ = "processed_uploads"
+    __table_args__ = (UniqueConstraint("content_hash", "upload_type", name="uq_processed_upload_hash_type"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # SHA-256 of the uploaded file; uploads are stored content-addressed under this hash
+    content_hash = Column(String(64), nullable=False, index=True)
+    upload_type = Column(String, nullable=False)    # checkin / prescription / lab_report / insurance_consultation
+    file_path = Column(String, nullable=False)
+    
+    # Id of the CheckIn / Prescription / Report row created from this upload (if any)
+    record_id = Column(Integer, nullable=True)
+    
+    # Previously computed results, reused when the same file is uploaded again
+    ocr_text = Column(Text, nullable=True)
+    transcript = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)            # structured agent output
+    
+    hit_count = Column(Integer, nullable=False, default=0)
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Hospital(Base):
     __tablename__ = "hospitals"
     
@@ -1,21 +1,43 @@
 # main.py
-from fastapi import FastAPI, Request, status, UploadFile, File, Depends
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, Request, status, UploadFile, File, Depends, BackgroundTasks
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from marshmallow import ValidationError as MarshmallowValidationError
 import os
+import json
+import uuid
+import asyncio
+import zipfile
+from typing import List
 from contextlib import asynccontextmanager
 from routers import checkins, prescriptions, reports, hospitals, insurances, appointments
 from db.database import init_db, SessionLocal
-from db.models import CheckIn, Prescription, Report, OverallReport
+from db.models import OverallReport
 from sqlalchemy import desc
-from utils.transcribe import transcribe_audio
-from utils.summarize import summarize_checkin_text
-from utils.ocr_summary import process_prescription, process_lab_report
 from utils.overall_report import process_overall_report
+from utils.jobs import create_job, get_job
+from utils.uploads import save_upload, upload_suffix, extract_lab_report_archive, UploadTooLarge, MAX_LAB_BATCH_FILES
+from utils.upload_jobs import (
+    reuse_processed_upload,
+    run_checkin_job,
+    run_prescription_job,
+    run_lab_report_job,
+    run_lab_report_batch_job,
+    run_insurance_consultation_job,
+    CHECKIN_DRAFT_MODE,
+)
+from utils.upload_cache import upload_cache_stats
+from utils.executors import run_in_stage, get_stage_executor, executor_stats, shutdown_executors
+from utils.adk_client import adk_client_stats, close_adk_client, warm_up_session_pools
+from utils.resilience import resilience_stats
+from utils.agent_cache import agent_cache_stats
+from utils.singleflight import single_flight_stats
+from utils.scheduler import scheduler_stats
+from utils.transcribe import preload_transcription_worker, stop_transcription_worker, transcription_stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -25,9 +47,17 @@ async def lifespan(app: FastAPI):
         print("Database initialized successfully")
     except Exception as e:
         print(f"Database initialization error: {e}")
+    # Load the transcription models in the background so the first check-in does not pay for it
+    get_stage_executor("transcription").submit(preload_transcription_worker)
+    if CHECKIN_DRAFT_MODE:
+        get_stage_executor("draft_transcription").submit(preload_transcription_worker, draft=True)
+    # Pre-create ADK sessions so the first agent calls only need the /run request
+    warm_up_session_pools(["conversation_summarizer_agent", "prescription_agent", "lab_report_agent", "report_agent"])
     yield
-    # Shutdown (if needed)
-    pass
+    # Shutdown
+    shutdown_executors()
+    close_adk_client()
+    stop_transcription_worker()
 
 app = FastAPI(
     title="PraanLink API",
@@ -50,14 +80,20 @@ UPLOAD_DIR = "uploads/checkins/audio"
 TRANSCRIPT_DIR = "uploads/checkins/transcripts"
 PRESCRIPTION_DIR = "uploads/prescriptions"
 LAB_REPORT_DIR = "uploads/lab_reports"
+LAB_REPORT_BATCH_DIR = "uploads/lab_reports/batches"
 OVERALL_REPORT_DIR = "uploads/overall_reports"
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
 os.makedirs(PRESCRIPTION_DIR, exist_ok=True)
 os.makedirs(LAB_REPORT_DIR, exist_ok=True)
+os.makedirs(LAB_REPORT_BATCH_DIR, exist_ok=True)
 os.makedirs(OVERALL_REPORT_DIR, exist_ok=True)
 
+# Never served from uploads/: cache stores (older setups kept them there) and dot/temp files
+PRIVATE_UPLOAD_DIRS = {"transcript_cache"}
+PRIVATE_UPLOAD_MARKERS = (".sqlite", ".db")
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -92,6 +128,16 @@ async def serve_upload_file(file_path: str):
             status_code=403,
             content={"error": "Access denied"}
         )
+
+    relative_parts = resolved_path.relative_to(resolved_base).parts
+    if any(part.startswith(".") or part in PRIVATE_UPLOAD_DIRS for part in relative_parts) or any(
+        marker in resolved_path.name for marker in PRIVATE_UPLOAD_MARKERS
+    ):
+        print(f"Refusing to serve private file: {file_path}")
+        return JSONResponse(
+            status_code=403,
+            content={"error": "Access denied"}
+        )
     
     # Check if file exists
     if not full_path.exists():
@@ -150,69 +196,104 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+# Processing metrics endpoint
+@app.get("/metrics")
+def get_metrics(db: Session = Depends(get_db)):
+    """
+    Runtime counters for the upload processing pipeline.
+    """
+    return {
+        "upload_cache": upload_cache_stats(db),
+        "executors": executor_stats(),
+        "adk_client": adk_client_stats(),
+        "circuit_breakers": resilience_stats(),
+        "agent_cache": agent_cache_stats(),
+        "single_flight": single_flight_stats(),
+        "scheduler": scheduler_stats(),
+        "transcription": transcription_stats()
+    }
+
+
+def accepted_job_response(job: dict, message: str) -> JSONResponse:
+    """
+    202 response pointing the client at the job status endpoint.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "job_id": job["id"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "status_url": f"/jobs/{job['id']}",
+            "message": message
+        }
+    )
+
+
+def completed_job_response(job: dict, message: str) -> dict:
+    """
+    Response for a duplicate upload whose job was completed from cached results.
+    """
+    job = get_job(job["id"])
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "status_url": f"/jobs/{job['id']}",
+        "id": job["record_id"],
+        "duplicate": True,
+        "result": job["result"],
+        "message": message
+    }
+
+
+def upload_too_large_response(exc: UploadTooLarge) -> JSONResponse:
+    """
+    413 response for uploads over the configured size limit.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={
+            "error": "File too large",
+            "message": str(exc),
+            "max_bytes": exc.max_bytes
+        }
+    )
+
+
 # Upload check-in audio endpoint
-@app.post("/upload-checkin")
+@app.post("/upload-checkin", status_code=status.HTTP_202_ACCEPTED)
 async def upload_checkin(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...)
 ):
     """
-    Upload and process a check-in audio recording.
-    Transcribes the audio and generates health insights.
+    Upload a check-in audio recording.
+    The file is saved and a background job transcribes it and generates health insights;
+    poll GET /jobs/{job_id} for progress and the stored check-in id.
     """
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    
     try:
-        # Save the uploaded file
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        
-        # Step 1: Transcribe with WhisperX (or your transcription service)
-        print(f"Transcribing check-in audio: {file.filename}")
-        transcript = transcribe_audio(file_path, output_dir=TRANSCRIPT_DIR)
-        
-        # Step 2: Analyze the check-in using AI
-        print("Summarizing check-in transcript...")
-        summary = summarize_checkin_text(transcript)
-        print("this is the summary: ", summary)
-        print("Check-in analysis completed")
+        # Stream the uploaded file to disk
+        stored = await save_upload(file, UPLOAD_DIR, "checkin")
+        file_path = stored.path
         
-        # Step 3: Save to database using the CheckIn model
-        inner_summary = summary.get("summary", {}) if summary else {}
-        print("\n"*3)
-        print(inner_summary)
-
-        checkin = CheckIn(
-            audio_path=file_path,
-            transcript=transcript,
-            summary=inner_summary.get("summary", ""),
-            mood=inner_summary.get("mood", ""),
-            symptoms=inner_summary.get("symptoms", []),
-            medications_taken=inner_summary.get("medications_taken", []),
-            sleep_quality=inner_summary.get("sleep_quality", ""),
-            energy_level=inner_summary.get("energy_level", ""),
-            concerns=inner_summary.get("concerns", ""),
-            ai_insights=inner_summary.get("ai_insights", []),
-            overall_score=inner_summary.get("overall_score", "")
-        )
+        duplicate = await reuse_processed_upload("checkin", file_path, stored.sha256)
+        if duplicate:
+            return completed_job_response(duplicate, "Check-in already processed")
         
-        db.add(checkin)
-        db.commit()
-        db.refresh(checkin)
+        job = create_job("checkin", file_path)
+        background_tasks.add_task(run_checkin_job, job["id"], file_path, TRANSCRIPT_DIR, stored.sha256)
         
-        return {
-            "id": checkin.id,
-            "message": "Check-in stored successfully",
-            "transcript": transcript,
-            "summary": summary
-        }
+        return accepted_job_response(job, "Check-in accepted for processing")
     
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
     except Exception as e:
-        print(f"Error processing check-in: {str(e)}")
+        print(f"Error saving check-in: {str(e)}")
         return JSONResponse(
             status_code=500,
             content={
-                "error": "Processing failed",
+                "error": "Upload failed",
                 "message": str(e),
                 "id": None
             }
@@ -220,205 +301,210 @@ async def upload_checkin(
 
 
 # Upload prescription endpoint
-@app.post("/upload-prescription")
+@app.post("/upload-prescription", status_code=status.HTTP_202_ACCEPTED)
 async def upload_prescription(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...)
 ):
     """
-    Upload and process a prescription image.
-    Performs OCR and extracts structured prescription data.
+    Upload a prescription image.
+    OCR and structured extraction run in a background job; poll GET /jobs/{job_id}.
     """
-    file_path = os.path.join(PRESCRIPTION_DIR, file.filename)
-    
     try:
-        # Save the uploaded file
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        
-        print(f"Processing prescription: {file.filename}")
-        
-        # Process prescription (OCR + Agent)
-        result = process_prescription(file_path)
-        
-        if result.get("status") == "failed":
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": "Processing failed",
-                    "message": result.get("error", "Unknown error"),
-                }
-            )
+        # Stream the uploaded file to disk
+        stored = await save_upload(file, PRESCRIPTION_DIR, "prescription")
+        file_path = stored.path
         
-        structured_data = result.get("structured_data", {})
-        doctor_info = structured_data.get("doctor_info", {})
-        patient_info = structured_data.get("patient_info", {})
-        summary = structured_data.get("summary", {})
+        duplicate = await reuse_processed_upload("prescription", file_path, stored.sha256)
+        if duplicate:
+            return completed_job_response(duplicate, "Prescription already processed")
         
-        # Save to database
-        prescription = Prescription(
-            file_path=file_path,
-            ocr_text=result.get("ocr_text", ""),
-            doctor_name=doctor_info.get("name"),
-            doctor_qualification=doctor_info.get("qualification"),
-            doctor_registration_number=doctor_info.get("registration_number"),
-            hospital=doctor_info.get("hospital"),
-            doctor_contact_info=doctor_info.get("contact_info"),
-            prescription_date=doctor_info.get("date"),
-            patient_name=patient_info.get("name"),
-            patient_age=patient_info.get("age"),
-            patient_gender=patient_info.get("gender"),
-            medicines=structured_data.get("medicines", []),
-            diagnosis=summary.get("diagnosis"),
-            symptoms=summary.get("symptoms"),
-            advice=summary.get("advice"),
-            follow_up=summary.get("follow_up"),
-            prescription_summary=structured_data.get("prescription_summary"),
-            structured_data=structured_data
-        )
-        
-        db.add(prescription)
-        db.commit()
-        db.refresh(prescription)
+        job = create_job("prescription", file_path)
+        background_tasks.add_task(run_prescription_job, job["id"], file_path, stored.sha256)
         
-        return {
-            "id": prescription.id,
-            "message": "Prescription processed successfully",
-            "data": structured_data
-        }
+        return accepted_job_response(job, "Prescription accepted for processing")
     
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
     except Exception as e:
-        print(f"Error processing prescription: {str(e)}")
+        print(f"Error saving prescription: {str(e)}")
         return JSONResponse(
             status_code=500,
             content={
-                "error": "Processing failed",
+                "error": "Upload failed",
                 "message": str(e)
             }
         )
 
 
-# Upload lab report endpoint (fixed)
-@app.post("/upload-lab-report")
-async def upload_lab_report(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    file_path = os.path.join(LAB_REPORT_DIR, file.filename)
-
+# Upload lab report endpoint
+@app.post("/upload-lab-report", status_code=status.HTTP_202_ACCEPTED)
+async def upload_lab_report(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...)
+):
+    """
+    Upload a lab report image.
+    OCR and the lab report agent pipeline run in a background job; poll GET /jobs/{job_id}.
+    """
     try:
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-
-        print(f"Processing lab report: {file.filename}")
-        result = process_lab_report(file_path)
+        stored = await save_upload(file, LAB_REPORT_DIR, "lab_report")
+        file_path = stored.path
 
-        if result.get("status") == "failed":
-            return JSONResponse(
-                status_code=500,
-                content={"error": "Processing failed", "message": result.get("error", "Unknown error")},
-            )
+        duplicate = await reuse_processed_upload("lab_report", file_path, stored.sha256)
+        if duplicate:
+            return completed_job_response(duplicate, "Lab report already processed")
 
-        print("results:", result)
-        structured_data = result.get("structured_data", {})
+        job = create_job("lab_report", file_path)
+        background_tasks.add_task(run_lab_report_job, job["id"], file_path, stored.sha256)
 
-        # 🔹 Fix: map values properly
-        raw_lab_data = {
-            "report_date": structured_data.get("report_date"),
-            "report_time": structured_data.get("report_time"),
-            "metrics": structured_data.get("metrics", [])
-        }
+        return accepted_job_response(job, "Lab report accepted for processing")
 
-        # optional AI extensions
-        lab_analysis = result.get("lab_analysis", {})
-        lab_risk_scores = result.get("lab_risk_scores", {})
-        lab_summary = result.get("lab_summary", {})
-
-        # Save to database
-        lab_report = Report(
-            file_path=file_path,
-            ocr_text=result.get("ocr_text", ""),
-            report_date=raw_lab_data.get("report_date"),
-            report_time=raw_lab_data.get("report_time"),
-            raw_lab_data=raw_lab_data,
-            lab_analysis=lab_analysis,
-            lab_risk_scores=lab_risk_scores,
-            overall_health_risk_index=lab_risk_scores.get("overall_health_risk_index"),
-            severity=lab_risk_scores.get("severity"),
-            critical_flags=lab_risk_scores.get("critical_flags", []),
-            lab_summary_overview=lab_summary.get("overview"),
-            key_findings=lab_summary.get("key_findings", []),
-            overall_risk=lab_summary.get("overall_risk"),
-            tone=lab_summary.get("tone"),
-            recommendations=lab_summary.get("recommendations", []),
-            critical_alerts=lab_summary.get("critical_alerts", []),
-            structured_data=structured_data
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
+    except Exception as e:
+        print(f"Error saving lab report: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Upload failed", "message": str(e)}
         )
 
-        db.add(lab_report)
-        db.commit()
-        db.refresh(lab_report)
 
-        return {
-            "id": lab_report.id,
-            "message": "Lab report processed successfully",
-            "data": structured_data
-        }
+# Batch lab report upload endpoint
+@app.post("/upload-lab-reports", status_code=status.HTTP_202_ACCEPTED)
+async def upload_lab_reports(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...)
+):
+    """
+    Upload a stack of lab report pages (images/PDFs and/or zip archives of them) at once.
+    All pages are processed concurrently in one background job; poll GET /jobs/{job_id}
+    for progress and per-file record ids or errors.
+    """
+    batch = []
 
+    try:
+        for file in files:
+            if upload_suffix(file.filename) == ".zip":
+                # Archives are only kept until extracted, under a unique name
+                archive = await save_upload(file, LAB_REPORT_BATCH_DIR, "lab_report_batch", filename=f"{uuid.uuid4().hex}.zip")
+                try:
+                    extracted = await run_in_threadpool(extract_lab_report_archive, archive.path, LAB_REPORT_DIR)
+                finally:
+                    os.unlink(archive.path)
+                for member_name, stored in extracted:
+                    batch.append({"filename": member_name, "file_path": stored.path, "content_hash": stored.sha256})
+            else:
+                stored = await save_upload(file, LAB_REPORT_DIR, "lab_report")
+                batch.append({"filename": file.filename, "file_path": stored.path, "content_hash": stored.sha256})
+
+            if len(batch) > MAX_LAB_BATCH_FILES:
+                raise ValueError(f"Batch contains more than {MAX_LAB_BATCH_FILES} documents")
+
+        if not batch:
+            return JSONResponse(
+                status_code=400,
+                content={"error": "No lab reports found", "message": "The upload did not contain any supported documents"}
+            )
+
+        job = create_job("lab_report_batch")
+        background_tasks.add_task(run_lab_report_batch_job, job["id"], batch)
+
+        return accepted_job_response(job, f"{len(batch)} lab reports accepted for processing")
+
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
+    except (ValueError, zipfile.BadZipFile) as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid batch", "message": str(e)}
+        )
     except Exception as e:
-        print(f"Error processing lab report: {str(e)}")
+        print(f"Error saving lab report batch: {str(e)}")
         return JSONResponse(
             status_code=500,
-            content={"error": "Processing failed", "message": str(e)}
+            content={"error": "Upload failed", "message": str(e)}
         )
 
 
 # Upload insurance consultation audio endpoint
-@app.post("/upload-insurance-consultation")
+@app.post("/upload-insurance-consultation", status_code=status.HTTP_202_ACCEPTED)
 async def upload_insurance_consultation(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...)
 ):
     """
-    Upload and process an insurance consultation audio recording.
+    Upload an insurance consultation audio recording.
+    Transcription runs in a background job; poll GET /jobs/{job_id}.
     """
     consultation_dir = "uploads/insurance/audio"
     consultation_transcript_dir = "uploads/insurance/transcripts"
     os.makedirs(consultation_dir, exist_ok=True)
     os.makedirs(consultation_transcript_dir, exist_ok=True)
     
-    file_path = os.path.join(consultation_dir, file.filename)
-    
     try:
-        # Save the uploaded file
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+        # Stream the uploaded file to disk
+        stored = await save_upload(file, consultation_dir, "insurance_consultation")
+        file_path = stored.path
         
-        # Transcribe the consultation
-        print(f"Transcribing insurance consultation: {file.filename}")
-        transcript = transcribe_audio(file_path, output_dir=consultation_transcript_dir)
+        duplicate = await reuse_processed_upload("insurance_consultation", file_path, stored.sha256)
+        if duplicate:
+            return completed_job_response(duplicate, "Insurance consultation already processed")
         
-        return {
-            "message": "Insurance consultation stored successfully",
-            "file_path": file_path,
-            "transcript": transcript
-        }
+        job = create_job("insurance_consultation", file_path)
+        background_tasks.add_task(run_insurance_consultation_job, job["id"], file_path, consultation_transcript_dir, stored.sha256)
+        
+        return accepted_job_response(job, "Insurance consultation accepted for processing")
     
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
     except Exception as e:
-        print(f"Error processing insurance consultation: {str(e)}")
+        print(f"Error saving insurance consultation: {str(e)}")
         return JSONResponse(
             status_code=500,
             content={
-                "error": "Processing failed",
+                "error": "Upload failed",
                 "message": str(e)
             }
         )
 
 
+# Job status endpoint
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """
+    Report the stage (saved / transcribing / ocr / agent / persisted), per-stage timings
+    and, once persisted, the stored record id of an upload processing job.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Job not found", "message": f"No job with id {job_id}"}
+        )
+    return job
+
+
 # Generate overall report endpoint
+def generate_overall_report_in_session(**kwargs) -> dict:
+    """
+    process_overall_report in a session of its own, for the agent stage worker thread
+    (a request-scoped session must not be shared with another thread).
+    """
+    db = SessionLocal()
+    try:
+        return process_overall_report(db, output_dir=OVERALL_REPORT_DIR, **kwargs)
+    finally:
+        db.close()
+
+
 @app.post("/generate-overall-report")
-async def generate_overall_report(db: Session = Depends(get_db)):
+async def generate_overall_report(full: bool = False):
     """
     Generate a comprehensive overall medical report by:
-    1. Retrieving all check-ins, prescriptions, and lab reports
-    2. Sending aggregated data to report_agent
+    1. Retrieving the check-ins, prescriptions, and lab reports added since the last
+       overall report (or all of them for a full rebuild, forced with ?full=true)
+    2. Sending them, with the previous report, to report_agent
     3. Generating PDF report
     4. Saving OverallReport to database
     """
@@ -426,7 +512,8 @@ async def generate_overall_report(db: Session = Depends(get_db)):
         print("Starting overall report generation...")
         
         # Process overall report (retrieve data, call agent, generate PDF, save to DB)
-        result = process_overall_report(db, output_dir=OVERALL_REPORT_DIR)
+        # The agent run blocks for minutes; keep it off the event loop
+        result = await run_in_stage("agent", generate_overall_report_in_session, full_rebuild=full)
         
         if result.get("status") == "failed":
             return JSONResponse(
@@ -451,6 +538,8 @@ async def generate_overall_report(db: Session = Depends(get_db)):
             "id": result.get("id"),
             "message": "Overall report generated successfully",
             "pdf_file_path": result.get("pdf_file_path"),
+            "generation": (result.get("structured_data") or {}).get("generation"),
+            "reused": result.get("reused", False),
             "status": "success"
         }
     
@@ -467,9 +556,85 @@ async def generate_overall_report(db: Session = Depends(get_db)):
         )
 
 
+background_report_tasks = set()
+
+
+def sse_event(event: str, data: dict) -> str:
+    """
+    Format one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Generate overall report with live progress (server-sent events)
+@app.get("/generate-overall-report/stream")
+async def generate_overall_report_stream(full: bool = False):
+    """
+    Same as POST /generate-overall-report, but streams progress as server-sent events:
+    - stage: {"stage": "collecting" | "agent" | "pdf"}
+    - section: one per completed report_agent step (timeline, clinical_trends,
+      risk_and_severity, ...) with its data, as soon as the sub-agent finishes
+    - complete: {"id", "pdf_file_path", "generation", "reused", "status"} once the report is saved
+    - error: {"error", "message"} if generation failed
+    The report is still generated and saved if the client disconnects.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_progress(event: str, data: dict) -> None:
+        # Called from the agent executor / ADK client threads
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    async def run_report() -> None:
+        try:
+            result = await run_in_stage(
+                "agent", generate_overall_report_in_session, on_progress=on_progress, full_rebuild=full
+            )
+        except Exception as e:
+            result = {"status": "failed", "error": str(e)}
+
+        if result.get("status") == "success":
+            on_progress("complete", {
+                "id": result.get("id"),
+                "pdf_file_path": result.get("pdf_file_path"),
+                "generation": (result.get("structured_data") or {}).get("generation"),
+                "reused": result.get("reused", False),
+                "status": "success"
+            })
+        elif result.get("status") == "no_json_found":
+            on_progress("error", {
+                "error": "No structured data found in agent response",
+                "message": "The report agent did not return structured data in the expected format"
+            })
+        else:
+            on_progress("error", {
+                "error": "Report generation failed",
+                "message": result.get("error", "Unknown error")
+            })
+
+    # Keep a reference so the report finishes even if the client goes away
+    task = asyncio.create_task(run_report())
+    background_report_tasks.add(task)
+    task.add_done_callback(background_report_tasks.discard)
+
+    async def stream():
+        while True:
+            event, data = await events.get()
+            yield sse_event(event, data)
+            if event in ("complete", "error"):
+                break
+        await task
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Get latest overall report endpoint
 @app.get("/latest-overall-report")
-async def get_latest_overall_report(db: Session = Depends(get_db)):
+def get_latest_overall_report(db: Session = Depends(get_db)):
     """
     Get the most recently generated overall report
     """
@@ -7,6 +7,7 @@ from db.database import get_db
 from db.models import Prescription
 from schemas import PrescriptionSchema
 from marshmallow import ValidationError
+from utils.medications import compute_medication_overview
 import json
 import traceback
 
@@ -34,7 +35,7 @@ def safe_parse_json(data, default=None):
     return default
 
 
-# IMPORTANT: /summaries must be defined BEFORE /{prescription_id} to avoid route conflicts
+# IMPORTANT: /summaries and /medications must be defined BEFORE /{prescription_id} to avoid route conflicts
 @router.get("/summaries")
 def get_prescription_summaries(
     limit: int = Query(default=20, ge=1, le=100),
@@ -102,6 +103,21 @@ def get_prescription_summaries(
         raise HTTPException(status_code=500, detail=f"Error fetching prescriptions: {str(e)}")
 
 
+@router.get("/medications")
+def get_medication_overview(db: Session = Depends(get_db)):
+    """
+    Current and past medications and the medication timeline, computed from all
+    stored prescriptions without an agent call. Medicines that cannot be dated are
+    listed under "ambiguous".
+    """
+    try:
+        return {"success": True, **compute_medication_overview(db)}
+    except Exception as e:
+        print(f"Error in get_medication_overview: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Error aggregating medications: {str(e)}")
+
+
 @router.get("", response_model=dict)
 def get_all_prescriptions(db: Session = Depends(get_db)):
     """Get all prescriptions"""
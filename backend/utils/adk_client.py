@@ -0,0 +1,569 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Coroutine, List, Tuple, Callable
+
+import aiohttp
+
+from utils.resilience import retry_async, get_circuit_breaker, CircuitOpenError, DeadlineExceeded
+from utils.agent_cache import agent_cache_key, get_cached_response, put_cached_response
+from utils.singleflight import get_single_flight
+from utils.scheduler import get_scheduler, current_priority
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ADK_SERVER_URL = os.getenv("ADK_SERVER_URL", "http://localhost:5010")
+ADK_USER_ID = "u_backend"
+
+# Connection pool shared by every agent call
+ADK_MAX_CONNECTIONS = int(os.getenv("ADK_MAX_CONNECTIONS", "64"))
+ADK_MAX_CONNECTIONS_PER_HOST = int(os.getenv("ADK_MAX_CONNECTIONS_PER_HOST", "32"))
+ADK_KEEPALIVE_SECONDS = float(os.getenv("ADK_KEEPALIVE_SECONDS", "60"))
+
+ADK_SESSION_TIMEOUT = int(os.getenv("ADK_SESSION_TIMEOUT", "60"))
+ADK_RUN_TIMEOUT = int(os.getenv("ADK_RUN_TIMEOUT", "600"))
+
+# Warm sessions kept per app so a call only needs the /run request (0 disables the pool)
+ADK_SESSION_POOL_SIZE = int(os.getenv("ADK_SESSION_POOL_SIZE", "4"))
+# Pooled sessions older than this are discarded instead of used
+ADK_SESSION_MAX_AGE_SECONDS = float(os.getenv("ADK_SESSION_MAX_AGE_SECONDS", "1800"))
+# Largest single /run_sse event accepted; the final report_agent stateDelta is one (long) line
+ADK_SSE_MAX_EVENT_BYTES = int(os.getenv("ADK_SSE_MAX_EVENT_MB", "64")) * 1024 * 1024
+SSE_READ_CHUNK_BYTES = 64 * 1024
+
+
+class SessionPool:
+    """
+    Pre-created ADK sessions for one app. Each session is used for exactly one run;
+    the pool is topped up in the background after every take, so under steady load
+    agent calls skip the session round-trip. Lives on the client loop.
+    """
+
+    def __init__(self, client: "ADKClient", agent_name: str, size: int):
+        self.client = client
+        self.agent_name = agent_name
+        self.size = size
+        self._sessions: List[Tuple[str, float]] = []
+        self._creating = 0
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.expired = 0
+        self.create_failures = 0
+        self.discarded = 0
+
+    def take(self) -> Optional[str]:
+        """
+        A fresh warm session id, or None on a miss. Schedules a refill either way.
+        """
+        now = time.monotonic()
+        session_id = None
+        while self._sessions:
+            candidate, created_at = self._sessions.pop(0)
+            if now - created_at <= ADK_SESSION_MAX_AGE_SECONDS:
+                session_id = candidate
+                break
+            self.expired += 1
+
+        if session_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        self.refill()
+        return session_id
+
+    def discard(self) -> None:
+        """
+        Drop every warm session, e.g. after the ADK server restarted and forgot them.
+        Sessions still being created are kept; they belong to the running server.
+        """
+        self.discarded += len(self._sessions)
+        self._sessions.clear()
+        self.refill()
+
+    def refill(self) -> None:
+        """
+        Start background session creation until the pool (plus pending creations) is full.
+        """
+        missing = self.size - len(self._sessions) - self._creating
+        for _ in range(max(0, missing)):
+            self._creating += 1
+            asyncio.ensure_future(self._create_one())
+
+    async def _create_one(self) -> None:
+        session_id = f"s_{uuid.uuid4().hex[:8]}"
+        try:
+            await self.client.create_session(self.agent_name, session_id)
+            self._sessions.append((session_id, time.monotonic()))
+            self.created += 1
+        except Exception as e:
+            # The next take() will miss and retry; the call itself still creates its own session
+            self.create_failures += 1
+            logger.warning(f"Could not pre-create a session for {self.agent_name}: {e}")
+        finally:
+            self._creating -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": self.size,
+            "available": len(self._sessions),
+            "creating": self._creating,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "created": self.created,
+            "expired": self.expired,
+            "create_failures": self.create_failures,
+            "discarded": self.discarded,
+        }
+
+
+class ADKClient:
+    """
+    Async client for the ADK API server with one pooled, keep-alive HTTP session.
+
+    All requests run on a dedicated event loop thread, so the same connection pool
+    serves coroutines on the server's event loop (call_agent) as well as blocking
+    code on executor threads (call_agent_blocking), and concurrent agent calls
+    overlap on that loop instead of each holding a thread.
+    """
+
+    def __init__(self, base_url: str = ADK_SERVER_URL):
+        self.base_url = base_url.rstrip("/")
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_pools: Dict[str, SessionPool] = {}
+        self._breaker = get_circuit_breaker("adk")
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "total_seconds": 0.0,
+        }
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="adk-client", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the client loop; returns a concurrent.futures.Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Only ever called on the client loop, so no locking is needed
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=ADK_MAX_CONNECTIONS,
+                limit_per_host=ADK_MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=ADK_KEEPALIVE_SECONDS,
+            )
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=connector,
+                headers={"Content-Type": "application/json"},
+            )
+        return self._session
+
+    async def create_session(
+        self,
+        agent_name: str,
+        session_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> None:
+        """
+        Create an ADK session for the app; raises ADKError if the server refuses it.
+        """
+        session = await self._get_session()
+        async with session.post(
+            f"/apps/{agent_name}/users/{ADK_USER_ID}/sessions/{session_id}",
+            json={"state": state or {}},
+            timeout=_client_timeout(ADK_SESSION_TIMEOUT, timeout),
+        ) as response:
+            if response.status != 200:
+                raise ADKError(f"Session creation failed for {agent_name}", await response.text(), response.status)
+
+    @staticmethod
+    def _run_payload(agent_name: str, session_id: str, text: str) -> Dict[str, Any]:
+        return {
+            "app_name": agent_name,
+            "user_id": ADK_USER_ID,
+            "session_id": session_id,
+            "new_message": {
+                "role": "user",
+                "parts": [{"text": text}]
+            }
+        }
+
+    async def run(self, agent_name: str, session_id: str, text: str, timeout: Optional[float] = None) -> Any:
+        """
+        POST /run for an existing session and return the decoded event list.
+        """
+        payload = self._run_payload(agent_name, session_id, text)
+        session = await self._get_session()
+        async with session.post(
+            "/run", json=payload, timeout=_client_timeout(ADK_RUN_TIMEOUT, timeout)
+        ) as response:
+            if response.status != 200:
+                raise ADKError(f"{agent_name} run failed", await response.text(), response.status)
+            return json.loads(await response.text())
+
+    async def run_sse(
+        self,
+        agent_name: str,
+        session_id: str,
+        text: str,
+        on_event: Callable[[Dict[str, Any]], None],
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        POST /run_sse and hand every event to on_event as soon as it arrives
+        (called on the client loop thread). Returns all events, like /run.
+        """
+        payload = dict(self._run_payload(agent_name, session_id, text), streaming=False)
+        session = await self._get_session()
+        events = []
+        async with session.post(
+            "/run_sse", json=payload, timeout=_client_timeout(ADK_RUN_TIMEOUT, timeout)
+        ) as response:
+            if response.status != 200:
+                raise ADKError(f"{agent_name} run failed", await response.text(), response.status)
+
+            async for data in _sse_data_lines(response.content, agent_name):
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError as e:
+                    raise ADKError(f"{agent_name} sent an unreadable event", str(e))
+                if isinstance(event, dict) and "error" in event and len(event) == 1:
+                    raise ADKError(f"{agent_name} run failed", str(event["error"]))
+                events.append(event)
+                on_event(event)
+        return events
+
+    def _session_pool(self, agent_name: str) -> SessionPool:
+        if agent_name not in self._session_pools:
+            self._session_pools[agent_name] = SessionPool(self, agent_name, ADK_SESSION_POOL_SIZE)
+        return self._session_pools[agent_name]
+
+    async def _acquire_session(self, agent_name: str, timeout: Optional[float] = None) -> Tuple[str, bool]:
+        """
+        (session_id, pooled): a warm session from the app's pool, or a newly created one
+        when the pool is empty.
+        """
+        if ADK_SESSION_POOL_SIZE > 0:
+            session_id = self._session_pool(agent_name).take()
+            if session_id is not None:
+                return session_id, True
+
+        session_id = f"s_{uuid.uuid4().hex[:8]}"
+        await self.create_session(agent_name, session_id, timeout=timeout)
+        return session_id, False
+
+    async def _warm_up(self, agent_names: List[str]) -> None:
+        for agent_name in agent_names:
+            self._session_pool(agent_name).refill()
+
+    def warm_up(self, agent_names: List[str]) -> None:
+        """
+        Fill the session pools of the given apps ahead of the first call.
+        """
+        if ADK_SESSION_POOL_SIZE > 0:
+            self.submit(self._warm_up(agent_names))
+
+    async def _call_agent(
+        self,
+        agent_name: str,
+        text: str,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[str] = None
+    ) -> Any:
+        if on_event is not None:
+            return await self._call_agent_once(agent_name, text, on_event, timeout, priority)
+
+        # Identical concurrent requests (a double-submitted upload, a retried request)
+        # share one agent run instead of paying for it twice
+        key = f"{agent_name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+        try:
+            result, shared = await get_single_flight("adk_agent").do_async(
+                key, lambda: self._call_agent_once(agent_name, text, timeout=timeout, priority=priority), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return {"error": f"{agent_name} request timed out"}
+        if shared:
+            logger.info(f"{agent_name} response shared with an identical in-flight call")
+        return result
+
+    async def _call_agent_once(
+        self,
+        agent_name: str,
+        text: str,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[str] = None
+    ) -> Any:
+        started = time.perf_counter()
+        self._stats["in_flight"] += 1
+        self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+        failed = True
+
+        async def run_in_session(session_id: str, remaining: Optional[float]) -> Any:
+            if on_event is None:
+                return await self.run(agent_name, session_id, text, timeout=remaining)
+            return await self.run_sse(agent_name, session_id, text, on_event, timeout=remaining)
+
+        async def attempt(remaining: Optional[float]) -> Any:
+            # Every attempt takes a token from the ADK rate limit, then gets a fresh
+            # session and only the time left in the budget
+            waited = await get_scheduler("adk").acquire(priority, timeout=remaining)
+            if remaining is not None:
+                remaining -= waited
+            session_id, pooled = await self._acquire_session(agent_name, timeout=remaining)
+            try:
+                return await run_in_session(session_id, remaining)
+            except ADKError as e:
+                if not (pooled and is_unknown_session_error(e)):
+                    raise
+                # The ADK server restarted since the pool was filled: every pooled session
+                # is gone, so drop them and run once more on a session created now
+                logger.warning(f"{agent_name} pooled session {session_id} is unknown to the server; discarding the pool")
+                self._session_pool(agent_name).discard()
+                session_id = f"s_{uuid.uuid4().hex[:8]}"
+                await self.create_session(agent_name, session_id, timeout=remaining)
+                return await run_in_session(session_id, remaining)
+
+        try:
+            # Deterministic agents answer the same input identically; reuse stored responses.
+            # Hashing the agent sources and sqlite access block, so they run off the loop
+            cache_key = await asyncio.to_thread(agent_cache_key, agent_name, text)
+            if cache_key is not None:
+                cached = await asyncio.to_thread(get_cached_response, cache_key)
+                if cached is not None:
+                    logger.info(f"{agent_name} response served from the agent cache")
+                    if on_event is not None:
+                        for event in cached:
+                            on_event(event)
+                    failed = False
+                    return cached
+
+            logger.info(f"Calling {agent_name} at {self.base_url}")
+            result = await retry_async(
+                attempt, is_retryable_adk_error, breaker=self._breaker,
+                timeout=timeout, description=f"{agent_name} call"
+            )
+            logger.info(f"{agent_name} completed successfully")
+            if cache_key is not None and isinstance(result, list):
+                await asyncio.to_thread(put_cached_response, cache_key, agent_name, result)
+            failed = False
+            return result
+
+        except CircuitOpenError as e:
+            return {"error": f"{agent_name} not called: {str(e)}"}
+
+        except DeadlineExceeded as e:
+            return {"error": f"{agent_name} request timed out: {str(e)}"}
+
+        except ADKError as e:
+            return {"error": e.message, "details": e.details}
+
+        except asyncio.TimeoutError:
+            return {"error": f"{agent_name} request timed out"}
+
+        except aiohttp.ClientError as e:
+            return {"error": f"{agent_name} request failed: {str(e)}"}
+
+        except json.JSONDecodeError:
+            return {"error": f"{agent_name} returned invalid JSON"}
+
+        finally:
+            self._stats["in_flight"] -= 1
+            self._stats["calls"] += 1
+            self._stats["total_seconds"] += time.perf_counter() - started
+            if failed:
+                self._stats["failures"] += 1
+
+    async def call_agent(self, agent_name: str, text: str, timeout: Optional[float] = None) -> Any:
+        """
+        Call a single ADK agent (session creation + /run request) from any event loop.
+        Transient failures are retried within timeout seconds (the stage budget).
+        The call is rate limited at the caller's request priority.
+        Returns the /run event list, or {"error": ...} on failure.
+        """
+        return await asyncio.wrap_future(
+            self.submit(self._call_agent(agent_name, text, timeout=timeout, priority=current_priority()))
+        )
+
+    def call_agent_blocking(self, agent_name: str, text: str, timeout: Optional[float] = None) -> Any:
+        """
+        Same as call_agent for synchronous code running on a worker thread.
+        """
+        return self.submit(self._call_agent(agent_name, text, timeout=timeout, priority=current_priority())).result()
+
+    def stream_agent_blocking(
+        self,
+        agent_name: str,
+        text: str,
+        on_event: Callable[[Dict[str, Any]], None],
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Like call_agent_blocking, but runs through the streaming endpoint and calls
+        on_event (on the client loop thread) for each event as the agent produces it.
+        """
+        return self.submit(
+            self._call_agent(agent_name, text, on_event, timeout=timeout, priority=current_priority())
+        ).result()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        total_seconds = stats.pop("total_seconds")
+        stats["avg_call_seconds"] = round(total_seconds / stats["calls"], 3) if stats["calls"] else 0.0
+        stats["max_connections"] = ADK_MAX_CONNECTIONS
+        stats["max_connections_per_host"] = ADK_MAX_CONNECTIONS_PER_HOST
+        stats["session_pools"] = {name: pool.stats() for name, pool in list(self._session_pools.items())}
+        return stats
+
+    def close(self) -> None:
+        """
+        Close the pooled connections and stop the client loop.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        async def close_session():
+            self._session_pools.clear()
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_session(), loop).result(timeout=10)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=10)
+            loop.close()
+
+
+class ADKError(Exception):
+    """
+    Non-200 response from the ADK server.
+    """
+
+    def __init__(self, message: str, details: str = "", status: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+        self.status = status
+
+
+async def _sse_data_lines(content: aiohttp.StreamReader, agent_name: str):
+    """
+    Payloads of the "data:" lines of an SSE stream. Lines are split from raw chunks
+    rather than with readline, whose buffer limit (about 128 KiB) a large stateDelta
+    exceeds; a line over ADK_SSE_MAX_EVENT_BYTES raises ADKError.
+    """
+    buffer = bytearray()
+    async for chunk in content.iter_chunked(SSE_READ_CHUNK_BYTES):
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line.startswith(b"data:"):
+                yield line[len(b"data:"):]
+        del buffer[:start]
+        if len(buffer) > ADK_SSE_MAX_EVENT_BYTES:
+            raise ADKError(f"{agent_name} sent an event over {ADK_SSE_MAX_EVENT_BYTES // (1024 * 1024)} MB")
+
+    line = bytes(buffer).strip()
+    if line.startswith(b"data:"):
+        yield line[len(b"data:"):]
+
+
+def is_retryable_adk_error(error: Exception) -> bool:
+    """
+    Connection problems, timeouts, rate limiting and 5xx responses are worth retrying;
+    other error responses would fail the same way again.
+    """
+    if isinstance(error, ADKError):
+        return error.status is None or error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+def is_unknown_session_error(error: ADKError) -> bool:
+    """
+    The server does not know the session (404 "Session not found"), as happens to
+    pooled sessions after the ADK server restarts.
+    """
+    return error.status == 404 or "session not found" in str(error.details or "").lower()
+
+
+def _client_timeout(default: float, budget: Optional[float]) -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=default if budget is None else max(0.001, min(default, budget)))
+
+
+_client = ADKClient()
+
+
+def get_adk_client() -> ADKClient:
+    return _client
+
+
+async def call_agent(agent_name: str, text: str, timeout: Optional[float] = None) -> Any:
+    return await _client.call_agent(agent_name, text, timeout=timeout)
+
+
+def call_agent_blocking(agent_name: str, text: str, timeout: Optional[float] = None) -> Any:
+    return _client.call_agent_blocking(agent_name, text, timeout=timeout)
+
+
+def stream_agent_blocking(
+    agent_name: str,
+    text: str,
+    on_event: Callable[[Dict[str, Any]], None],
+    timeout: Optional[float] = None
+) -> Any:
+    return _client.stream_agent_blocking(agent_name, text, on_event, timeout=timeout)
+
+
+def run_blocking(coro: Coroutine) -> Any:
+    """
+    Run an agent coroutine to completion from synchronous code.
+    """
+    return _client.submit(coro).result()
+
+
+def warm_up_session_pools(agent_names: List[str]) -> None:
+    _client.warm_up(agent_names)
+
+
+def adk_client_stats() -> Dict[str, Any]:
+    return _client.stats()
+
+
+def close_adk_client() -> None:
+    _client.close()
@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import logging
+import importlib.util
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.agent_cache import AI_PIPELINE_DIR
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_JSON_BLOCK_PATTERN = re.compile(r"```json\s*\n(.*?)\n```", re.DOTALL)
+
+_pipeline_models: Dict[Tuple[str, str], Any] = {}
+
+
+def load_pipeline_model(app: str, model_name: str):
+    """
+    Load a pydantic schema from ai-pipeline/<app>/models.py by file path, so the backend
+    validates against the same classes the agents use as output_schema without importing
+    the agent packages (and google.adk) themselves. Returns None if unavailable.
+    """
+    key = (app, model_name)
+    if key not in _pipeline_models:
+        path = os.path.join(AI_PIPELINE_DIR, app, "models.py")
+        model = None
+        try:
+            spec = importlib.util.spec_from_file_location(f"_pipeline_{app}_models", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            model = getattr(module, model_name)
+        except Exception as e:
+            logger.warning(f"Could not load {model_name} from {path}: {e}")
+        _pipeline_models[key] = model
+    return _pipeline_models[key]
+
+
+class AgentResponseSpec:
+    """
+    What to pull out of an agent's event list: the state keys its sub-agents write
+    (output_key) and the pipeline model the result is validated into. With a single key
+    the model validates that key's value, otherwise the dict of all keys.
+    """
+
+    def __init__(self, app: str, keys: Tuple[str, ...], model_name: Optional[str] = None, models_app: Optional[str] = None):
+        self.app = app
+        self.keys = keys
+        self.model_name = model_name
+        self.models_app = models_app or app
+
+    @property
+    def model(self):
+        if self.model_name is None:
+            return None
+        return load_pipeline_model(self.models_app, self.model_name)
+
+
+PRESCRIPTION_RESPONSE = AgentResponseSpec("prescription_agent", ("prescription_data",), "PrescriptionData")
+LAB_REPORT_RESPONSE = AgentResponseSpec(
+    "lab_report_agent",
+    ("raw_lab_data", "lab_analysis", "lab_risk_scores", "lab_summary"),
+    "FinalLabReport"
+)
+CONVERSATION_SUMMARY_RESPONSE = AgentResponseSpec(
+    "conversation_summarizer_agent", ("conversation_summary",), "ConversationSummary", models_app="report_agent"
+)
+OVERALL_REPORT_RESPONSE = AgentResponseSpec(
+    "report_agent",
+    ("timeline", "trend_commentary", "risk_and_severity", "possible_conditions", "medication_overview", "final_report"),
+    "PatientHealthReport"
+)
+
+
+def _parse_json_text(text: str) -> Optional[Any]:
+    """Direct JSON, else the first ```json block that parses."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    for match in _JSON_BLOCK_PATTERN.findall(text):
+        try:
+            return json.loads(match)
+        except json.JSONDecodeError:
+            logger.warning("Failed to parse a JSON block")
+    return None
+
+
+def _event_texts(event: Dict[str, Any]) -> List[str]:
+    parts = (event.get("content") or {}).get("parts") or []
+    return [part["text"] for part in parts if isinstance(part, dict) and isinstance(part.get("text"), str)]
+
+
+def extract_json_from_events(events: Any) -> Optional[Any]:
+    """
+    Fallback for agents that do not write state: the JSON in the latest text part
+    that contains any, scanning from the end and stopping at the first hit.
+    """
+    if not isinstance(events, list):
+        return None
+    for event in reversed(events):
+        if not isinstance(event, dict):
+            continue
+        for text in reversed(_event_texts(event)):
+            parsed = _parse_json_text(text)
+            if parsed is not None:
+                return parsed
+    return None
+
+
+def parse_adk_response(events: Any, spec: AgentResponseSpec) -> Dict[str, Any]:
+    """
+    Single pass over an ADK /run event list, from the end: keeps the last stateDelta
+    value of each expected key and stops as soon as every key is found, then validates
+    the result into the spec's pipeline model.
+
+    Returns {"data", "model", "missing", "validation_error"}: data maps each found key to
+    its value (normalised through the model when validation succeeds), model is the
+    validated instance or None.
+    """
+    data: Dict[str, Any] = {}
+    if isinstance(events, list):
+        wanted = set(spec.keys)
+        for event in reversed(events):
+            if not isinstance(event, dict):
+                continue
+            state_delta = (event.get("actions") or {}).get("stateDelta") or {}
+            for key in wanted.intersection(state_delta):
+                value = state_delta[key]
+                if isinstance(value, str):
+                    value = _parse_json_text(value) or value
+                data[key] = value
+            wanted.difference_update(state_delta)
+            if not wanted:
+                break
+
+    if not data:
+        fallback = extract_json_from_events(events)
+        if isinstance(fallback, dict):
+            data = {spec.keys[0]: fallback} if len(spec.keys) == 1 else fallback
+
+    missing = [key for key in spec.keys if key not in data]
+    result = {"data": data, "model": None, "missing": missing, "validation_error": None}
+
+    model = spec.model
+    if model is None or missing:
+        return result
+
+    try:
+        if len(spec.keys) == 1:
+            instance = model.model_validate(data[spec.keys[0]])
+            result["data"] = dict(data, **{spec.keys[0]: instance.model_dump()})
+        else:
+            instance = model.model_validate({key: data[key] for key in spec.keys})
+            result["data"] = dict(data, **instance.model_dump())
+        result["model"] = instance
+    except Exception as e:
+        logger.warning(f"{spec.app} response does not match {spec.model_name}: {e}")
+        result["validation_error"] = str(e)
+
+    return result
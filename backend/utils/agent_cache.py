@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Agent definitions (prompts, models, schemas); their content is part of every cache key
+AI_PIPELINE_DIR = os.getenv(
+    "AI_PIPELINE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "ai-pipeline")
+)
+
+AGENT_CACHE_ENABLED = os.getenv("AGENT_CACHE_ENABLED", "true").lower() == "true"
+AGENT_CACHE_PATH = os.getenv("AGENT_CACHE_PATH", "data/agent_cache.sqlite3")
+AGENT_CACHE_TTL_SECONDS = float(os.getenv("AGENT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Least recently used responses are evicted once the cache grows past this size
+AGENT_CACHE_MAX_BYTES = int(os.getenv("AGENT_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+_TEMPERATURE_PATTERN = re.compile(r"temperature\s*=\s*([0-9.]+)")
+
+_lock = threading.Lock()
+_connection: Optional[sqlite3.Connection] = None
+_fingerprints: Dict[str, Tuple[tuple, Optional[str]]] = {}
+_stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0, "uncacheable": 0}
+
+
+def _app_files(agent_name: str) -> List[str]:
+    app_dir = os.path.join(AI_PIPELINE_DIR, agent_name)
+    files = []
+    for root, dirs, names in os.walk(app_dir):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(".py"))
+    return files
+
+
+def app_fingerprint(agent_name: str) -> Optional[str]:
+    """
+    Hash of every source file of the agent app (instructions, models, schemas, configs),
+    or None if the app is not deterministic (some temperature above 0) or not found.
+    Editing a prompt changes the fingerprint, so old responses are simply never hit again.
+    """
+    files = _app_files(agent_name)
+    signature = tuple((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in files)
+
+    with _lock:
+        cached = _fingerprints.get(agent_name)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    fingerprint = None
+    if files:
+        digest = hashlib.sha256()
+        temperatures = []
+        for path in files:
+            with open(path, "rb") as f:
+                content = f.read()
+            digest.update(os.path.relpath(path, AI_PIPELINE_DIR).encode("utf-8"))
+            digest.update(content)
+            temperatures.extend(float(value) for value in _TEMPERATURE_PATTERN.findall(content.decode("utf-8", "ignore")))
+
+        if temperatures and all(value == 0.0 for value in temperatures):
+            fingerprint = digest.hexdigest()
+        else:
+            logger.info(f"Not caching {agent_name}: not every sub-agent runs at temperature 0")
+
+    with _lock:
+        _fingerprints[agent_name] = (signature, fingerprint)
+    return fingerprint
+
+
+def _db() -> sqlite3.Connection:
+    """Open the cache database once. Caller holds _lock."""
+    global _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(AGENT_CACHE_PATH) or ".", exist_ok=True)
+        _connection = sqlite3.connect(AGENT_CACHE_PATH, check_same_thread=False, isolation_level=None)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, agent TEXT NOT NULL, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+        )
+        _connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at)")
+    return _connection
+
+
+def agent_cache_key(agent_name: str, text: str) -> Optional[str]:
+    """
+    Key over (agent, agent definition fingerprint, input), or None when the agent's
+    responses must not be cached.
+    """
+    if not AGENT_CACHE_ENABLED:
+        return None
+    fingerprint = app_fingerprint(agent_name)
+    if fingerprint is None:
+        with _lock:
+            _stats["uncacheable"] += 1
+        return None
+    input_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{agent_name}:{fingerprint}:{input_hash}".encode("utf-8")).hexdigest()
+
+
+def get_cached_response(key: str) -> Optional[Any]:
+    now = time.time()
+    with _lock:
+        db = _db()
+        row = db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _stats["misses"] += 1
+            return None
+        if now - row[1] > AGENT_CACHE_TTL_SECONDS:
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            _stats["expired"] += 1
+            _stats["misses"] += 1
+            return None
+        db.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+        _stats["hits"] += 1
+    return json.loads(row[0])
+
+
+def put_cached_response(key: str, agent_name: str, response: Any) -> None:
+    encoded = json.dumps(response, separators=(",", ":"), default=str)
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO responses (key, agent, response, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, agent_name, encoded, len(encoded), now, now)
+        )
+        _stats["stores"] += 1
+        _evict_if_needed(db)
+
+
+def _evict_if_needed(db: sqlite3.Connection) -> None:
+    """Drop expired entries, then least recently used ones until under the size cap. Caller holds _lock."""
+    db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - AGENT_CACHE_TTL_SECONDS,))
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= AGENT_CACHE_MAX_BYTES:
+        return
+
+    evicted = []
+    for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used_at"):
+        if total <= AGENT_CACHE_MAX_BYTES:
+            break
+        evicted.append((key,))
+        total -= size
+    db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+    _stats["evictions"] += len(evicted)
+    logger.info(f"Agent cache evicted {len(evicted)} responses")
+
+
+def agent_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats, enabled=AGENT_CACHE_ENABLED, max_bytes=AGENT_CACHE_MAX_BYTES)
+        if _connection is not None:
+            count, size = _connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            stats.update(entries=count, bytes=size)
+    return stats
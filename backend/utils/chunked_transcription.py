@@ -0,0 +1,152 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# whisperx.load_audio always resamples to 16 kHz mono
+SAMPLE_RATE = 16000
+
+# Voice activity detection: RMS energy per frame compared to the recording's noise floor,
+# capped at a fraction of the median level so mostly-speech recordings still find pauses
+VAD_FRAME_SECONDS = 0.03
+VAD_NOISE_PERCENTILE = 5
+VAD_THRESHOLD_FACTOR = 3.0
+VAD_MEDIAN_FRACTION = 0.3
+VAD_MIN_THRESHOLD = 1e-4
+
+# Per chunk-worker process state (models are loaded once per process by the initializer)
+_chunk_state: Dict[str, Any] = {}
+
+
+def find_chunk_boundaries(audio: np.ndarray, target_seconds: float, search_seconds: float = 15.0) -> List[Tuple[int, int]]:
+    """
+    Split audio into roughly target_seconds long chunks, cutting in the middle of the
+    longest pause near each target boundary so no chunk starts or ends mid-speech.
+    Falls back to a hard cut when there is no pause in the search window.
+    Returns (start_sample, end_sample) pairs covering the whole recording.
+    """
+    total = len(audio)
+    target = int(target_seconds * SAMPLE_RATE)
+    if total <= target:
+        return [(0, total)]
+
+    frame = int(VAD_FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = total // frame
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+    threshold = max(
+        min(np.percentile(rms, VAD_NOISE_PERCENTILE) * VAD_THRESHOLD_FACTOR, np.median(rms) * VAD_MEDIAN_FRACTION),
+        VAD_MIN_THRESHOLD,
+    )
+    silent = rms < threshold
+
+    search = int(search_seconds / VAD_FRAME_SECONDS)
+    boundaries = []
+    start = 0
+    while total - start > target + target // 4:
+        ideal = (start + target) // frame
+        lo, hi = max(ideal - search, start // frame + 1), min(ideal + search, n_frames - 1)
+        window = silent[lo:hi]
+
+        cut_frame = ideal
+        if window.any():
+            # Longest run of silent frames in the window; cut at its midpoint
+            padded = np.concatenate(([False], window, [False])).astype(np.int8)
+            edges = np.flatnonzero(np.diff(padded))
+            run_starts, run_ends = edges[0::2], edges[1::2]
+            longest = int(np.argmax(run_ends - run_starts))
+            cut_frame = lo + (run_starts[longest] + run_ends[longest]) // 2
+
+        cut = int(cut_frame) * frame
+        boundaries.append((start, cut))
+        start = cut
+
+    boundaries.append((start, total))
+    return boundaries
+
+
+def _init_chunk_worker(config: Dict[str, Any]) -> None:
+    """
+    Chunk worker initializer: load the ASR and alignment models once per process,
+    with the CPU threads split evenly between workers.
+    """
+    import torch
+    import whisperx
+
+    threads = max(1, (os.cpu_count() or 1) // config["chunk_workers"])
+    torch.set_num_threads(threads)
+    _chunk_state["asr"] = whisperx.load_model(
+        config["model"], config["device"], compute_type=config["compute_type"],
+        language=config["language"], threads=threads
+    )
+    _chunk_state["align"] = whisperx.load_align_model(language_code=config["language"], device=config["device"])
+    _chunk_state["config"] = config
+
+
+def _transcribe_chunk(audio_chunk: np.ndarray, offset: float) -> List[Dict[str, Any]]:
+    """
+    Transcribe and align one chunk, shifting all timestamps by the chunk offset.
+    Word timings are kept so speakers can be assigned after stitching.
+    """
+    import whisperx
+
+    config = _chunk_state["config"]
+    result = _chunk_state["asr"].transcribe(audio_chunk, batch_size=config["batch_size"], language=config["language"])
+    align_model, metadata = _chunk_state["align"]
+    result = whisperx.align(result["segments"], align_model, metadata, audio_chunk, config["device"], return_char_alignments=False)
+
+    segments = []
+    for segment in result["segments"]:
+        segment = dict(segment)
+        for key in ("start", "end"):
+            if segment.get(key) is not None:
+                segment[key] = round(float(segment[key]) + offset, 3)
+        words = []
+        for word in segment.get("words", []):
+            word = dict(word)
+            for key in ("start", "end"):
+                if word.get(key) is not None:
+                    word[key] = round(float(word[key]) + offset, 3)
+            words.append(word)
+        segment["words"] = words
+        segments.append(segment)
+    return segments
+
+
+def create_chunk_pool(config: Dict[str, Any]) -> ProcessPoolExecutor:
+    """
+    Process pool whose workers each keep their own copy of the models loaded.
+    """
+    import multiprocessing
+
+    return ProcessPoolExecutor(
+        max_workers=config["chunk_workers"],
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_chunk_worker,
+        initargs=(config,),
+    )
+
+
+def transcribe_chunked(pool: ProcessPoolExecutor, audio: np.ndarray, chunk_seconds: float) -> Dict[str, Any]:
+    """
+    Transcribe a long recording by splitting it on pauses and transcribing the chunks in
+    parallel on the pool. Returns {"segments": [...]} in chronological order with
+    recording-relative timestamps (word timings included, speakers not yet assigned).
+    """
+    boundaries = find_chunk_boundaries(audio, chunk_seconds)
+    logger.info(f"Transcribing {len(audio) / SAMPLE_RATE:.0f}s of audio in {len(boundaries)} chunks")
+
+    futures = [
+        pool.submit(_transcribe_chunk, audio[start:end], start / SAMPLE_RATE)
+        for start, end in boundaries
+    ]
+
+    segments = []
+    for future in futures:
+        segments.extend(future.result())
+    return {"segments": segments}
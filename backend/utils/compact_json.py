@@ -0,0 +1,187 @@
+import os
+import json
+import math
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lists of at least this many flat records are sent as a column header plus value rows
+COMPACT_TABLE_MIN_ROWS = int(os.getenv("COMPACT_TABLE_MIN_ROWS", "3"))
+COMPACT_TABLES_ENABLED = os.getenv("COMPACT_TABLES_ENABLED", "true").lower() == "true"
+
+# Per record type, the stored agent output blob whose contents mostly repeat the record's own fields
+DUPLICATE_BLOBS = {
+    "checkins": "summary",
+    "prescriptions": "structured_data",
+    "lab_reports": "structured_data",
+}
+
+TABLE_NOTE = 'Objects of the form {"columns": [...], "rows": [[...], ...]} are tables: each row holds one record\'s values in column order.'
+
+
+def dumps_compact(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough LLM token count (about 4 characters per token for English and JSON).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def strip_empty(value: Any) -> Any:
+    """
+    Drop None, empty strings and empty containers, recursively. Zeros and False stay.
+    """
+    if isinstance(value, dict):
+        stripped = {key: strip_empty(item) for key, item in value.items()}
+        return {key: item for key, item in stripped.items() if not _is_empty(item)}
+    if isinstance(value, list):
+        stripped = [strip_empty(item) for item in value]
+        return [item for item in stripped if not _is_empty(item)]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and len(value) == 0)
+
+
+# Shorter strings (and numbers) only count as duplicates under a matching key, e.g.
+# structured_data.doctor_info.name vs doctor_name, so a coincidental "High" is kept
+_MIN_FREE_MATCH_LENGTH = 12
+
+
+def _canonical(value: Any) -> str:
+    if isinstance(value, str):
+        return value.strip().lower()
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _free_match(value: Any) -> bool:
+    return isinstance(value, (dict, list)) or (isinstance(value, str) and len(value) >= _MIN_FREE_MATCH_LENGTH)
+
+
+class _RecordValues:
+    """
+    Every value found in a record: containers and long strings by content, other
+    scalars by content and the key they were stored under.
+    """
+
+    def __init__(self, record: Dict[str, Any]):
+        self.values: Set[str] = set()
+        self.keys_by_value: Dict[str, Set[str]] = {}
+        self._collect(record, None)
+
+    def _collect(self, value: Any, key: Optional[str]) -> None:
+        canonical = _canonical(value)
+        if _free_match(value):
+            self.values.add(canonical)
+        elif key is not None:
+            self.keys_by_value.setdefault(canonical, set()).add(key)
+        if isinstance(value, dict):
+            for item_key, item in value.items():
+                self._collect(item, item_key)
+        elif isinstance(value, list):
+            for item in value:
+                self._collect(item, key)
+
+    def contains(self, key: Optional[str], value: Any) -> bool:
+        canonical = _canonical(value)
+        if _free_match(value):
+            return canonical in self.values
+        keys = self.keys_by_value.get(canonical, ())
+        return key is not None and any(other == key or other.endswith(f"_{key}") for other in keys)
+
+
+def prune_duplicates(blob: Any, known: _RecordValues, key: Optional[str] = None) -> Any:
+    """
+    The parts of blob whose values do not already appear in the record; dicts are pruned
+    key by key, other values are kept or dropped whole. Returns None if nothing is left.
+    """
+    if known.contains(key, blob):
+        return None
+    if isinstance(blob, dict):
+        remainder = {}
+        for item_key, value in blob.items():
+            pruned = prune_duplicates(value, known, item_key)
+            if not _is_empty(pruned):
+                remainder[item_key] = pruned
+        return remainder or None
+    return blob
+
+
+def tabulate(value: Any, min_rows: int = COMPACT_TABLE_MIN_ROWS) -> Any:
+    """
+    Replace lists of flat dicts (scalar values only) with {"columns", "rows"}, so repeated
+    keys are written once. Nested structures are tabulated recursively.
+    """
+    if isinstance(value, dict):
+        return {key: tabulate(item, min_rows) for key, item in value.items()}
+    if not isinstance(value, list):
+        return value
+
+    items = [tabulate(item, min_rows) for item in value]
+    flat_records = all(
+        isinstance(item, dict) and all(not isinstance(field, (dict, list)) for field in item.values())
+        for item in items
+    )
+    if len(items) < min_rows or not flat_records:
+        return items
+
+    columns: List[str] = []
+    for item in items:
+        columns.extend(key for key in item if key not in columns)
+    rows = [[item.get(column) for column in columns] for item in items]
+    return {"columns": columns, "rows": rows}
+
+
+def compact_medical_data(medical_data: Dict[str, Any], tables: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Token-lean version of the report agent input:
+    - each record's stored agent output (DUPLICATE_BLOBS) is reduced to the fields not
+      already present in the record itself
+    - empty values are dropped
+    - uniform lists become tables (with a one-line note explaining the format)
+    """
+    tables = COMPACT_TABLES_ENABLED if tables is None else tables
+    compact = {}
+    for section, records in medical_data.items():
+        blob_key = DUPLICATE_BLOBS.get(section)
+        if blob_key is None or not isinstance(records, list):
+            compact[section] = strip_empty(records)
+            continue
+
+        compact_records = []
+        for record in records:
+            record = strip_empty(record)
+            blob = record.pop(blob_key, None)
+            if blob is not None:
+                remainder = prune_duplicates(blob, _RecordValues(record))
+                if remainder is not None:
+                    record[blob_key] = remainder
+            compact_records.append(record)
+        compact[section] = compact_records
+
+    if tables:
+        tabulated = tabulate(compact)
+        if tabulated != compact:
+            return {"format": TABLE_NOTE, **tabulated}
+    return compact
+
+
+def serialize_for_agent(medical_data: Dict[str, Any], label: str = "report_agent") -> str:
+    """
+    Compact JSON text for an agent prompt; logs its size against the pretty-printed form.
+    """
+    text = dumps_compact(compact_medical_data(medical_data))
+    original = json.dumps(medical_data, indent=2, default=str)
+    logger.info(
+        f"{label} input: {len(text)} characters, ~{estimate_tokens(text)} tokens "
+        f"(pretty-printed: {len(original)} characters, ~{estimate_tokens(original)} tokens)"
+    )
+    return text
@@ -0,0 +1,131 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Concurrency per stage, configurable through the environment.
+# Transcription is CPU heavy, the others mostly wait on remote services.
+STAGE_WORKERS = {
+    "transcription": int(os.getenv("TRANSCRIPTION_WORKERS", "1")),
+    "draft_transcription": int(os.getenv("DRAFT_TRANSCRIPTION_WORKERS", "1")),
+    "ocr": int(os.getenv("OCR_WORKERS", "4")),
+    "agent": int(os.getenv("AGENT_WORKERS", "8")),
+    "pdf": int(os.getenv("PDF_WORKERS", "2")),
+    # Short SQLAlchemy units of work from async handlers and jobs
+    "db": int(os.getenv("DB_WORKERS", "4")),
+}
+
+
+class StageExecutor:
+    """
+    A bounded thread pool dedicated to one processing stage, with queue-depth metrics.
+    Blocking work submitted here never runs on the event loop, and a burst in one
+    stage cannot starve the others.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-stage")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queued = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        submitted_at = time.monotonic()
+        # Carry the caller's context (e.g. its request priority) onto the worker thread
+        context = contextvars.copy_context()
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        def tracked():
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait += started_at - submitted_at
+            failed = False
+            try:
+                return context.run(fn, *args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._total_run += time.monotonic() - started_at
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+
+        return self._executor.submit(tracked)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "max_queued": self._max_queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_seconds": round(self._total_wait / finished, 3) if finished else 0.0,
+                "avg_run_seconds": round(self._total_run / finished, 3) if finished else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executors: Dict[str, StageExecutor] = {
+    stage: StageExecutor(stage, workers) for stage, workers in STAGE_WORKERS.items()
+}
+
+
+def get_stage_executor(stage: str) -> StageExecutor:
+    if stage not in _executors:
+        raise ValueError(f"Unknown processing stage: {stage}")
+    return _executors[stage]
+
+
+async def run_in_stage(stage: str, fn: Callable, *args, **kwargs):
+    """
+    Run a blocking function on the given stage's executor and await its result
+    without blocking the event loop.
+    """
+    return await asyncio.wrap_future(get_stage_executor(stage).submit(fn, *args, **kwargs))
+
+
+def call_in_stage(stage: str, fn: Callable, *args, **kwargs):
+    """
+    Run a blocking function on the given stage's executor from synchronous code
+    (e.g. from inside another stage) and wait for the result.
+    """
+    return get_stage_executor(stage).submit(fn, *args, **kwargs).result()
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {stage: executor.stats() for stage, executor in _executors.items()}
+
+
+def shutdown_executors() -> None:
+    for executor in _executors.values():
+        executor.shutdown()
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+import uuid
+import logging
+from typing import Dict, Any, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Processing stages reported by GET /jobs/{id}, in the order they normally occur
+JOB_STAGES = ("saved", "transcribing", "ocr", "agent", "persisted")
+
+# Finished jobs are kept around this long so clients can still poll their result
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+_jobs: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _prune_finished_jobs(now: float) -> None:
+    """Drop completed/failed jobs older than the retention window. Caller holds _lock."""
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["finished_at"] is not None and now - job["finished_at"] > JOB_RETENTION_SECONDS
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _close_current_stage(job: Dict[str, Any], now: float) -> None:
+    """Record how long the job spent in its current stage. Caller holds _lock."""
+    started = job.pop("_stage_started_at", None)
+    if started is not None and job["stage"]:
+        job["timings"][job["stage"]] = round(now - started, 3)
+
+
+def create_job(job_type: str, file_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Register a new processing job whose file has already been saved to disk.
+    """
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "type": job_type,
+        "status": "queued",
+        "stage": "saved",
+        "file_path": file_path,
+        "record_id": None,
+        "progress": None,
+        "refinement": None,
+        "result": None,
+        "error": None,
+        "timings": {},
+        "created_at": now,
+        "finished_at": None,
+        "_stage_started_at": now,
+    }
+    with _lock:
+        _prune_finished_jobs(now)
+        _jobs[job["id"]] = job
+    logger.info(f"Created {job_type} job {job['id']}")
+    return get_job(job["id"])
+
+
+def set_stage(job_id: str, stage: str) -> None:
+    """
+    Move a job to the given stage, recording the time spent in the previous one.
+    """
+    if stage not in JOB_STAGES:
+        raise ValueError(f"Unknown job stage: {stage}")
+
+    now = time.time()
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        _close_current_stage(job, now)
+        job["status"] = "running"
+        job["stage"] = stage
+        job["_stage_started_at"] = now
+    logger.info(f"Job {job_id} -> {stage}")
+
+
+def set_progress(job_id: str, completed: int, total: int) -> None:
+    """
+    Record how many items of a multi-file job have finished.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job["progress"] = {"completed": completed, "total": total}
+
+
+def set_refinement(job_id: str, status: str, **details) -> None:
+    """
+    Record the state of a background refine pass that continues after the job has
+    completed with a draft result (pending / running / refined / unchanged / failed).
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job["refinement"] = {"status": status, **details}
+    logger.info(f"Job {job_id} refinement -> {status}")
+
+
+def complete_job(job_id: str, record_id: Optional[int] = None, result: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Mark a job as finished successfully with the id of the stored record.
+    """
+    now = time.time()
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        _close_current_stage(job, now)
+        job["status"] = "completed"
+        job["stage"] = "persisted"
+        job["record_id"] = record_id
+        job["result"] = result
+        job["finished_at"] = now
+        job["timings"]["total"] = round(now - job["created_at"], 3)
+    logger.info(f"Job {job_id} completed (record id: {record_id})")
+
+
+def fail_job(job_id: str, error: str) -> None:
+    """
+    Mark a job as failed, keeping the stage it failed in.
+    """
+    now = time.time()
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        _close_current_stage(job, now)
+        job["status"] = "failed"
+        job["error"] = error
+        job["finished_at"] = now
+        job["timings"]["total"] = round(now - job["created_at"], 3)
+    logger.error(f"Job {job_id} failed: {error}")
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Return a snapshot of the job suitable for JSON responses, or None if unknown.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            key: (dict(value) if isinstance(value, dict) else value)
+            for key, value in job.items()
+            if not key.startswith("_")
+        }
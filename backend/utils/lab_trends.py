@@ -0,0 +1,287 @@
+import os
+import re
+import json
+import logging
+from datetime import datetime, date
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from db.models import Report
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A change smaller than this fraction of the previous value counts as "stable"
+TREND_STABLE_TOLERANCE = float(os.getenv("TREND_STABLE_TOLERANCE", "0.05"))
+# Slopes are reported in units per this many days
+TREND_SLOPE_PERIOD_DAYS = 30
+
+# Lab report dates as printed (Indian labs mostly write day first)
+_DATE_FORMATS = (
+    "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%d/%m/%y",
+    "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%b %d, %Y", "%B %d, %Y",
+)
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+_RANGE_BETWEEN = re.compile(_NUMBER + r"\s*(?:-|–|—|to)\s*" + _NUMBER, re.IGNORECASE)
+_RANGE_BELOW = re.compile(r"(?:<=?|≤|up\s*to|upto|below|less than)\s*" + _NUMBER, re.IGNORECASE)
+_RANGE_ABOVE = re.compile(r"(?:>=?|≥|above|more than|greater than)\s*" + _NUMBER, re.IGNORECASE)
+# Digit-group commas ("4,000 - 11,000", "150,000")
+_THOUSANDS_SEPARATOR = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+# Label of the band to use when a range lists several ("Desirable <200, Borderline 200-239")
+_RANGE_PREFERRED = re.compile(r"\b(?:normal|desirable|optimal|reference|healthy)\b", re.IGNORECASE)
+
+
+def parse_report_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _range_bands(text: str) -> List[Tuple[str, float, float]]:
+    """
+    Every (label, low, high) band in a printed range, in order; the label is the text
+    between the previous band and this one.
+    """
+    spans = [(match.span(), float(match.group(1)), float(match.group(2))) for match in _RANGE_BETWEEN.finditer(text)]
+    for pattern, is_upper in ((_RANGE_BELOW, True), (_RANGE_ABOVE, False)):
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if any(start < other_end and other_start < end for (other_start, other_end), _, _ in spans):
+                continue
+            bound = float(match.group(1))
+            spans.append(((start, end), np.nan, bound) if is_upper else ((start, end), bound, np.nan))
+    spans.sort(key=lambda span: span[0])
+
+    bands, label_start = [], 0
+    for (start, end), low, high in spans:
+        bands.append((text[label_start:start], low, high))
+        label_start = end
+    return bands
+
+
+def parse_reference_range(value: Any) -> Tuple[float, float]:
+    """
+    (low, high) bounds of a printed reference range such as "70-99", "0–130 mg/dL",
+    "4,000 - 11,000", "< 200" or "> 40"; a missing bound is NaN. When the range lists several bands
+    ("Desirable <200, Borderline 200-239, High >=240") the normal/desirable one is
+    used, and no range (NaN, NaN) when none is labelled that way.
+    """
+    if not isinstance(value, str):
+        return np.nan, np.nan
+    bands = _range_bands(_THOUSANDS_SEPARATOR.sub("", value))
+    if len(bands) == 1:
+        return bands[0][1], bands[0][2]
+    for label, low, high in bands:
+        if _RANGE_PREFERRED.search(label):
+            return low, high
+    return np.nan, np.nan
+
+
+def normalize_test_name(name: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9%]+", " ", name.lower()).split())
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if np.isfinite(number) else None
+
+
+def collect_lab_observations(db: Session) -> List[Dict[str, Any]]:
+    """
+    One observation per numeric metric in every stored lab report, dated by the
+    report date (or, if that cannot be read, the time the report was stored).
+    """
+    observations = []
+    for report_date, timestamp, raw_lab_data in db.query(Report.report_date, Report.timestamp, Report.raw_lab_data).all():
+        if isinstance(raw_lab_data, str):
+            try:
+                raw_lab_data = json.loads(raw_lab_data)
+            except (json.JSONDecodeError, ValueError):
+                continue
+        if not isinstance(raw_lab_data, dict):
+            continue
+
+        day = parse_report_date(raw_lab_data.get("report_date")) or parse_report_date(report_date) or parse_report_date(timestamp)
+        if day is None:
+            continue
+        for metric in raw_lab_data.get("metrics") or []:
+            if not isinstance(metric, dict) or not metric.get("test_name"):
+                continue
+            value = _as_float(metric.get("value"))
+            if value is None:
+                continue
+            observations.append({
+                "test_name": str(metric["test_name"]).strip(),
+                "value": value,
+                "day": day,
+                "unit": (metric.get("unit") or "").strip(),
+                "reference_range": metric.get("reference_range") or "",
+                "interpretation": metric.get("interpretation") or "",
+            })
+    return observations
+
+
+def _status_from_interpretation(interpretation: str) -> str:
+    text = interpretation.lower()
+    if "high" in text or "elevated" in text:
+        return "abnormal_high"
+    if "low" in text or "deficien" in text:
+        return "abnormal_low"
+    if "normal" in text:
+        return "normal"
+    return "unknown"
+
+
+def _round(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def compute_metric_trends(observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    MetricTrend dicts (see ai-pipeline/report_agent/models.py), one per test, from
+    observations grouped by normalised test name and ordered by date:
+    - current/previous value: the latest two readings; delta is their difference
+    - slope: least-squares fit over all readings, in units per TREND_SLOPE_PERIOD_DAYS
+    - status: the current value against the latest reference range; the printed
+      interpretation when there is no usable range, or when the range contradicts an
+      explicit Normal / High / Low interpretation (the range is then not used at all)
+    - trend: "improving" when an out-of-range value moved toward the range, otherwise
+      increasing / decreasing / stable (TREND_STABLE_TOLERANCE), "new" for one reading
+    Readings in a different unit than the latest one with a unit are left out of the
+    group, and so are readings without a unit when the test was reported in several.
+    clinical_comment is left for the report agent.
+    """
+    if not observations:
+        return []
+
+    names = np.array([normalize_test_name(item["test_name"]) for item in observations])
+    units = np.array([item["unit"].lower() for item in observations])
+    days = np.array([item["day"].toordinal() for item in observations], dtype=float)
+    values = np.array([item["value"] for item in observations], dtype=float)
+
+    # Latest non-empty unit per test; drop readings in another unit. Unit-less readings
+    # are only kept when the test has a single unit, so they cannot be a different one
+    _, codes = np.unique(names, return_inverse=True)
+    _, unit_codes = np.unique(units, return_inverse=True)
+    has_unit = units != ""
+    order = np.lexsort((days, codes))
+    order = order[has_unit[order]]
+    unit_of_code = np.full(codes.max() + 1, -1, dtype=int)
+    unit_of_code[codes[order]] = order
+    reference_unit = np.where(unit_of_code[codes] >= 0, units[unit_of_code[codes]], "")
+    unit_pairs = np.unique(codes[has_unit] * (unit_codes.max() + 1) + unit_codes[has_unit])
+    unit_count = np.bincount(unit_pairs // (unit_codes.max() + 1), minlength=codes.max() + 1)
+    keep = (units == reference_unit) | (~has_unit & (unit_count[codes] <= 1))
+
+    codes, days, values = codes[keep], days[keep], values[keep]
+    source = np.flatnonzero(keep)
+    order = np.lexsort((days, codes))
+    codes, days, values, source = codes[order], days[order], values[order], source[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    counts = ends - starts
+    last = ends - 1
+    previous_index = np.maximum(ends - 2, starts)
+
+    current = values[last]
+    previous = np.where(counts > 1, values[previous_index], np.nan)
+    delta = current - previous
+
+    # Per-group least squares: slope = (n*Sxy - Sx*Sy) / (n*Sxx - Sx^2)
+    x = (days - np.repeat(days[starts], counts)) / TREND_SLOPE_PERIOD_DAYS
+    sum_x = np.add.reduceat(x, starts)
+    sum_y = np.add.reduceat(values, starts)
+    sum_xx = np.add.reduceat(x * x, starts)
+    sum_xy = np.add.reduceat(x * values, starts)
+    denominator = counts * sum_xx - sum_x ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denominator > 0, (counts * sum_xy - sum_x * sum_y) / denominator, np.nan)
+
+    latest = [observations[index] for index in source[last]]
+    group_units = [observations[index]["unit"] if index >= 0 else "" for index in unit_of_code[codes[last]]]
+    bounds = np.array([parse_reference_range(item["reference_range"]) for item in latest], dtype=float).reshape(-1, 2)
+    low, high = bounds[:, 0], bounds[:, 1]
+    has_range = ~(np.isnan(low) & np.isnan(high))
+
+    status = np.where(current < low, "abnormal_low", np.where(current > high, "abnormal_high", "normal")).astype(object)
+    printed = np.array([_status_from_interpretation(item["interpretation"]) for item in latest], dtype=object)
+    # A range the lab's own interpretation disagrees with was misread (or is for another population)
+    has_range &= (printed == "unknown") | (printed == status)
+    low[~has_range], high[~has_range] = np.nan, np.nan
+    status[~has_range] = printed[~has_range]
+
+    def distance_from_range(value: np.ndarray) -> np.ndarray:
+        return np.fmax(np.fmax(low - value, value - high), 0.0)
+
+    stable = np.abs(delta) <= TREND_STABLE_TOLERANCE * np.abs(previous)
+    trend = np.where(stable, "stable", np.where(delta > 0, "increasing", "decreasing")).astype(object)
+    previous_distance = distance_from_range(previous)
+    improving = has_range & ~stable & (previous_distance > 0) & (distance_from_range(current) < previous_distance)
+    trend[improving] = "improving"
+    trend[counts == 1] = "new"
+
+    trends = []
+    for index, item in enumerate(latest):
+        trends.append({
+            "metric": " ".join(item["test_name"].split()),
+            "previous_value": _round(previous[index]),
+            "current_value": _round(current[index]),
+            "delta": _round(delta[index]),
+            "slope": _round(slope[index]),
+            "unit": group_units[index] or None,
+            "readings": int(counts[index]),
+            "trend": trend[index],
+            "status": status[index],
+        })
+
+    # Out-of-range and moving metrics first
+    trends.sort(key=lambda trend: (trend["status"] == "normal", trend["trend"] in ("stable", "new"), trend["metric"].lower()))
+    return trends
+
+
+def compute_clinical_trends(db: Session) -> List[Dict[str, Any]]:
+    observations = collect_lab_observations(db)
+    trends = compute_metric_trends(observations)
+    logger.info(f"Computed {len(trends)} metric trends from {len(observations)} lab values")
+    return trends
+
+
+def apply_metric_trends(trend_commentary: Any, metric_trends: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    ClinicalTrends dict from the computed metric_trends and the report agent's
+    TrendCommentary: each trend gets the agent's clinical_comment for that metric
+    (matched by normalised name) and the agent's overall_summary is kept.
+    """
+    trend_commentary = trend_commentary if isinstance(trend_commentary, dict) else {}
+    comments = {
+        normalize_test_name(str(comment.get("metric", ""))): comment.get("clinical_comment")
+        for comment in trend_commentary.get("comments") or []
+        if isinstance(comment, dict)
+    }
+    return {
+        "trends": [
+            dict(trend, clinical_comment=comments.get(normalize_test_name(trend["metric"])))
+            for trend in metric_trends
+        ],
+        "overall_summary": trend_commentary.get("overall_summary"),
+    }
@@ -0,0 +1,218 @@
+import re
+import json
+import logging
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from db.models import Prescription
+from utils.lab_trends import parse_report_date
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dosage form prefixes written before the drug name ("Tab. Metformin", "Syp Ascoril")
+_FORM_PREFIX = re.compile(
+    r"^\s*(?:tab(?:let)?s?|cap(?:sule)?s?|syp|syrup|susp(?:ension)?|inj(?:ection)?|oint(?:ment)?|drops?|gel|cream|lotion|sachet)\b\.?\s*",
+    re.IGNORECASE,
+)
+_STRENGTH = re.compile(r"\b\d+(?:\.\d+)?\s*(?:mg|mcg|µg|g|gm|ml|iu|units?|%)(?=\W|$)", re.IGNORECASE)
+
+_ONGOING = re.compile(
+    r"\b(?:ongoing|continue[sd]?|long[\s-]?term|lifelong|life[\s-]?long|indefinite(?:ly)?|regular(?:ly)?|till further|until further)\b",
+    re.IGNORECASE,
+)
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15,
+    "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS_WORDS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+_UNIT_DAYS = {"d": 1, "day": 1, "days": 1, "w": 7, "wk": 7, "wks": 7, "week": 7, "weeks": 7,
+              "m": 30, "mo": 30, "month": 30, "months": 30, "y": 365, "yr": 365, "year": 365, "years": 365}
+# Digits ("x3 months") or a whole number in words ("ten", "twenty one", "twenty-one"), then the unit
+_DURATION = re.compile(
+    r"(\d+|\b(?:" + "|".join(_TENS_WORDS) + r")(?:[\s-]+(?:" + "|".join(_NUMBER_WORDS) + r"))?|\b(?:"
+    + "|".join(_NUMBER_WORDS) + r"))\s*(days?|d|weeks?|wks?|wk|w|months?|mo|m|years?|yrs?|y)\b",
+    re.IGNORECASE,
+)
+# Clinical shorthand: 5/7 = five days, 2/52 = two weeks, 3/12 = three months
+_FRACTION_DURATION = re.compile(r"\b(\d+)\s*/\s*(7|52|12)\b")
+_FRACTION_DAYS = {"7": 1, "52": 7, "12": 30}
+
+
+def normalize_medicine_name(name: str) -> str:
+    """
+    Matching key for a medicine: lower case, without dosage form prefix, strength
+    or punctuation, so "Tab. Metformin 500mg" and "metformin" are the same drug.
+    """
+    name = _STRENGTH.sub(" ", _FORM_PREFIX.sub("", name))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+def display_medicine_name(name: str) -> str:
+    cleaned = " ".join(_STRENGTH.sub(" ", _FORM_PREFIX.sub("", name)).split())
+    return cleaned or name.strip()
+
+
+def _duration_count(amount: str) -> int:
+    """Digits or a number in words ("twenty one") as an int."""
+    if amount.isdigit():
+        return int(amount)
+    words = re.split(r"[\s-]+", amount.lower())
+    return sum(_TENS_WORDS.get(word) or _NUMBER_WORDS[word] for word in words)
+
+
+def parse_duration(value: Any) -> Tuple[Optional[int], bool]:
+    """
+    (days, ongoing) for a prescribed duration such as "30 days", "2 weeks", "x 3 months",
+    "5/7" or "continue"; (None, False) when it cannot be read (e.g. "SOS", "as needed").
+    An explicit duration wins over ongoing wording ("take regularly for 5 days" is 5 days).
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None, False
+    match = _DURATION.search(value)
+    if match:
+        count = _duration_count(match.group(1))
+        return count * _UNIT_DAYS[match.group(2).lower()], False
+    match = _FRACTION_DURATION.search(value)
+    if match:
+        return int(match.group(1)) * _FRACTION_DAYS[match.group(2)], False
+    if _ONGOING.search(value):
+        return None, True
+    return None, False
+
+
+def collect_prescribed_medicines(db: Session) -> List[Dict[str, Any]]:
+    """
+    One entry per medicine on every stored prescription, dated by the prescription
+    date (or, if that cannot be read, the time the prescription was stored).
+    """
+    entries = []
+    rows = db.query(Prescription.id, Prescription.prescription_date, Prescription.timestamp, Prescription.medicines).all()
+    for prescription_id, prescription_date, timestamp, medicines in rows:
+        if isinstance(medicines, str):
+            try:
+                medicines = json.loads(medicines)
+            except (json.JSONDecodeError, ValueError):
+                continue
+        if not isinstance(medicines, list):
+            continue
+
+        start = parse_report_date(prescription_date) or parse_report_date(timestamp)
+        for medicine in medicines:
+            if not isinstance(medicine, dict) or not str(medicine.get("name") or "").strip():
+                continue
+            entries.append(dict(medicine, prescription_id=prescription_id, start=start))
+    return entries
+
+
+def _medication(entry: Dict[str, Any], start: Optional[date], end: Optional[date]) -> Dict[str, Any]:
+    """A Medication dict (see ai-pipeline/report_agent/models.py)."""
+    dosage = entry.get("dosage")
+    if not dosage:
+        strength = _STRENGTH.search(entry["name"])
+        dosage = strength.group(0) if strength else None
+    return {
+        "name": display_medicine_name(entry["name"]),
+        "dosage": dosage or None,
+        "frequency": entry.get("frequency") or None,
+        "duration": entry.get("duration") or None,
+        "start_date": start.isoformat() if start else None,
+        "end_date": end.isoformat() if end else None,
+        "special_instructions": entry.get("special_instructions") or None,
+        "source": "prescription",
+    }
+
+
+def aggregate_medications(entries: List[Dict[str, Any]], as_of: Optional[date] = None) -> Dict[str, Any]:
+    """
+    MedicationOverview dict from prescribed medicine entries:
+    - medication_timeline: every prescribed course, oldest first, with its end date
+      (start + duration; none for ongoing courses)
+    - current / past medications: one per medicine (grouped by normalised name), taken
+      from its latest dated prescription (an undated one only when none is dated);
+      current if that course is ongoing or ends on or after as_of (default today),
+      past otherwise
+    - ambiguous: latest entries whose course cannot be placed in time (no readable
+      prescription date, or a duration like "as needed"); they are in neither list
+    """
+    as_of = as_of or date.today()
+    courses = []
+    for entry in entries:
+        days, ongoing = parse_duration(entry.get("duration"))
+        start = entry.get("start")
+        end = start + timedelta(days=days) if start is not None and days is not None else None
+        determined = start is not None and (ongoing or days is not None)
+        courses.append((entry, start, end, ongoing, determined))
+
+    courses.sort(key=lambda course: (course[1] or date.max, course[0].get("prescription_id") or 0))
+
+    # Undated courses sort last; they only stand for a medicine that has no dated one
+    latest: Dict[str, Tuple] = {}
+    for course in courses:
+        name = normalize_medicine_name(course[0]["name"])
+        if course[1] is not None or name not in latest:
+            latest[name] = course
+
+    current, past, ambiguous = [], [], []
+    for entry, start, end, ongoing, determined in latest.values():
+        if not determined:
+            ambiguous.append(_medication(entry, start, end))
+        elif ongoing or end >= as_of:
+            current.append(_medication(entry, start, end))
+        else:
+            past.append(_medication(entry, start, end))
+
+    timeline = [_medication(entry, start, end) for entry, start, end, _, _ in courses]
+    summary = f"{len(current)} current and {len(past)} past medications from {len({entry.get('prescription_id') for entry in entries})} prescriptions"
+    if ambiguous:
+        summary += f"; {len(ambiguous)} could not be dated: {', '.join(item['name'] for item in ambiguous)}"
+
+    return {
+        "current_medications": current,
+        "past_medications": past,
+        "medication_timeline": timeline,
+        "medication_summary": summary + ".",
+        "ambiguous": ambiguous,
+    }
+
+
+def compute_medication_overview(db: Session, as_of: Optional[date] = None) -> Dict[str, Any]:
+    entries = collect_prescribed_medicines(db)
+    overview = aggregate_medications(entries, as_of)
+    logger.info(f"Aggregated {len(entries)} prescribed medicines: {overview['medication_summary']}")
+    return overview
+
+
+def apply_medication_overview(medication_overview: Any, computed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The report agent's medication_overview with the prescription-derived entries
+    replaced by the computed ones. Agent entries for other medicines (ambiguous
+    prescriptions, medications mentioned in check-ins) are kept, and so is its summary.
+    """
+    medication_overview = medication_overview if isinstance(medication_overview, dict) else {}
+    determined = {
+        normalize_medicine_name(item["name"])
+        for item in computed["current_medications"] + computed["past_medications"]
+    }
+
+    def agent_only(key: str) -> List[Dict[str, Any]]:
+        return [
+            item for item in medication_overview.get(key) or []
+            if isinstance(item, dict) and normalize_medicine_name(str(item.get("name", ""))) not in determined
+        ]
+
+    timeline = computed["medication_timeline"] + [
+        item for item in agent_only("medication_timeline") if item.get("source") != "prescription"
+    ]
+    timeline.sort(key=lambda item: parse_report_date(item.get("start_date")) or date.max)
+
+    return dict(
+        medication_overview,
+        current_medications=computed["current_medications"] + agent_only("current_medications"),
+        past_medications=computed["past_medications"] + agent_only("past_medications"),
+        medication_timeline=timeline,
+        medication_summary=medication_overview.get("medication_summary") or computed["medication_summary"],
+    )
@@ -2,11 +2,16 @@ import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 import json
-import re
-import requests
-import uuid
+import time
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from utils.adk_client import call_agent, run_blocking
+from utils.adk_parser import parse_adk_response, PRESCRIPTION_RESPONSE, LAB_REPORT_RESPONSE
+from utils.resilience import retry_call, get_circuit_breaker, DeadlineExceeded
+from utils.scheduler import get_scheduler
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,8 +26,25 @@ if not API_KEY:
 
 genai.configure(api_key=API_KEY)
 
-# Load ADK server URL
-ADK_SERVER_URL = os.getenv("ADK_SERVER_URL", "http://localhost:5010")
+# Gemini errors worth retrying: rate limiting, server errors and timeouts
+RETRYABLE_GEMINI_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def is_retryable_gemini_error(error: Exception) -> bool:
+    if isinstance(error, RETRYABLE_GEMINI_ERRORS):
+        return True
+    # File uploads go through googleapiclient, whose HttpError carries the response status
+    status = getattr(getattr(error, "resp", None), "status", None)
+    return status is not None and (int(status) == 429 or int(status) >= 500)
 
 
 def prep_image(image_path: str, display_name: str = "UploadedImage"):
@@ -38,7 +60,7 @@ def prep_image(image_path: str, display_name: str = "UploadedImage"):
         raise
 
 
-def extract_text_from_image(uploaded_file, model_name: str = "gemini-2.0-flash-exp"):
+def extract_text_from_image(uploaded_file, model_name: str = "gemini-2.0-flash-exp", timeout: Optional[float] = None):
     """
     Call Gemini to extract text verbatim from the uploaded image.
     Returns the extracted text as a string.
@@ -54,7 +76,10 @@ def extract_text_from_image(uploaded_file, model_name: str = "gemini-2.0-flash-e
 
     try:
         model = genai.GenerativeModel(model_name=model_name)
-        response = model.generate_content([uploaded_file, prompt])
+        response = model.generate_content(
+            [uploaded_file, prompt],
+            request_options={"timeout": timeout} if timeout else None
+        )
 
         # Extract text from response
         raw_text = None
@@ -82,132 +107,57 @@ def extract_text_from_image(uploaded_file, model_name: str = "gemini-2.0-flash-e
         raise
 
 
-def call_agent(agent_name: str, extracted_text: str) -> Dict[str, Any]:
+def extract_document_text(image_path: str, display_name: str = "UploadedImage", timeout: Optional[float] = None) -> str:
     """
-    Call a single ADK agent API (session creation + /run request).
+    OCR step shared by prescriptions and lab reports:
+    upload the document to Gemini and extract its text verbatim.
+    Transient Gemini failures are retried, both steps together within timeout seconds,
+    and calls fail fast while the Gemini circuit breaker is open. OCR calls queue for
+    the Gemini rate limit, interactive uploads ahead of background work.
     """
-    try:
-        logger.info(f"Calling {agent_name} at {ADK_SERVER_URL}")
-
-        user_id = "u_backend"
-        session_id = f"s_{uuid.uuid4().hex[:8]}"
-
-        # Step 1: Create session
-        session_endpoint = f"{ADK_SERVER_URL}/apps/{agent_name}/users/{user_id}/sessions/{session_id}"
-        session_payload = {"state": {}}
-
-        session_resp = requests.post(
-            session_endpoint,
-            json=session_payload,
-            headers={"Content-Type": "application/json"},
-            timeout=60
-        )
-
-        if session_resp.status_code != 200:
-            return {
-                "error": f"Session creation failed for {agent_name}",
-                "details": session_resp.text
-            }
-
-        logger.info(f"Session created for {agent_name}: {session_id}")
-
-        # Step 2: Run with extracted text
-        payload = {
-            "app_name": agent_name,
-            "user_id": user_id,
-            "session_id": session_id,
-            "new_message": {
-                "role": "user",
-                "parts": [{"text": extracted_text}]
-            }
-        }
-
-        run_response = requests.post(
-            f"{ADK_SERVER_URL}/run",
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=600
-        )
-
-        if run_response.status_code != 200:
-            return {
-                "error": f"{agent_name} run failed",
-                "details": run_response.text
-            }
-
-        logger.info(f"{agent_name} completed successfully")
-        return run_response.json()
-
-    except requests.exceptions.Timeout:
-        return {"error": f"{agent_name} request timed out"}
+    started = time.monotonic()
+    breaker = get_circuit_breaker("gemini")
 
-    except requests.exceptions.RequestException as e:
-        return {"error": f"{agent_name} request failed: {str(e)}"}
-
-    except json.JSONDecodeError:
-        return {"error": f"{agent_name} returned invalid JSON"}
-
-
-def extract_json_from_text(data: Any) -> List[Dict[str, Any]]:
-    """
-    Recursively extract JSON objects from the agent response.
-    """
-    extracted_jsons = []
-
-    def recursive_search(obj):
-        if isinstance(obj, dict):
-            if 'text' in obj and isinstance(obj['text'], str):
-                text_content = obj['text']
-
-                # Try parsing direct JSON
-                try:
-                    parsed_direct = json.loads(text_content)
-                    extracted_jsons.append(parsed_direct)
-                except json.JSONDecodeError:
-                    # Look for code blocks
-                    json_pattern = r'```json\s*\n(.*?)\n```'
-                    matches = re.findall(json_pattern, text_content, re.DOTALL)
-                    for match in matches:
-                        try:
-                            parsed_json = json.loads(match)
-                            extracted_jsons.append(parsed_json)
-                        except json.JSONDecodeError:
-                            logger.warning("Failed to parse a JSON block")
-
-            for value in obj.values():
-                recursive_search(value)
-
-        elif isinstance(obj, list):
-            for item in obj:
-                recursive_search(item)
-
-    recursive_search(data)
-    return extracted_jsons
+    uploaded_file = retry_call(
+        lambda budget: prep_image(image_path, display_name=display_name),
+        is_retryable_gemini_error, breaker=breaker, timeout=timeout, description="Gemini upload"
+    )
+    remaining = None if timeout is None else timeout - (time.monotonic() - started)
+
+    def ocr_attempt(budget: Optional[float]) -> str:
+        # Each generation takes a token from the Gemini rate limit at the request's priority
+        waited = get_scheduler("gemini").acquire_blocking(timeout=budget)
+        if budget is not None:
+            budget -= waited
+            if budget <= 0:
+                raise DeadlineExceeded(f"Gemini OCR has no time left after {waited:.1f}s in the rate limit queue")
+        return extract_text_from_image(uploaded_file, timeout=budget)
+
+    extracted_text = retry_call(
+        ocr_attempt,
+        is_retryable_gemini_error, breaker=breaker, timeout=remaining, description="Gemini OCR"
+    )
+    logger.info(f"Extracted text length: {len(extracted_text)} characters")
+    return extracted_text
 
 
-def process_prescription(image_path: str) -> Dict[str, Any]:
+async def structure_prescription_text(extracted_text: str, timeout: Optional[float] = None) -> Dict[str, Any]:
     """
-    Process a prescription image:
-    1. Upload to Gemini and extract text via OCR
-    2. Send extracted text to prescription_agent
-    3. Return structured prescription data
+    Agent step for prescriptions: send OCR text to prescription_agent
+    and return the structured prescription data.
     """
     try:
-        logger.info(f"Processing prescription: {image_path}")
-
-        # Step 1: OCR
-        uploaded_file = prep_image(image_path, display_name="Prescription")
-        extracted_text = extract_text_from_image(uploaded_file)
-
-        logger.info(f"Extracted text length: {len(extracted_text)} characters")
+        agent_response = await call_agent("prescription_agent", extracted_text, timeout=timeout)
 
-        # Step 2: Call prescription agent
-        agent_response = call_agent("prescription_agent", extracted_text)
+        if isinstance(agent_response, dict) and "error" in agent_response:
+            return {
+                "error": agent_response["error"],
+                "status": "failed"
+            }
 
-        # Step 3: Extract structured JSON
-        extracted_jsons = extract_json_from_text(agent_response)
+        prescription_data = parse_adk_response(agent_response, PRESCRIPTION_RESPONSE)["data"].get("prescription_data")
 
-        if not extracted_jsons:
+        if not isinstance(prescription_data, dict):
             logger.warning("No structured JSON found in prescription agent response")
             return {
                 "ocr_text": extracted_text,
@@ -216,7 +166,6 @@ def process_prescription(image_path: str) -> Dict[str, Any]:
                 "status": "no_json_found"
             }
 
-        prescription_data = extracted_jsons[0]
         logger.info("Successfully extracted structured prescription data")
 
         return {
@@ -233,53 +182,31 @@ def process_prescription(image_path: str) -> Dict[str, Any]:
         }
 
 
-def process_lab_report(image_path: str) -> Dict[str, Any]:
+async def structure_lab_report_text(extracted_text: str, timeout: Optional[float] = None) -> Dict[str, Any]:
     """
-    Process a lab report image:
-    1. Upload to Gemini and extract text via OCR
-    2. Send extracted text to lab_report_agent
-    3. Return structured lab report data with proper extraction from ADK response
+    Agent step for lab reports: send OCR text to lab_report_agent
+    and return structured lab report data with proper extraction from ADK response.
     """
     try:
-        logger.info(f"Processing lab report: {image_path}")
-
-        # Step 1: OCR
-        uploaded_file = prep_image(image_path, display_name="LabReport")
-        extracted_text = extract_text_from_image(uploaded_file)
+        agent_response = await call_agent("lab_report_agent", extracted_text, timeout=timeout)
 
-        logger.info(f"Extracted text length: {len(extracted_text)} characters")
+        if isinstance(agent_response, dict) and "error" in agent_response:
+            return {
+                "error": agent_response["error"],
+                "status": "failed"
+            }
 
-        # Step 2: Call lab report agent
-        agent_response = call_agent("lab_report_agent", extracted_text)
+        # Latest stateDelta of each sub-agent, validated into FinalLabReport
+        structured_data = parse_adk_response(agent_response, LAB_REPORT_RESPONSE)["data"]
 
-        # Step 3: Extract structured data from ADK response format
-        # The agent_response is a list of agent outputs, each with stateDelta
-        
-        structured_data = {}
-        
-        # Parse through the agent response to extract all state deltas
-        if isinstance(agent_response, list):
-            for entry in agent_response:
-                if isinstance(entry, dict) and 'actions' in entry:
-                    state_delta = entry.get('actions', {}).get('stateDelta', {})
-                    
-                    # Merge all state deltas into structured_data
-                    for key, value in state_delta.items():
-                        structured_data[key] = value
-        
-        # If no data extracted, try the old method as fallback
         if not structured_data:
-            extracted_jsons = extract_json_from_text(agent_response)
-            if extracted_jsons:
-                structured_data = extracted_jsons[0]
-            else:
-                logger.warning("No structured JSON found in lab report agent response")
-                return {
-                    "ocr_text": extracted_text,
-                    "structured_data": None,
-                    "raw_response": agent_response,
-                    "status": "no_json_found"
-                }
+            logger.warning("No structured JSON found in lab report agent response")
+            return {
+                "ocr_text": extracted_text,
+                "structured_data": None,
+                "raw_response": agent_response,
+                "status": "no_json_found"
+            }
 
         logger.info("Successfully extracted structured lab report data")
         
@@ -307,4 +234,44 @@ def process_lab_report(image_path: str) -> Dict[str, Any]:
         return {
             "error": str(e),
             "status": "failed"
-        }
\ No newline at end of file
+        }
+
+
+def process_prescription(image_path: str) -> Dict[str, Any]:
+    """
+    Process a prescription image:
+    1. Upload to Gemini and extract text via OCR
+    2. Send extracted text to prescription_agent
+    3. Return structured prescription data
+    """
+    try:
+        logger.info(f"Processing prescription: {image_path}")
+        extracted_text = extract_document_text(image_path, display_name="Prescription")
+    except Exception as e:
+        logger.error(f"Error processing prescription: {e}")
+        return {
+            "error": str(e),
+            "status": "failed"
+        }
+
+    return run_blocking(structure_prescription_text(extracted_text))
+
+
+def process_lab_report(image_path: str) -> Dict[str, Any]:
+    """
+    Process a lab report image:
+    1. Upload to Gemini and extract text via OCR
+    2. Send extracted text to lab_report_agent
+    3. Return structured lab report data with proper extraction from ADK response
+    """
+    try:
+        logger.info(f"Processing lab report: {image_path}")
+        extracted_text = extract_document_text(image_path, display_name="LabReport")
+    except Exception as e:
+        logger.error(f"Error processing lab report: {e}")
+        return {
+            "error": str(e),
+            "status": "failed"
+        }
+
+    return run_blocking(structure_lab_report_text(extracted_text))
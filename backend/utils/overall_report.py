@@ -1,14 +1,23 @@
 import os
 from dotenv import load_dotenv
 import json
-import re
-import requests
 import uuid
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 from db.models import CheckIn, Prescription, Report, OverallReport
+from utils.executors import call_in_stage
+from utils.adk_client import stream_agent_blocking
+from utils.resilience import STAGE_BUDGETS
+from utils.adk_parser import parse_adk_response, OVERALL_REPORT_RESPONSE
+from utils.singleflight import get_single_flight
+from utils.compact_json import serialize_for_agent
+from utils.scheduler import request_priority, BACKGROUND
+from utils.lab_trends import compute_clinical_trends, apply_metric_trends
+from utils.medications import compute_medication_overview, apply_medication_overview
 
 # Load environment variables
 load_dotenv()
@@ -16,112 +25,37 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load ADK server URL
-ADK_SERVER_URL = os.getenv("ADK_SERVER_URL", "http://localhost:5010")
-
-
-def call_agent(agent_name: str, input_data: str) -> Dict[str, Any]:
-    """
-    Call a single ADK agent API (session creation + /run request).
-    """
-    try:
-        logger.info(f"Calling {agent_name} at {ADK_SERVER_URL}")
-
-        user_id = "u_backend"
-        session_id = f"s_{uuid.uuid4().hex[:8]}"
-
-        # Step 1: Create session
-        session_endpoint = f"{ADK_SERVER_URL}/apps/{agent_name}/users/{user_id}/sessions/{session_id}"
-        session_payload = {"state": {}}
-
-        session_resp = requests.post(
-            session_endpoint,
-            json=session_payload,
-            headers={"Content-Type": "application/json"},
-            timeout=60
-        )
-
-        if session_resp.status_code != 200:
-            return {
-                "error": f"Session creation failed for {agent_name}",
-                "details": session_resp.text
-            }
-
-        logger.info(f"Session created for {agent_name}: {session_id}")
-
-        # Step 2: Run with input data
-        payload = {
-            "app_name": agent_name,
-            "user_id": user_id,
-            "session_id": session_id,
-            "new_message": {
-                "role": "user",
-                "parts": [{"text": input_data}]
-            }
-        }
-
-        run_response = requests.post(
-            f"{ADK_SERVER_URL}/run",
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=600
-        )
-
-        if run_response.status_code != 200:
-            return {
-                "error": f"{agent_name} run failed",
-                "details": run_response.text
-            }
-
-        logger.info(f"{agent_name} completed successfully")
-        return run_response.json()
-
-    except requests.exceptions.Timeout:
-        return {"error": f"{agent_name} request timed out"}
-
-    except requests.exceptions.RequestException as e:
-        return {"error": f"{agent_name} request failed: {str(e)}"}
-
-    except json.JSONDecodeError:
-        return {"error": f"{agent_name} returned invalid JSON"}
-
-
-def extract_json_from_text(data: Any) -> List[Dict[str, Any]]:
-    """
-    Recursively extract JSON objects from the agent response.
-    """
-    extracted_jsons = []
-
-    def recursive_search(obj):
-        if isinstance(obj, dict):
-            if 'text' in obj and isinstance(obj['text'], str):
-                text_content = obj['text']
-
-                # Try parsing direct JSON
-                try:
-                    parsed_direct = json.loads(text_content)
-                    extracted_jsons.append(parsed_direct)
-                except json.JSONDecodeError:
-                    # Look for code blocks
-                    json_pattern = r'```json\s*\n(.*?)\n```'
-                    matches = re.findall(json_pattern, text_content, re.DOTALL)
-                    for match in matches:
-                        try:
-                            parsed_json = json.loads(match)
-                            extracted_jsons.append(parsed_json)
-                        except json.JSONDecodeError:
-                            logger.warning("Failed to parse a JSON block")
-
-            for value in obj.values():
-                recursive_search(value)
-
-        elif isinstance(obj, list):
-            for item in obj:
-                recursive_search(item)
-
-    recursive_search(data)
-    return extracted_jsons
-
+# State keys written by the report_agent sub-agents, in pipeline order
+REPORT_SECTIONS = (
+    "timeline",
+    "clinical_trends",
+    "risk_and_severity",
+    "possible_conditions",
+    "medication_overview",
+    "final_report",
+    "patient_health_report",
+)
+
+# "incremental": feed the previous OverallReport plus only the records added since it;
+# "full": re-analyse the whole history every time
+OVERALL_REPORT_MODE = os.getenv("OVERALL_REPORT_MODE", "incremental")
+# Incremental reports drift (edited or deleted records are not seen), so rebuild from the
+# full history after this many incremental generations or this many days
+REPORT_FULL_REBUILD_EVERY = int(os.getenv("REPORT_FULL_REBUILD_EVERY", "10"))
+REPORT_FULL_REBUILD_DAYS = float(os.getenv("REPORT_FULL_REBUILD_DAYS", "30"))
+# Records are stamped when their transaction starts but only visible once it commits, so
+# an incremental report re-reads this window before the previous cutoff and skips the
+# records the previous report already had (kept in generation["recent_records"])
+REPORT_OVERLAP_SECONDS = float(os.getenv("REPORT_OVERLAP_SECONDS", "600"))
+# Record sections of the report agent input
+RECORD_SECTIONS = ("checkins", "prescriptions", "lab_reports")
+
+INCREMENTAL_INSTRUCTIONS = (
+    "previous_report is this patient's health report covering every record up to {data_through}. "
+    "checkins, prescriptions and lab_reports contain only the records added since then. "
+    "Update each section with the new records: extend the timeline, compare new lab values "
+    "against the previous report's current values, and keep earlier findings that still apply."
+)
 
 def safe_parse_json(data, default=None):
     """Safely parse JSON data"""
@@ -140,16 +74,36 @@ def safe_parse_json(data, default=None):
     return default
 
 
-def retrieve_all_medical_data(db: Session) -> Dict[str, Any]:
+def retrieve_all_medical_data(
+    db: Session,
+    since: Optional[datetime] = None,
+    exclude_ids: Optional[Dict[str, List[int]]] = None
+) -> Dict[str, Any]:
     """
     Retrieve all check-ins, prescriptions, and lab reports from the database
-    and format them as JSON for the report agent.
+    (only those stored after since, if given, and not listed in exclude_ids by
+    section) and format them as JSON for the report agent.
     """
     try:
         # Retrieve check-ins
-        checkins = db.query(CheckIn).order_by(desc(CheckIn.timestamp)).all()
-        prescriptions = db.query(Prescription).order_by(desc(Prescription.timestamp)).all()
-        reports = db.query(Report).order_by(desc(Report.timestamp)).all()
+        checkins_query = db.query(CheckIn)
+        prescriptions_query = db.query(Prescription)
+        reports_query = db.query(Report)
+        if since is not None:
+            checkins_query = checkins_query.filter(CheckIn.timestamp > since)
+            prescriptions_query = prescriptions_query.filter(Prescription.timestamp > since)
+            reports_query = reports_query.filter(Report.timestamp > since)
+        exclude_ids = exclude_ids or {}
+        if exclude_ids.get("checkins"):
+            checkins_query = checkins_query.filter(CheckIn.id.notin_(exclude_ids["checkins"]))
+        if exclude_ids.get("prescriptions"):
+            prescriptions_query = prescriptions_query.filter(Prescription.id.notin_(exclude_ids["prescriptions"]))
+        if exclude_ids.get("lab_reports"):
+            reports_query = reports_query.filter(Report.id.notin_(exclude_ids["lab_reports"]))
+
+        checkins = checkins_query.order_by(desc(CheckIn.timestamp)).all()
+        prescriptions = prescriptions_query.order_by(desc(Prescription.timestamp)).all()
+        reports = reports_query.order_by(desc(Report.timestamp)).all()
 
         logger.info(f"Retrieved {len(checkins)} check-ins, {len(prescriptions)} prescriptions, {len(reports)} lab reports")
 
@@ -229,34 +183,248 @@ def retrieve_all_medical_data(db: Session) -> Dict[str, Any]:
         raise
 
 
-def process_overall_report(db: Session, output_dir: str = "uploads/overall_reports") -> Dict[str, Any]:
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def plan_report_generation(db: Session, full_rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Decide whether the next overall report is built from the full history or
+    incrementally from the latest OverallReport (whose structured_data["generation"]
+    records what it covered). Returns mode, reason, previous report, the time new
+    records are read from (since, REPORT_OVERLAP_SECONDS before the previous report's
+    data_through), the records in that window the previous report already had
+    (exclude_ids, recent_records) and the time the new report covers data up to.
+    """
+    # The database clock, which also stamps the records
+    data_through = db.query(func.now()).scalar()
+    if not isinstance(data_through, datetime):
+        data_through = datetime.fromisoformat(str(data_through))
+    previous = db.query(OverallReport).order_by(desc(OverallReport.timestamp)).first()
+    generation = (safe_parse_json(previous.structured_data, {}).get("generation") or {}) if previous else {}
+    previous_through = _parse_time(generation.get("data_through"))
+    last_full_through = _parse_time(generation.get("last_full_data_through"))
+    incremental_count = generation.get("incremental_count", 0)
+    recent_records = generation.get("recent_records")
+
+    reason = None
+    if full_rebuild:
+        reason = "full rebuild requested"
+    elif OVERALL_REPORT_MODE != "incremental":
+        reason = f"OVERALL_REPORT_MODE={OVERALL_REPORT_MODE}"
+    elif previous is None:
+        reason = "no previous report"
+    elif previous_through is None or last_full_through is None:
+        reason = "previous report has no generation metadata"
+    elif incremental_count >= REPORT_FULL_REBUILD_EVERY:
+        reason = f"{incremental_count} incremental reports since the last full rebuild"
+    elif data_through - last_full_through > timedelta(days=REPORT_FULL_REBUILD_DAYS):
+        reason = f"last full rebuild is older than {REPORT_FULL_REBUILD_DAYS:g} days"
+
+    if reason is not None:
+        return {"mode": "full", "reason": reason, "previous": None, "since": None, "previous_through": None,
+                "exclude_ids": None, "recent_records": {}, "data_through": data_through,
+                "incremental_count": 0, "last_full_data_through": data_through}
+
+    if isinstance(recent_records, dict):
+        since = previous_through - timedelta(seconds=REPORT_OVERLAP_SECONDS)
+        exclude_ids = {section: [int(record_id) for record_id in ids] for section, ids in recent_records.items()}
+    else:
+        # Reports from before the overlap window was recorded: no window to re-read
+        since, exclude_ids, recent_records = previous_through, None, {}
+    return {"mode": "incremental", "reason": f"records since report {previous.id}", "previous": previous,
+            "since": since, "previous_through": previous_through, "exclude_ids": exclude_ids,
+            "recent_records": recent_records, "data_through": data_through,
+            "incremental_count": incremental_count + 1, "last_full_data_through": last_full_through}
+
+
+def _recent_records(
+    medical_data: Dict[str, Any], carried: Dict[str, Dict[str, str]], data_through: datetime
+) -> Dict[str, Dict[str, str]]:
+    """
+    {section: {id: timestamp}} of the records stamped within REPORT_OVERLAP_SECONDS of
+    data_through: the ones just read plus those carried over from earlier reports.
+    """
+    cutoff = data_through - timedelta(seconds=REPORT_OVERLAP_SECONDS)
+    recent = {}
+    for section in RECORD_SECTIONS:
+        stamps = dict(carried.get(section) or {})
+        stamps.update({
+            str(record["id"]): record["timestamp"]
+            for record in medical_data.get(section) or [] if record.get("timestamp")
+        })
+        recent[section] = {
+            record_id: timestamp for record_id, timestamp in stamps.items()
+            if (_parse_time(timestamp) or cutoff) > cutoff
+        }
+    return recent
+
+
+def process_overall_report(
+    db: Session,
+    output_dir: str = "uploads/overall_reports",
+    on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    full_rebuild: bool = False
+) -> Dict[str, Any]:
     """
     Process an overall medical report:
-    1. Retrieve all check-ins, prescriptions, and lab reports
-    2. Format as JSON
+    1. Retrieve check-ins, prescriptions, and lab reports, and compute lab metric
+       trends and the prescribed medications over the whole history (see
+       utils.lab_trends and utils.medications)
+    2. Format as compact JSON (see utils.compact_json)
     3. Send to report_agent
     4. Extract structured response
     5. Generate PDF
     6. Save OverallReport to database
-    
+
+    In incremental mode (the default, see plan_report_generation) step 1 only reads the
+    records stored since the previous report, and the agent gets that report's sections
+    to update, so the cost follows the new data rather than the whole history. If nothing
+    was added the previous report is returned as is. full_rebuild forces a full run.
+
+    The agent run is streamed and each sub-agent's stateDelta is merged as it arrives.
+    on_progress(event, data) is called with "stage" ({"stage": ...}) and, as each report
+    section completes, "section" ({"section", "data", "completed", "total"}).
+
+    Steps 3-6 are coalesced: a request arriving while a report over the same medical
+    data is being generated (e.g. a double-clicked button) waits for that run and gets
+    the same OverallReport, with its progress from the point it joined.
+
     Returns the OverallReport database record.
     """
+    def report_progress(event: str, data: Dict[str, Any]) -> None:
+        if on_progress is None:
+            return
+        try:
+            on_progress(event, data)
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
+
     try:
-        # Ensure output directory exists
-        os.makedirs(output_dir, exist_ok=True)
-        os.makedirs(os.path.join(output_dir, "charts"), exist_ok=True)
+        # Step 1: Retrieve the medical data the report needs
+        report_progress("stage", {"stage": "collecting"})
+        plan = plan_report_generation(db, full_rebuild)
+        logger.info(f"Starting {plan['mode']} overall report generation ({plan['reason']})")
+        medical_data = retrieve_all_medical_data(db, since=plan["since"], exclude_ids=plan["exclude_ids"])
+        new_records = {section: len(records) for section, records in medical_data.items()}
+        recent_records = _recent_records(medical_data, plan["recent_records"], plan["data_through"])
+
+        previous = plan["previous"]
+        if previous is not None:
+            if not any(new_records.values()):
+                logger.info(f"No records since overall report {previous.id}; returning it")
+                return {
+                    "id": previous.id,
+                    "pdf_file_path": previous.pdf_file_path,
+                    "status": "success",
+                    "reused": True,
+                    "structured_data": safe_parse_json(previous.structured_data, {})
+                }
+            previous_data = safe_parse_json(previous.structured_data, {})
+            medical_data = {
+                "instructions": INCREMENTAL_INSTRUCTIONS.format(data_through=plan["previous_through"].isoformat()),
+                "previous_report": {key: previous_data[key] for key in REPORT_SECTIONS[:-1] if key in previous_data},
+                **medical_data
+            }
+
+        # Lab trends and prescribed courses are arithmetic: compute them over the whole
+        # history here and only leave comments and ambiguous entries to the agent
+        metric_trends = compute_clinical_trends(db)
+        medical_data["metric_trends"] = metric_trends
+        medications = compute_medication_overview(db)
+        medical_data["prescribed_medications"] = medications
+        # Every prescribed medicine is in prescribed_medications.medication_timeline
+        for prescription in medical_data["prescriptions"]:
+            prescription.pop("medicines", None)
+            if isinstance(prescription.get("structured_data"), dict):
+                prescription["structured_data"].pop("medicines", None)
+
+        generation = {
+            "mode": plan["mode"],
+            "reason": plan["reason"],
+            "based_on_report_id": previous.id if previous is not None else None,
+            "data_through": plan["data_through"].isoformat(),
+            "last_full_data_through": plan["last_full_data_through"].isoformat(),
+            "incremental_count": plan["incremental_count"],
+            "recent_records": recent_records,
+            "records": new_records
+        }
+
+        # Step 2: Serialize for the agent without duplicated blobs, empty fields or indentation
+        medical_data_json = serialize_for_agent(medical_data, "report_agent")
+
+        # The report run is long and not latency critical; uploads get quota first
+        data_hash = hashlib.sha256(medical_data_json.encode("utf-8")).hexdigest()
+        with request_priority(BACKGROUND):
+            result, shared = get_single_flight("overall_report").do(
+                data_hash,
+                lambda notify: _generate_overall_report(
+                    db, medical_data_json, output_dir, notify, generation, metric_trends, medications
+                ),
+                listener=report_progress
+            )
+        if shared:
+            logger.info(f"Overall report {result.get('id')} shared with a concurrent identical request")
+        return result
+
+    except Exception as e:
+        logger.error(f"Error processing overall report: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return {
+            "error": str(e),
+            "status": "failed"
+        }
 
-        logger.info("Starting overall report generation")
 
-        # Step 1: Retrieve all medical data
-        medical_data = retrieve_all_medical_data(db)
+def _generate_overall_report(
+    db: Session,
+    medical_data_json: str,
+    output_dir: str,
+    report_progress: Callable[[str, Dict[str, Any]], None],
+    generation: Dict[str, Any],
+    metric_trends: Optional[List[Dict[str, Any]]] = None,
+    medications: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Steps 3-6 of process_overall_report for already formatted medical data.
+    generation (what the report covers) is stored in structured_data["generation"];
+    clinical_trends is built from metric_trends and the agent's trend_commentary;
+    medications, if given, replace the prescription entries in its medication_overview.
+    """
+    structured_data = {}
+    metric_trends = metric_trends or []
+
+    def merge_event(event: Dict[str, Any]) -> None:
+        # Merge each sub-agent's stateDelta as soon as its event arrives
+        state_delta = (event.get("actions") or {}).get("stateDelta") or {}
+        for key, value in state_delta.items():
+            if key == "trend_commentary":
+                key, value = "clinical_trends", apply_metric_trends(value, metric_trends)
+            is_new_section = key in REPORT_SECTIONS and key not in structured_data
+            structured_data[key] = value
+            if is_new_section:
+                completed = sum(1 for section in REPORT_SECTIONS if section in structured_data)
+                report_progress("section", {
+                    "section": key,
+                    "data": value,
+                    "completed": completed,
+                    "total": len(REPORT_SECTIONS)
+                })
 
-        # Step 2: Format as JSON string for the agent
-        medical_data_json = json.dumps(medical_data, indent=2, default=str)
-        logger.info(f"Prepared medical data JSON ({len(medical_data_json)} characters)")
+    try:
+        # Ensure output directory exists
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(os.path.join(output_dir, "charts"), exist_ok=True)
 
         # Step 3: Call report agent
-        agent_response = call_agent("report_agent", medical_data_json)
+        report_progress("stage", {"stage": "agent"})
+        agent_response = stream_agent_blocking(
+            "report_agent", medical_data_json, merge_event, timeout=STAGE_BUDGETS["report"]
+        )
 
         if "error" in agent_response:
             logger.error(f"Agent error: {agent_response['error']}")
@@ -266,35 +434,34 @@ def process_overall_report(db: Session, output_dir: str = "uploads/overall_repor
                 "status": "failed"
             }
 
-        # Step 4: Extract structured data from ADK response format
-        structured_data = {}
-        
-        # Parse through the agent response to extract all state deltas
-        if isinstance(agent_response, list):
-            for entry in agent_response:
-                if isinstance(entry, dict) and 'actions' in entry:
-                    state_delta = entry.get('actions', {}).get('stateDelta', {})
-                    
-                    # Merge all state deltas into structured_data
-                    for key, value in state_delta.items():
-                        structured_data[key] = value
-        
-        # If no data extracted, try the old method as fallback
+        # Step 4: State deltas were merged while streaming; validate the sections
+        # into PatientHealthReport (falls back to JSON in the response text)
+        structured_data.update(parse_adk_response(agent_response, OVERALL_REPORT_RESPONSE)["data"])
         if not structured_data:
-            extracted_jsons = extract_json_from_text(agent_response)
-            if extracted_jsons:
-                structured_data = extracted_jsons[0]
-            else:
-                logger.warning("No structured JSON found in report agent response")
-                return {
-                    "error": "No structured data found in agent response",
-                    "raw_response": agent_response,
-                    "status": "no_json_found"
-                }
+            logger.warning("No structured JSON found in report agent response")
+            return {
+                "error": "No structured data found in agent response",
+                "raw_response": agent_response,
+                "status": "no_json_found"
+            }
 
         logger.info("Successfully extracted structured report data")
+        trend_commentary = structured_data.pop("trend_commentary", None)
+        if trend_commentary is not None or "clinical_trends" not in structured_data:
+            structured_data["clinical_trends"] = apply_metric_trends(trend_commentary, metric_trends)
+        if medications:
+            structured_data["medication_overview"] = apply_medication_overview(
+                structured_data.get("medication_overview"), medications
+            )
+        if isinstance(structured_data.get("patient_health_report"), dict):
+            structured_data["patient_health_report"].pop("trend_commentary", None)
+            for section in ("clinical_trends", "medication_overview"):
+                if section in structured_data:
+                    structured_data["patient_health_report"][section] = structured_data[section]
+        structured_data["generation"] = generation
 
         # Step 5: Generate PDF
+        report_progress("stage", {"stage": "pdf"})
         from utils.pdf_generator import generate_medical_report_pdf
         
         # Create a temporary JSON file for the PDF generator
@@ -308,7 +475,10 @@ def process_overall_report(db: Session, output_dir: str = "uploads/overall_repor
             pdf_filename = f"OverallReport_{uuid.uuid4().hex[:8]}.pdf"
             pdf_path = os.path.join(output_dir, pdf_filename)
             
-            generate_medical_report_pdf(
+            # Rendering is CPU bound; keep it on the bounded PDF executor
+            call_in_stage(
+                "pdf",
+                generate_medical_report_pdf,
                 json_data=structured_data,
                 output_pdf=pdf_path,
                 charts_dir=os.path.join(output_dir, "charts")
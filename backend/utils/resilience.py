@@ -0,0 +1,261 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import logging
+from typing import Dict, Any, Callable, Optional, Awaitable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Retries of transient upstream failures (full-jitter exponential backoff)
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.5"))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "8"))
+
+# A breaker opens after this many consecutive failures and lets a trial call through after the reset time
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Overall time allowed for one upload, and the most any single stage may take of it
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "300"))
+STAGE_BUDGETS = {
+    "ocr": float(os.getenv("OCR_BUDGET_SECONDS", "120")),
+    "agent": float(os.getenv("AGENT_BUDGET_SECONDS", "240")),
+    "report": float(os.getenv("REPORT_AGENT_BUDGET_SECONDS", "900")),
+}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream service whose breaker is open.
+    """
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request has no time left for its next stage or attempt.
+    """
+
+
+class Deadline:
+    """
+    Time budget for one request. Each stage gets at most its STAGE_BUDGETS share,
+    and never more than what is left of the overall deadline.
+    """
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE_SECONDS):
+        self.seconds = seconds
+        self._expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def budget(self, stage: str) -> float:
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Request deadline of {self.seconds:.0f}s exceeded before {stage}")
+        return min(remaining, STAGE_BUDGETS.get(stage, remaining))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream service.
+    closed -> open after failure_threshold failures; open -> half_open after
+    reset_seconds, when a single trial call decides whether it closes again.
+    Thread-safe: used from the ADK client loop and from executor threads.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._stats = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+
+    def allow(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through now. Returns True if the
+        call is the half-open trial, which must end in record_success, record_failure
+        or release_trial.
+        """
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = "half_open"
+                self._trial_in_flight = False
+
+            if self._state == "closed":
+                return False
+            if self._state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self._stats["rejected"] += 1
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != "closed":
+                logger.info(f"Circuit {self.name} closed")
+            self._state = "closed"
+
+    def release_trial(self) -> None:
+        """
+        End a trial call that was abandoned (e.g. cancelled) without an outcome, so the
+        next call can be the trial instead of the breaker staying half open forever.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == "half_open" or (self._state == "closed" and self._failures >= self.failure_threshold):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._stats["opened"] += 1
+                logger.warning(f"Circuit {self.name} opened after {self._failures} consecutive failures")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, state=self._state, consecutive_failures=self._failures)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (0-based) retry."""
+    return random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * (2 ** attempt)))
+
+
+def _remaining(started: float, timeout: Optional[float]) -> Optional[float]:
+    if timeout is None:
+        return None
+    return timeout - (time.monotonic() - started)
+
+
+async def retry_async(
+    fn: Callable[[Optional[float]], Awaitable[Any]],
+    retryable: Callable[[Exception], bool],
+    breaker: Optional[CircuitBreaker] = None,
+    timeout: Optional[float] = None,
+    attempts: int = RETRY_ATTEMPTS,
+    description: str = "call"
+) -> Any:
+    """
+    Await fn(remaining_seconds) with retries of retryable errors, all within timeout.
+    Only retryable (upstream) errors count against the breaker.
+    """
+    started = time.monotonic()
+    for attempt in range(attempts):
+        remaining = _remaining(started, timeout)
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"{description} ran out of time after {attempt} attempt(s)")
+        trial = breaker.allow() if breaker else False
+
+        try:
+            result = await fn(remaining)
+        except DeadlineExceeded:
+            # Out of time before the service was reached (rate limit queue): nothing to record
+            if trial:
+                breaker.release_trial()
+            raise
+        except Exception as e:
+            if not retryable(e):
+                # The service answered; only the request was bad
+                if breaker:
+                    breaker.record_success()
+                raise
+            if breaker:
+                breaker.record_failure()
+            delay = backoff_delay(attempt)
+            remaining = _remaining(started, timeout)
+            if attempt == attempts - 1 or (remaining is not None and remaining <= delay):
+                raise
+            logger.warning(f"{description} failed ({type(e).__name__}: {e}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Cancelled (client gone, deadline): no outcome to record, but free the trial
+            if trial:
+                breaker.release_trial()
+            raise
+
+        if breaker:
+            breaker.record_success()
+        return result
+
+
+def retry_call(
+    fn: Callable[[Optional[float]], Any],
+    retryable: Callable[[Exception], bool],
+    breaker: Optional[CircuitBreaker] = None,
+    timeout: Optional[float] = None,
+    attempts: int = RETRY_ATTEMPTS,
+    description: str = "call"
+) -> Any:
+    """
+    Blocking counterpart of retry_async for code running on executor threads.
+    """
+    started = time.monotonic()
+    for attempt in range(attempts):
+        remaining = _remaining(started, timeout)
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"{description} ran out of time after {attempt} attempt(s)")
+        trial = breaker.allow() if breaker else False
+
+        try:
+            result = fn(remaining)
+        except DeadlineExceeded:
+            # Out of time before the service was reached (rate limit queue): nothing to record
+            if trial:
+                breaker.release_trial()
+            raise
+        except Exception as e:
+            if not retryable(e):
+                # The service answered; only the request was bad
+                if breaker:
+                    breaker.record_success()
+                raise
+            if breaker:
+                breaker.record_failure()
+            delay = backoff_delay(attempt)
+            remaining = _remaining(started, timeout)
+            if attempt == attempts - 1 or (remaining is not None and remaining <= delay):
+                raise
+            logger.warning(f"{description} failed ({type(e).__name__}: {e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            if trial:
+                breaker.release_trial()
+            raise
+
+        if breaker:
+            breaker.record_success()
+        return result
+
+
+def resilience_stats() -> Dict[str, Any]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
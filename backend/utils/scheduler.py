@@ -0,0 +1,254 @@
+import os
+import time
+import heapq
+import asyncio
+import threading
+import itertools
+import contextvars
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List
+
+from utils.resilience import DeadlineExceeded
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+# Lower value is served first
+PRIORITY_ORDER = {INTERACTIVE: 0, BACKGROUND: 1}
+
+# Request rate allowed to each upstream (requests per second, 0 = unlimited) and burst size.
+# Set these to the project's quota; every Gemini OCR and ADK agent call takes one token.
+UPSTREAM_LIMITS = {
+    "gemini": (float(os.getenv("GEMINI_QPS", "0")), float(os.getenv("GEMINI_BURST", "10"))),
+    "adk": (float(os.getenv("ADK_QPS", "0")), float(os.getenv("ADK_BURST", "8"))),
+}
+# Share of each bucket background work may not use, so a live upload never waits behind a backfill
+BACKGROUND_RESERVE = float(os.getenv("SCHEDULER_BACKGROUND_RESERVE", "0.25"))
+# Queue time interactive calls should stay under; longer waits are counted as target misses
+INTERACTIVE_TARGET_SECONDS = float(os.getenv("SCHEDULER_INTERACTIVE_TARGET_SECONDS", "2"))
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(priority: str):
+    """
+    Run the enclosed calls (and the stage executor work they submit) at this priority.
+    """
+    if priority not in PRIORITY_ORDER:
+        raise ValueError(f"Unknown priority: {priority}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Waiter:
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.cancelled = False
+        self.granted = False
+        self.event = threading.Event()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def grant(self) -> None:
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+        else:
+            self.event.set()
+
+
+class UpstreamScheduler:
+    """
+    Token-bucket rate limiter for one upstream service with priority queueing.
+    Waiting calls are granted tokens strictly by priority (then arrival); background
+    calls additionally leave reserve tokens in the bucket for interactive arrivals.
+    A dispatcher thread hands out tokens as they refill, to threads (acquire_blocking)
+    and coroutines on any loop (acquire) alike.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, background_reserve: float = BACKGROUND_RESERVE):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.reserve = self.burst * background_reserve
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._cond = threading.Condition()
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            priority: {"granted": 0, "timed_out": 0, "target_misses": 0, "total_wait": 0.0, "max_wait": 0.0, "waits": deque(maxlen=1000)}
+            for priority in PRIORITY_ORDER
+        }
+
+    @property
+    def limited(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _record(self, priority: str, wait: float) -> None:
+        """Caller holds _cond."""
+        stats = self._stats[priority]
+        stats["granted"] += 1
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+        stats["waits"].append(wait)
+        if priority == INTERACTIVE and wait > INTERACTIVE_TARGET_SECONDS:
+            stats["target_misses"] += 1
+
+    def _try_take(self, priority: str) -> bool:
+        """Take a token without queueing if nobody of equal or higher priority waits. Caller holds _cond."""
+        if self._queue and self._queue[0][0] <= PRIORITY_ORDER[priority]:
+            return False
+        self._refill(time.monotonic())
+        floor = self.reserve if priority == BACKGROUND else 0.0
+        if self._tokens - 1 < floor:
+            return False
+        self._tokens -= 1
+        self._record(priority, 0.0)
+        return True
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        """Caller holds _cond."""
+        heapq.heappush(self._queue, (PRIORITY_ORDER[waiter.priority], next(self._sequence), waiter))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, name=f"{self.name}-scheduler", daemon=True)
+            self._thread.start()
+        self._cond.notify()
+
+    def _dispatch(self) -> None:
+        with self._cond:
+            while True:
+                while self._queue and self._queue[0][2].cancelled:
+                    heapq.heappop(self._queue)
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+
+                waiter = self._queue[0][2]
+                now = time.monotonic()
+                self._refill(now)
+                floor = self.reserve if waiter.priority == BACKGROUND else 0.0
+                needed = floor + 1 - self._tokens
+                if needed > 0:
+                    # Sleep until enough has refilled; a new (higher priority) arrival wakes us early
+                    self._cond.wait(timeout=needed / self.rate)
+                    continue
+
+                heapq.heappop(self._queue)
+                self._tokens -= 1
+                self._record(waiter.priority, now - waiter.enqueued_at)
+                waiter.granted = True
+                waiter.grant()
+
+    def _cancel(self, waiter: _Waiter) -> bool:
+        """Withdraw a timed out waiter; False if its token was granted meanwhile."""
+        with self._cond:
+            if waiter.granted:
+                return False
+            waiter.cancelled = True
+            self._stats[waiter.priority]["timed_out"] += 1
+            self._cond.notify()
+            return True
+
+    def acquire_blocking(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a token on a worker thread. Returns the seconds spent queued; raises
+        DeadlineExceeded if none is granted within timeout.
+        """
+        priority = priority or current_priority()
+        with self._cond:
+            if not self.limited:
+                self._record(priority, 0.0)
+                return 0.0
+            if self._try_take(priority):
+                return 0.0
+            waiter = _Waiter(priority)
+            self._enqueue(waiter)
+
+        if not waiter.event.wait(timeout) and self._cancel(waiter):
+            raise DeadlineExceeded(f"No {self.name} capacity within {timeout:.1f}s ({priority})")
+        return time.monotonic() - waiter.enqueued_at
+
+    async def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """
+        Coroutine counterpart of acquire_blocking; does not block the event loop.
+        """
+        priority = priority or current_priority()
+        with self._cond:
+            if not self.limited:
+                self._record(priority, 0.0)
+                return 0.0
+            if self._try_take(priority):
+                return 0.0
+            waiter = _Waiter(priority)
+            waiter.loop = asyncio.get_running_loop()
+            waiter.future = waiter.loop.create_future()
+            self._enqueue(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if self._cancel(waiter):
+                raise DeadlineExceeded(f"No {self.name} capacity within {timeout:.1f}s ({priority})")
+        return time.monotonic() - waiter.enqueued_at
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            queued = {priority: 0 for priority in PRIORITY_ORDER}
+            for _, _, waiter in self._queue:
+                if not waiter.cancelled:
+                    queued[waiter.priority] += 1
+
+            classes = {}
+            for priority, stats in self._stats.items():
+                waits = sorted(stats["waits"])
+                classes[priority] = {
+                    "granted": stats["granted"],
+                    "queued": queued[priority],
+                    "timed_out": stats["timed_out"],
+                    "avg_wait_seconds": round(stats["total_wait"] / stats["granted"], 3) if stats["granted"] else 0.0,
+                    "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                    "max_wait_seconds": round(stats["max_wait"], 3),
+                }
+                if priority == INTERACTIVE:
+                    classes[priority]["target_misses"] = stats["target_misses"]
+
+            return {
+                "rate_per_second": self.rate if self.limited else None,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2) if self.limited else None,
+                "classes": classes,
+            }
+
+
+_schedulers: Dict[str, UpstreamScheduler] = {
+    name: UpstreamScheduler(name, rate, burst) for name, (rate, burst) in UPSTREAM_LIMITS.items()
+}
+
+
+def get_scheduler(upstream: str) -> UpstreamScheduler:
+    if upstream not in _schedulers:
+        raise ValueError(f"Unknown upstream: {upstream}")
+    return _schedulers[upstream]
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    return {name: scheduler.stats() for name, scheduler in _schedulers.items()}
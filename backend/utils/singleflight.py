@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import logging
+from typing import Dict, Any, Callable, Optional, Tuple, Awaitable, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """
+    One in-flight execution and the callers waiting for it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.listeners: List[Callable] = []
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution: the first caller
+    runs the work, callers arriving while it is in flight wait for and share its result
+    (or exception). Nothing is kept once the call finishes, so later calls run again.
+
+    do() is for worker threads; do_async() for coroutines on one event loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, asyncio.Future] = {}
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[Callable], Any], listener: Optional[Callable] = None) -> Tuple[Any, bool]:
+        """
+        Run fn(notify) unless a call with this key is in flight, in which case wait for
+        that one. notify(*args) forwards progress to the listener of every caller sharing
+        the call, including those that joined later. Returns (result, shared).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+            else:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+            if listener is not None:
+                call.listeners.append(listener)
+
+        if not leader:
+            logger.info(f"{self.name}: joining in-flight call {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        def notify(*args) -> None:
+            with self._lock:
+                listeners = list(call.listeners)
+            for forward in listeners:
+                try:
+                    forward(*args)
+                except Exception as e:
+                    logger.warning(f"{self.name}: listener failed: {e}")
+
+        try:
+            call.result = fn(notify)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Await fn() unless a call with this key is in flight on this loop. A caller that
+        joins waits at most timeout seconds (asyncio.TimeoutError) without cancelling
+        the shared call. Returns (result, shared).
+        """
+        future = self._async_calls.get(key)
+        if future is not None:
+            with self._lock:
+                self._stats["coalesced"] += 1
+            logger.info(f"{self.name}: joining in-flight call {key}")
+            return await asyncio.wait_for(asyncio.shield(future), timeout), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        with self._lock:
+            self._stats["executions"] += 1
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Only joined callers should see the error; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._async_calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls) + len(self._async_calls))
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.stats() for flight in flights}
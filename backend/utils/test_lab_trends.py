@@ -0,0 +1,46 @@
+"""
+Regression checks for the lab trend arithmetic (run from the backend directory):
+    python -m utils.test_lab_trends
+"""
+from datetime import date
+
+import numpy as np
+
+from utils.lab_trends import parse_reference_range, compute_metric_trends
+
+
+def _reading(test_name, value, day, reference_range, interpretation="", unit=""):
+    return {
+        "test_name": test_name, "value": value, "day": day, "unit": unit,
+        "reference_range": reference_range, "interpretation": interpretation,
+    }
+
+
+def test_comma_grouped_ranges():
+    """Digit-group commas are part of the number, not a separator"""
+    assert parse_reference_range("4,000 - 11,000") == (4000.0, 11000.0)
+    assert parse_reference_range("150,000 - 450,000 /cumm") == (150000.0, 450000.0)
+    low, high = parse_reference_range("Male: 13-17, Female: 12-15")
+    assert np.isnan(low) and np.isnan(high)
+
+    trends = compute_metric_trends([
+        _reading("WBC", 8000, date(2024, 5, 1), "4,000 - 11,000", "Normal", "cells/cumm"),
+        _reading("Platelets", 250000, date(2024, 5, 1), "150,000 - 450,000", unit="/cumm"),
+    ])
+    assert {trend["metric"]: trend["status"] for trend in trends} == {"WBC": "normal", "Platelets": "normal"}
+
+
+def test_range_contradicting_interpretation():
+    """A range the printed interpretation disagrees with is not used"""
+    trends = compute_metric_trends([
+        _reading("Vitamin D", 18, date(2024, 1, 1), "0.3 - 1.2", "Low", "ng/mL"),
+        _reading("Vitamin D", 24, date(2024, 5, 1), "0.3 - 1.2", "Low", "ng/mL"),
+    ])
+    assert trends[0]["status"] == "abnormal_low"
+    assert trends[0]["trend"] == "increasing"
+
+
+if __name__ == "__main__":
+    test_comma_grouped_ranges()
+    test_range_contradicting_interpretation()
+    print("✓ Lab trend checks passed")
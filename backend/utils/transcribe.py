@@ -1,65 +1,200 @@
 import subprocess
 import json
 import os
+import threading
+from typing import Dict, Any
 
-def transcribe_audio(file_path: str, output_dir: str = "uploads/transcripts"):
+from utils.transcription_worker import TranscriptionWorker
+from utils.whisperx_json import clean_whisperx_json
+from utils.transcript_cache import audio_content_hash, transcript_cache_key, get_cached_transcript, put_cached_transcript, transcript_cache_stats
+
+# "worker" keeps the models loaded in a long-lived process; "cli" spawns the whisperx CLI per file
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "worker")
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "medium")
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "en")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+DIARIZE_MODEL = "pyannote/speaker-diarization-3.0"
+MAX_SPEAKERS = 2
+
+# Recordings at least this long are split on pauses and transcribed in parallel (worker backend only)
+TRANSCRIBE_CHUNKED_MIN_SECONDS = float(os.getenv("TRANSCRIBE_CHUNKED_MIN_SECONDS", "600"))
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "120"))
+# Every chunk worker process loads its own Whisper model, so keep this small
+TRANSCRIBE_CHUNK_WORKERS = int(os.getenv("TRANSCRIBE_CHUNK_WORKERS", "2"))
+
+# Draft transcripts: a small model without diarization, served by its own worker so a
+# draft never waits behind a full transcription
+DRAFT_WHISPER_MODEL = os.getenv("DRAFT_WHISPER_MODEL", "base")
+
+_workers: Dict[str, TranscriptionWorker] = {}
+_worker_lock = threading.Lock()
+
+
+def get_transcription_worker(draft: bool = False) -> TranscriptionWorker:
     """
-    Transcribe audio using WhisperX CLI with diarization and remove 'words' & 'word_segments' fields from the result.
-    
-    Args:
-        file_path: Path to the audio file
-        output_dir: Directory where WhisperX will save the output
-    
-    Returns:
-        dict: Parsed transcript with diarization data (without 'words' or 'word_segments')
+    The process-wide transcription worker, or the draft worker (models are loaded on first use).
     """
-    print("transcribe called")
-    os.makedirs(output_dir, exist_ok=True)
+    name = "draft" if draft else "full"
+    with _worker_lock:
+        if name not in _workers:
+            _workers[name] = TranscriptionWorker({
+                "model": DRAFT_WHISPER_MODEL if draft else WHISPER_MODEL,
+                "language": WHISPER_LANGUAGE,
+                "compute_type": WHISPER_COMPUTE_TYPE,
+                "device": WHISPER_DEVICE,
+                "batch_size": WHISPER_BATCH_SIZE,
+                "diarize": not draft,
+                "diarize_model": DIARIZE_MODEL,
+                "max_speakers": MAX_SPEAKERS,
+                "hf_token": os.getenv("HF_TOKEN"),
+                "chunked_min_seconds": TRANSCRIBE_CHUNKED_MIN_SECONDS,
+                "chunk_seconds": TRANSCRIBE_CHUNK_SECONDS,
+                # Drafts of long recordings are fast enough without a chunk pool
+                "chunk_workers": 1 if draft else TRANSCRIBE_CHUNK_WORKERS,
+            })
+        return _workers[name]
+
+
+def transcription_stats() -> Dict[str, Any]:
+    """
+    Model load vs. inference timings of the transcription workers and transcript cache counters.
+    """
+    return {
+        "backend": TRANSCRIBE_BACKEND,
+        "worker": _workers["full"].stats() if "full" in _workers else None,
+        "draft_worker": _workers["draft"].stats() if "draft" in _workers else None,
+        "cache": transcript_cache_stats()
+    }
+
+
+def preload_transcription_worker(draft: bool = False) -> None:
+    """
+    Load the transcription models at startup instead of on the first check-in.
+    """
+    if TRANSCRIBE_BACKEND == "worker":
+        get_transcription_worker(draft).start()
+
+
+def stop_transcription_worker() -> None:
+    for worker in list(_workers.values()):
+        worker.stop()
+
+
+def transcription_params(draft: bool = False) -> Dict[str, Any]:
+    """
+    Every setting that changes the transcript; part of the transcript cache key.
+    """
+    if draft:
+        return {
+            "model": DRAFT_WHISPER_MODEL,
+            "language": WHISPER_LANGUAGE,
+            "compute_type": WHISPER_COMPUTE_TYPE,
+            "diarize": False,
+        }
+    return {
+        "model": WHISPER_MODEL,
+        "language": WHISPER_LANGUAGE,
+        "compute_type": WHISPER_COMPUTE_TYPE,
+        "diarize": True,
+        "diarize_model": DIARIZE_MODEL,
+        "max_speakers": MAX_SPEAKERS,
+    }
+
+
+def _save_transcript_json(file_path: str, output_dir: str, transcript_data: Dict[str, Any]) -> None:
+    """
+    Save the cleaned transcript JSON where the WhisperX CLI would have written it.
+    """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    json_output_path = os.path.join(output_dir, f"{base_name}.json")
+    with open(json_output_path, 'w', encoding='utf-8') as f:
+        json.dump(transcript_data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def _transcribe_with_worker(file_path: str, output_dir: str, draft: bool = False) -> Dict[str, Any]:
+    """
+    Transcribe in the persistent worker and save the cleaned JSON where the CLI would.
+    """
+    transcript_data, timings = get_transcription_worker(draft).transcribe(file_path)
+    print(f"Transcription timings: {timings}")
+
+    _save_transcript_json(file_path, output_dir, transcript_data)
+    return transcript_data
+
 
+def _transcribe_with_cli(file_path: str, output_dir: str, draft: bool = False) -> Dict[str, Any]:
+    """
+    Run the WhisperX CLI (reloads all models on every call).
+    """
     cmd = [
         "whisperx",
         file_path,
-        "--model", "medium",
+        "--model", DRAFT_WHISPER_MODEL if draft else WHISPER_MODEL,
         "--output_dir", output_dir,
         "--output_format", "json",
-        "--diarize",
-        "--language", "en",
-        "--compute_type", "int8",
-        "--diarize_model", "pyannote/speaker-diarization-3.0",
-        "--max_speakers", "2",
+        "--language", WHISPER_LANGUAGE,
+        "--compute_type", WHISPER_COMPUTE_TYPE,
     ]
+    if not draft:
+        cmd += ["--diarize", "--diarize_model", DIARIZE_MODEL, "--max_speakers", str(MAX_SPEAKERS)]
 
     try:
         # Run WhisperX command
         subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"WhisperX error: {e.stderr}")
+        raise Exception(f"Transcription failed: {e.stderr}")
 
-        # Load WhisperX output JSON
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        json_output_path = os.path.join(output_dir, f"{base_name}.json")
+    # Load WhisperX output JSON
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    json_output_path = os.path.join(output_dir, f"{base_name}.json")
 
-        if not os.path.exists(json_output_path):
-            raise FileNotFoundError(f"WhisperX output not found at {json_output_path}")
+    if not os.path.exists(json_output_path):
+        raise FileNotFoundError(f"WhisperX output not found at {json_output_path}")
 
-        with open(json_output_path, 'r', encoding='utf-8') as f:
-            transcript_data = json.load(f)
+    # Stream the raw dump, dropping 'words' from each segment and the top-level
+    # 'word_segments', and overwrite it with the compact cleaned JSON
+    transcript_data = clean_whisperx_json(json_output_path, json_output_path)
 
-        # Remove 'words' from each segment
-        if "segments" in transcript_data:
-            for segment in transcript_data["segments"]:
-                segment.pop("words", None)
+    return transcript_data
 
-        # Remove top-level 'word_segments' field
-        transcript_data.pop("word_segments", None)
 
-        # (Optional) overwrite cleaned JSON file
-        with open(json_output_path, 'w', encoding='utf-8') as f:
-            json.dump(transcript_data, f, ensure_ascii=False, indent=2)
+def transcribe_audio(file_path: str, output_dir: str = "uploads/transcripts", draft: bool = False):
+    """
+    Transcribe audio using WhisperX with diarization and remove 'words' & 'word_segments' fields from the result.
+    Uses the persistent transcription worker unless TRANSCRIBE_BACKEND=cli.
+    Audio that was already transcribed with the same settings is served from the transcript cache.
 
+    Args:
+        file_path: Path to the audio file
+        output_dir: Directory where the cleaned transcript JSON is saved
+        draft: Quick pass with DRAFT_WHISPER_MODEL and no diarization (no speaker labels)
+
+    Returns:
+        dict: Parsed transcript with diarization data (without 'words' or 'word_segments')
+    """
+    print("transcribe called")
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        cache_key = transcript_cache_key(audio_content_hash(file_path), transcription_params(draft))
+        cached = get_cached_transcript(cache_key)
+        if cached is not None:
+            print("Using cached transcript")
+            _save_transcript_json(file_path, output_dir, cached)
+            return cached
+
+        if TRANSCRIBE_BACKEND == "cli":
+            transcript_data = _transcribe_with_cli(file_path, output_dir, draft)
+        else:
+            transcript_data = _transcribe_with_worker(file_path, output_dir, draft)
+
+        put_cached_transcript(cache_key, transcript_data)
         return transcript_data
 
-    except subprocess.CalledProcessError as e:
-        print(f"WhisperX error: {e.stderr}")
-        raise Exception(f"Transcription failed: {e.stderr}")
     except Exception as e:
         print(f"Error in transcription: {str(e)}")
         raise
@@ -0,0 +1,104 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", "data/transcript_cache")
+# Once the cache grows past this size, least recently used transcripts are evicted
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "500")) * 1024 * 1024
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def audio_content_hash(file_path: str) -> str:
+    """SHA-256 of the audio file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def transcript_cache_key(content_hash: str, params: Dict[str, Any]) -> str:
+    """
+    Cache key over the audio content and every parameter that changes the transcript
+    (model, language, diarization settings).
+    """
+    encoded = json.dumps({"audio": content_hash, **params}, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{key}.json")
+
+
+def get_cached_transcript(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached transcript for key, refreshing its position for eviction.
+    """
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            transcript = json.load(f)
+        os.utime(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    with _lock:
+        _stats["hits"] += 1
+    logger.info(f"Transcript cache hit {key[:12]}")
+    return transcript
+
+
+def put_cached_transcript(key: str, transcript: Dict[str, Any]) -> None:
+    """
+    Store a transcript (written to a temp file and renamed), then evict old entries
+    if the cache is over its size limit.
+    """
+    os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+    temp_path = os.path.join(TRANSCRIPT_CACHE_DIR, f".{key}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(transcript, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp_path, _entry_path(key))
+    _evict_if_needed()
+
+
+def _evict_if_needed() -> None:
+    """Delete least recently used entries until the cache fits TRANSCRIPT_CACHE_MAX_BYTES."""
+    with _lock:
+        entries = []
+        for entry in os.scandir(TRANSCRIPT_CACHE_DIR):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= TRANSCRIPT_CACHE_MAX_BYTES:
+            return
+
+        for _, size, path in sorted(entries):
+            if total <= TRANSCRIPT_CACHE_MAX_BYTES:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                _stats["evictions"] += 1
+            except FileNotFoundError:
+                pass
+        logger.info(f"Transcript cache evicted entries down to {total} bytes")
+
+
+def transcript_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        return dict(_stats, max_bytes=TRANSCRIPT_CACHE_MAX_BYTES)
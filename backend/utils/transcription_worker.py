@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import threading
+import traceback
+import logging
+import multiprocessing
+from typing import Dict, Any, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the worker to load its models before giving up
+WORKER_STARTUP_TIMEOUT = int(os.getenv("TRANSCRIPTION_WORKER_STARTUP_TIMEOUT", "900"))
+
+
+def _worker_main(conn, config: Dict[str, Any]) -> None:
+    """
+    Entry point of the transcription process.
+    Loads the ASR, alignment and diarization models once, then serves requests
+    received over the pipe until it receives None. Recordings longer than
+    chunked_min_seconds are transcribed in parallel chunks on a process pool.
+    """
+    import whisperx
+    from whisperx.diarize import DiarizationPipeline
+    from utils.chunked_transcription import SAMPLE_RATE, create_chunk_pool, transcribe_chunked
+
+    device = config["device"]
+    compute_type = config["compute_type"]
+    chunk_pool = None
+    asr_models = {}
+    align_models = {}
+    diarize_models = {}
+    load_times = {}
+
+    def get_asr_model(name: str, language: str):
+        if (name, language) not in asr_models:
+            started = time.perf_counter()
+            asr_models[(name, language)] = whisperx.load_model(name, device, compute_type=compute_type, language=language)
+            load_times[f"asr:{name}"] = round(time.perf_counter() - started, 3)
+        return asr_models[(name, language)]
+
+    def get_align_model(language: str):
+        if language not in align_models:
+            started = time.perf_counter()
+            align_models[language] = whisperx.load_align_model(language_code=language, device=device)
+            load_times[f"align:{language}"] = round(time.perf_counter() - started, 3)
+        return align_models[language]
+
+    def get_diarize_model(name: str):
+        if name not in diarize_models:
+            started = time.perf_counter()
+            diarize_models[name] = DiarizationPipeline(
+                model_name=name, use_auth_token=config.get("hf_token"), device=device
+            )
+            load_times[f"diarize:{name}"] = round(time.perf_counter() - started, 3)
+        return diarize_models[name]
+
+    try:
+        get_asr_model(config["model"], config["language"])
+        get_align_model(config["language"])
+        if config["diarize"]:
+            get_diarize_model(config["diarize_model"])
+        conn.send(("ready", dict(load_times)))
+    except Exception as e:
+        conn.send(("error", f"Model loading failed: {e}", traceback.format_exc()))
+        return
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            # The server went away without saying goodbye
+            break
+        if request is None:
+            break
+
+        try:
+            loads_before = dict(load_times)
+            started = time.perf_counter()
+
+            audio = whisperx.load_audio(request["audio_path"])
+            duration = len(audio) / SAMPLE_RATE
+            chunked = (
+                config["chunk_workers"] > 1
+                and request["model"] == config["model"]
+                and request["language"] == config["language"]
+                and duration >= config["chunked_min_seconds"]
+            )
+
+            if chunked:
+                # Long recording: transcribe pause-delimited chunks in parallel,
+                # then diarize the whole recording once so speaker labels stay consistent
+                if chunk_pool is None:
+                    chunk_pool = create_chunk_pool(config)
+                result = transcribe_chunked(chunk_pool, audio, config["chunk_seconds"])
+            else:
+                model = get_asr_model(request["model"], request["language"])
+                result = model.transcribe(audio, batch_size=config["batch_size"], language=request["language"])
+
+                align_model, metadata = get_align_model(request["language"])
+                result = whisperx.align(result["segments"], align_model, metadata, audio, device, return_char_alignments=False)
+
+            if request["diarize"]:
+                diarize_model = get_diarize_model(request["diarize_model"])
+                diarize_segments = diarize_model(audio, max_speakers=request["max_speakers"])
+                result = whisperx.assign_word_speakers(diarize_segments, result)
+
+            # Same shape as the cleaned WhisperX CLI output: no word-level data
+            segments = [
+                {key: value for key, value in segment.items() if key != "words"}
+                for segment in result["segments"]
+            ]
+            transcript = json.loads(json.dumps(
+                {"segments": segments, "language": request["language"]}, default=float
+            ))
+
+            # Models loaded lazily for this request count as load time, not inference time
+            new_loads = {key: value for key, value in load_times.items() if key not in loads_before}
+            elapsed = time.perf_counter() - started
+            timings = {
+                "model_load_seconds": round(sum(new_loads.values()), 3),
+                "inference_seconds": round(elapsed - sum(new_loads.values()), 3),
+                "audio_seconds": round(duration, 3),
+                "chunked": chunked,
+            }
+            conn.send(("ok", transcript, timings, new_loads))
+
+        except Exception as e:
+            conn.send(("error", str(e), traceback.format_exc()))
+
+    if chunk_pool is not None:
+        chunk_pool.shutdown(cancel_futures=True)
+
+
+class TranscriptionWorker:
+    """
+    Long-lived process that keeps WhisperX and the pyannote diarization model loaded.
+    Requests are sent over a pipe and handled one at a time; the worker is started on
+    first use and restarted if it dies.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self._lock = threading.Lock()
+        self._process: Optional[multiprocessing.Process] = None
+        self._conn = None
+        self._stats = {
+            "started": 0,
+            "requests": 0,
+            "failures": 0,
+            "model_load_seconds": {},
+            "total_inference_seconds": 0.0,
+            "last_inference_seconds": None,
+        }
+
+    def _start(self) -> None:
+        # spawn: never fork the (multi-threaded) server process.
+        # Not a daemon, because it may start its own chunk worker pool; it exits when the pipe closes.
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=_worker_main, args=(child_conn, self.config), name="transcription-worker")
+        process.start()
+        child_conn.close()
+
+        if not parent_conn.poll(WORKER_STARTUP_TIMEOUT):
+            process.kill()
+            raise Exception("Transcription worker did not start in time")
+
+        message = parent_conn.recv()
+        if message[0] != "ready":
+            process.join(timeout=5)
+            raise Exception(message[1])
+
+        self._process = process
+        self._conn = parent_conn
+        self._stats["started"] += 1
+        self._stats["model_load_seconds"].update(message[1])
+        logger.info(f"Transcription worker ready (pid {process.pid}), model load times: {message[1]}")
+
+    def _ensure_running(self) -> None:
+        if self._process is None or not self._process.is_alive():
+            if self._process is not None:
+                logger.warning("Transcription worker exited; restarting it")
+            self._start()
+
+    def start(self) -> None:
+        """
+        Start the worker and load its models ahead of the first request.
+        """
+        with self._lock:
+            self._ensure_running()
+
+    def transcribe(self, audio_path: str, **options) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Transcribe one file in the worker. Options override the worker defaults
+        (model, language, diarize, diarize_model, max_speakers).
+        Returns (transcript, timings).
+        """
+        request = {
+            "audio_path": os.path.abspath(audio_path),
+            "model": self.config["model"],
+            "language": self.config["language"],
+            "diarize": self.config["diarize"],
+            "diarize_model": self.config["diarize_model"],
+            "max_speakers": self.config["max_speakers"],
+        }
+        request.update({key: value for key, value in options.items() if value is not None})
+
+        with self._lock:
+            self._ensure_running()
+            try:
+                self._conn.send(request)
+                message = self._conn.recv()
+            except (EOFError, OSError) as e:
+                self._stats["failures"] += 1
+                self._process = None
+                raise Exception(f"Transcription worker crashed: {e}")
+
+            if message[0] != "ok":
+                self._stats["failures"] += 1
+                logger.error(message[2])
+                raise Exception(f"Transcription failed: {message[1]}")
+
+            _, transcript, timings, new_loads = message
+            self._stats["requests"] += 1
+            self._stats["model_load_seconds"].update(new_loads)
+            self._stats["total_inference_seconds"] += timings["inference_seconds"]
+            self._stats["last_inference_seconds"] = timings["inference_seconds"]
+
+        logger.info(
+            f"Transcribed {os.path.basename(audio_path)}: inference {timings['inference_seconds']}s, "
+            f"model load {timings['model_load_seconds']}s"
+        )
+        return transcript, timings
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, model_load_seconds=dict(self._stats["model_load_seconds"]))
+            stats["alive"] = self._process is not None and self._process.is_alive()
+        requests = stats["requests"]
+        stats["avg_inference_seconds"] = round(stats["total_inference_seconds"] / requests, 3) if requests else 0.0
+        stats["total_inference_seconds"] = round(stats["total_inference_seconds"], 3)
+        return stats
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                try:
+                    self._conn.send(None)
+                except OSError:
+                    pass
+                self._process.join(timeout=10)
+                if self._process.is_alive():
+                    self._process.kill()
+            self._process = None
+            self._conn = None
@@ -0,0 +1,89 @@
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.models import ProcessedUpload
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# In-process counters since startup; the per-entry hit_count column keeps the all-time total
+_stats = {"hits": 0, "misses": 0, "hits_by_type": {}}
+_stats_lock = threading.Lock()
+
+
+def lookup_processed_upload(db: Session, upload_type: str, content_hash: str) -> Optional[ProcessedUpload]:
+    """
+    Return the previously processed upload with this content hash, counting the hit or miss.
+    """
+    entry = db.query(ProcessedUpload)\
+        .filter(ProcessedUpload.content_hash == content_hash, ProcessedUpload.upload_type == upload_type)\
+        .first()
+
+    with _stats_lock:
+        if entry is None:
+            _stats["misses"] += 1
+        else:
+            _stats["hits"] += 1
+            _stats["hits_by_type"][upload_type] = _stats["hits_by_type"].get(upload_type, 0) + 1
+
+    if entry is None:
+        return None
+
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_hit_at = func.now()
+    db.commit()
+    db.refresh(entry)
+    logger.info(f"Upload cache hit for {upload_type} {content_hash[:12]} (record id: {entry.record_id})")
+    return entry
+
+
+def remember_processed_upload(
+    db: Session,
+    upload_type: str,
+    content_hash: str,
+    file_path: str,
+    record_id: Optional[int] = None,
+    ocr_text: Optional[str] = None,
+    transcript: Optional[Dict[str, Any]] = None,
+    result: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Store the results computed for an upload so identical re-uploads can reuse them.
+    A concurrent upload of the same file may have stored it first; that entry is kept.
+    """
+    entry = ProcessedUpload(
+        content_hash=content_hash,
+        upload_type=upload_type,
+        file_path=file_path,
+        record_id=record_id,
+        ocr_text=ocr_text,
+        transcript=transcript,
+        result=result,
+        hit_count=0,
+    )
+    try:
+        db.add(entry)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        logger.info(f"Upload cache entry for {upload_type} {content_hash[:12]} already exists")
+
+
+def upload_cache_stats(db: Session) -> Dict[str, Any]:
+    """
+    Cache hit counters since startup plus all-time totals from the database.
+    """
+    with _stats_lock:
+        stats = {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "hits_by_type": dict(_stats["hits_by_type"]),
+        }
+    stats["entries"] = db.query(func.count(ProcessedUpload.id)).scalar() or 0
+    stats["total_hits"] = db.query(func.coalesce(func.sum(ProcessedUpload.hit_count), 0)).scalar() or 0
+    return stats
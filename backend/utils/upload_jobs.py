@@ -0,0 +1,553 @@
+import os
+import re
+import asyncio
+import difflib
+import logging
+import traceback
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from db.models import CheckIn, Prescription, Report
+from utils.jobs import create_job, set_stage, set_progress, set_refinement, complete_job, fail_job
+from utils.upload_cache import lookup_processed_upload, remember_processed_upload
+from utils.executors import run_in_stage
+from utils.resilience import Deadline, STAGE_BUDGETS
+from utils.scheduler import request_priority, BACKGROUND
+from utils.transcribe import transcribe_audio, DRAFT_WHISPER_MODEL, WHISPER_MODEL
+from utils.summarize import summarize_checkin_text
+from utils.ocr_summary import extract_document_text, structure_prescription_text, structure_lab_report_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Maximum number of pages of one lab report batch processed at the same time
+LAB_BATCH_CONCURRENCY = int(os.getenv("LAB_BATCH_CONCURRENCY", "10"))
+
+# Check-ins are first stored from a quick draft transcript, then refined with the full model
+CHECKIN_DRAFT_MODE = os.getenv("CHECKIN_DRAFT_MODE", "true").lower() == "true"
+# Fraction of words that must differ between draft and refined transcript before the summary is regenerated
+CHECKIN_REFINE_MIN_CHANGE = float(os.getenv("CHECKIN_REFINE_MIN_CHANGE", "0.1"))
+
+
+def _in_session(work: Callable, *args, **kwargs) -> Any:
+    db = SessionLocal()
+    try:
+        return work(db, *args, **kwargs)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_db(work: Callable, *args, **kwargs) -> Any:
+    """
+    Await work(db, *args, **kwargs) run in its own session on the "db" stage executor,
+    so SQLAlchemy calls never block the event loop and a session never changes threads.
+    """
+    return await run_in_stage("db", _in_session, work, *args, **kwargs)
+
+
+def checkin_summary_fields(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    CheckIn columns filled from a conversation_summarizer_agent result.
+    """
+    inner_summary = summary.get("summary", {}) if summary else {}
+    inner_summary = inner_summary or {}
+
+    return {
+        "summary": inner_summary.get("summary", ""),
+        "mood": inner_summary.get("mood", ""),
+        "symptoms": inner_summary.get("symptoms", []),
+        "medications_taken": inner_summary.get("medications_taken", []),
+        "sleep_quality": inner_summary.get("sleep_quality", ""),
+        "energy_level": inner_summary.get("energy_level", ""),
+        "concerns": inner_summary.get("concerns", ""),
+        "ai_insights": inner_summary.get("ai_insights", []),
+        "overall_score": inner_summary.get("overall_score", "")
+    }
+
+
+def save_checkin(db, file_path: str, transcript: Dict[str, Any], summary: Dict[str, Any]) -> CheckIn:
+    """
+    Store a processed check-in using the CheckIn model.
+    """
+    checkin = CheckIn(
+        audio_path=file_path,
+        transcript=transcript,
+        **checkin_summary_fields(summary)
+    )
+
+    db.add(checkin)
+    db.commit()
+    db.refresh(checkin)
+    return checkin
+
+
+def save_prescription(db, file_path: str, result: Dict[str, Any]) -> Prescription:
+    """
+    Store a processed prescription using the Prescription model.
+    """
+    structured_data = result.get("structured_data") or {}
+    doctor_info = structured_data.get("doctor_info") or {}
+    patient_info = structured_data.get("patient_info") or {}
+    summary = structured_data.get("summary") or {}
+
+    prescription = Prescription(
+        file_path=file_path,
+        ocr_text=result.get("ocr_text", ""),
+        doctor_name=doctor_info.get("name"),
+        doctor_qualification=doctor_info.get("qualification"),
+        doctor_registration_number=doctor_info.get("registration_number"),
+        hospital=doctor_info.get("hospital"),
+        doctor_contact_info=doctor_info.get("contact_info"),
+        prescription_date=doctor_info.get("date"),
+        patient_name=patient_info.get("name"),
+        patient_age=patient_info.get("age"),
+        patient_gender=patient_info.get("gender"),
+        medicines=structured_data.get("medicines", []),
+        diagnosis=summary.get("diagnosis"),
+        symptoms=summary.get("symptoms"),
+        advice=summary.get("advice"),
+        follow_up=summary.get("follow_up"),
+        prescription_summary=structured_data.get("prescription_summary"),
+        structured_data=structured_data
+    )
+
+    db.add(prescription)
+    db.commit()
+    db.refresh(prescription)
+    return prescription
+
+
+def save_lab_report(db, file_path: str, result: Dict[str, Any]) -> Report:
+    """
+    Store a processed lab report using the Report model.
+    """
+    structured_data = result.get("structured_data") or {}
+
+    raw_lab_data = {
+        "report_date": structured_data.get("report_date"),
+        "report_time": structured_data.get("report_time"),
+        "metrics": structured_data.get("metrics", [])
+    }
+
+    lab_analysis = result.get("lab_analysis") or {}
+    lab_risk_scores = result.get("lab_risk_scores") or {}
+    lab_summary = result.get("lab_summary") or {}
+
+    lab_report = Report(
+        file_path=file_path,
+        ocr_text=result.get("ocr_text", ""),
+        report_date=raw_lab_data.get("report_date"),
+        report_time=raw_lab_data.get("report_time"),
+        raw_lab_data=raw_lab_data,
+        lab_analysis=lab_analysis,
+        lab_risk_scores=lab_risk_scores,
+        overall_health_risk_index=lab_risk_scores.get("overall_health_risk_index"),
+        severity=lab_risk_scores.get("severity"),
+        critical_flags=lab_risk_scores.get("critical_flags", []),
+        lab_summary_overview=lab_summary.get("overview"),
+        key_findings=lab_summary.get("key_findings", []),
+        overall_risk=lab_summary.get("overall_risk"),
+        tone=lab_summary.get("tone"),
+        recommendations=lab_summary.get("recommendations", []),
+        critical_alerts=lab_summary.get("critical_alerts", []),
+        structured_data=structured_data
+    )
+
+    db.add(lab_report)
+    db.commit()
+    db.refresh(lab_report)
+    return lab_report
+
+
+# Units of work for run_db: store a processed upload and, if it succeeded, remember
+# its results for identical re-uploads. Each returns the new record id.
+
+def store_checkin(
+    db: Session,
+    file_path: str,
+    transcript: Dict[str, Any],
+    summary: Dict[str, Any],
+    content_hash: Optional[str] = None
+) -> int:
+    checkin = save_checkin(db, file_path, transcript, summary)
+    if content_hash is not None and summary and summary.get("status") == "success":
+        remember_processed_upload(
+            db, "checkin", content_hash, file_path,
+            record_id=checkin.id, transcript=transcript, result={"summary": summary}
+        )
+    return checkin.id
+
+
+def store_prescription(db: Session, file_path: str, content_hash: str, ocr_text: str, result: Dict[str, Any]) -> int:
+    prescription = save_prescription(db, file_path, result)
+    if result.get("status") == "success":
+        remember_processed_upload(
+            db, "prescription", content_hash, file_path,
+            record_id=prescription.id, ocr_text=ocr_text, result=result
+        )
+    return prescription.id
+
+
+def store_lab_report(db: Session, file_path: str, content_hash: str, ocr_text: str, result: Dict[str, Any]) -> int:
+    lab_report = save_lab_report(db, file_path, result)
+    if result.get("status") == "success":
+        remember_processed_upload(
+            db, "lab_report", content_hash, file_path,
+            record_id=lab_report.id, ocr_text=ocr_text, result=result
+        )
+    return lab_report.id
+
+
+def update_refined_checkin(
+    db: Session,
+    checkin_id: int,
+    file_path: str,
+    content_hash: str,
+    transcript: Dict[str, Any],
+    summary: Dict[str, Any],
+    resummarized: bool
+) -> bool:
+    """
+    Replace a draft check-in's transcript (and summary, if regenerated). Returns False
+    if the check-in was deleted meanwhile.
+    """
+    checkin = db.get(CheckIn, checkin_id)
+    if checkin is None:
+        return False
+
+    checkin.transcript = transcript
+    if resummarized:
+        for column, value in checkin_summary_fields(summary).items():
+            setattr(checkin, column, value)
+    db.commit()
+
+    if summary and summary.get("status") == "success":
+        remember_processed_upload(
+            db, "checkin", content_hash, file_path,
+            record_id=checkin_id, transcript=transcript, result={"summary": summary}
+        )
+    return True
+
+
+def reuse_cached_result(
+    db: Session,
+    upload_type: str,
+    file_path: str,
+    content_hash: str
+) -> Optional[Tuple[Optional[int], Dict[str, Any]]]:
+    """
+    If an identical file was processed before, return (record_id, result) from the stored
+    results without any transcription, OCR or agent calls, or None when the upload has to
+    be processed. If the original record was deleted meanwhile, it is re-created from the
+    cached results. A unit of work for run_db.
+    """
+    entry = lookup_processed_upload(db, upload_type, content_hash)
+    if entry is None:
+        return None
+
+    cached = entry.result or {}
+    record_id = entry.record_id
+
+    if upload_type == "checkin":
+        if record_id is None or db.get(CheckIn, record_id) is None:
+            record_id = save_checkin(db, file_path, entry.transcript, cached.get("summary")).id
+        result = {"transcript": entry.transcript, "summary": cached.get("summary")}
+    elif upload_type == "prescription":
+        if record_id is None or db.get(Prescription, record_id) is None:
+            record_id = save_prescription(db, file_path, cached).id
+        result = {"data": cached.get("structured_data") or {}}
+    elif upload_type == "lab_report":
+        if record_id is None or db.get(Report, record_id) is None:
+            record_id = save_lab_report(db, file_path, cached).id
+        result = {"data": cached.get("structured_data") or {}}
+    else:
+        result = {"file_path": file_path, "transcript": entry.transcript}
+
+    if record_id != entry.record_id:
+        entry.record_id = record_id
+        db.commit()
+
+    return record_id, dict(result, duplicate=True)
+
+
+async def reuse_processed_upload(upload_type: str, file_path: str, content_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Finish a job immediately from cached results for a duplicate upload.
+    Returns the completed job, or None when the upload has to be processed.
+    """
+    cached = await run_db(reuse_cached_result, upload_type, file_path, content_hash)
+    if cached is None:
+        return None
+
+    record_id, result = cached
+    job = create_job(upload_type, file_path)
+    complete_job(job["id"], record_id=record_id, result=result)
+    return job
+
+
+def transcript_words(transcript: Dict[str, Any]) -> List[str]:
+    """
+    Lower-cased words of all transcript segments, without punctuation.
+    """
+    text = " ".join(segment.get("text", "") for segment in (transcript or {}).get("segments", []))
+    return re.findall(r"[\w']+", text.lower())
+
+
+def transcript_change_ratio(draft: Dict[str, Any], refined: Dict[str, Any]) -> float:
+    """
+    Fraction of words that differ between two transcripts (0.0 = identical text).
+    Speaker labels and timestamps are ignored.
+    """
+    draft_words, refined_words = transcript_words(draft), transcript_words(refined)
+    if not draft_words and not refined_words:
+        return 0.0
+    matcher = difflib.SequenceMatcher(None, draft_words, refined_words, autojunk=False)
+    return round(1.0 - matcher.ratio(), 4)
+
+
+async def refine_checkin(
+    job_id: str,
+    checkin_id: int,
+    file_path: str,
+    transcript_dir: str,
+    content_hash: str,
+    draft_transcript: Dict[str, Any],
+    draft_summary: Dict[str, Any]
+) -> None:
+    """
+    Refine pass for a check-in stored from a draft transcript: transcribe again with the
+    full model and diarization, replace the stored transcript, and regenerate the summary
+    only if the text changed by at least CHECKIN_REFINE_MIN_CHANGE.
+    """
+    try:
+        set_refinement(job_id, "running", model=WHISPER_MODEL)
+        transcript = await run_in_stage("transcription", transcribe_audio, file_path, output_dir=transcript_dir)
+
+        change = transcript_change_ratio(draft_transcript, transcript)
+        summary = draft_summary
+        resummarized = change >= CHECKIN_REFINE_MIN_CHANGE
+        if resummarized:
+            print(f"Refined transcript differs by {change:.0%}; summarizing again")
+            # The patient already has the draft; don't compete with live uploads for quota
+            with request_priority(BACKGROUND):
+                refined_summary = await summarize_checkin_text(transcript, timeout=STAGE_BUDGETS["agent"])
+            if refined_summary and refined_summary.get("status") == "success":
+                summary = refined_summary
+            else:
+                resummarized = False
+
+        updated = await run_db(
+            update_refined_checkin, checkin_id, file_path, content_hash, transcript, summary, resummarized
+        )
+        if not updated:
+            set_refinement(job_id, "failed", error="Check-in was deleted before refinement finished")
+            return
+
+        set_refinement(
+            job_id, "refined" if resummarized else "unchanged",
+            model=WHISPER_MODEL, change_ratio=change
+        )
+
+    except Exception as e:
+        print(f"Error refining check-in {checkin_id}: {str(e)}")
+        print(traceback.format_exc())
+        set_refinement(job_id, "failed", error=str(e))
+
+
+async def run_checkin_job(job_id: str, file_path: str, transcript_dir: str, content_hash: str) -> None:
+    """
+    Background job: transcribe a check-in recording, summarize it and store a CheckIn.
+    Blocking steps run on their stage executors so the event loop stays free.
+    With CHECKIN_DRAFT_MODE the check-in is stored and the job completed from a quick draft
+    transcript (small model, no diarization); refine_checkin then updates it in the background.
+    """
+    draft_checkin_id = None
+    try:
+        set_stage(job_id, "transcribing")
+        print(f"Transcribing check-in audio: {file_path}")
+        if CHECKIN_DRAFT_MODE:
+            transcript = await run_in_stage(
+                "draft_transcription", transcribe_audio, file_path, output_dir=transcript_dir, draft=True
+            )
+        else:
+            transcript = await run_in_stage("transcription", transcribe_audio, file_path, output_dir=transcript_dir)
+
+        set_stage(job_id, "agent")
+        print("Summarizing check-in transcript...")
+        summary = await summarize_checkin_text(transcript, timeout=STAGE_BUDGETS["agent"])
+        print("Check-in analysis completed")
+
+        if CHECKIN_DRAFT_MODE:
+            # Marked as a draft until the refine pass replaces it
+            stored_transcript = dict(transcript, draft=True, model=DRAFT_WHISPER_MODEL)
+            draft_checkin_id = await run_db(store_checkin, file_path, stored_transcript, summary)
+            set_refinement(job_id, "pending")
+            complete_job(job_id, record_id=draft_checkin_id, result={
+                "transcript": stored_transcript,
+                "summary": summary,
+                "draft": True
+            })
+        else:
+            checkin_id = await run_db(store_checkin, file_path, transcript, summary, content_hash)
+            complete_job(job_id, record_id=checkin_id, result={
+                "transcript": transcript,
+                "summary": summary
+            })
+
+    except Exception as e:
+        print(f"Error processing check-in: {str(e)}")
+        print(traceback.format_exc())
+        fail_job(job_id, str(e))
+
+    if draft_checkin_id is not None:
+        await refine_checkin(job_id, draft_checkin_id, file_path, transcript_dir, content_hash, transcript, summary)
+
+
+async def run_prescription_job(job_id: str, file_path: str, content_hash: str) -> None:
+    """
+    Background job: OCR a prescription image, structure it with prescription_agent and store it.
+    OCR and agent calls share one request deadline, split into per-stage budgets.
+    """
+    deadline = Deadline()
+    try:
+        set_stage(job_id, "ocr")
+        print(f"Processing prescription: {file_path}")
+        extracted_text = await run_in_stage(
+            "ocr", extract_document_text, file_path, display_name="Prescription", timeout=deadline.budget("ocr")
+        )
+
+        set_stage(job_id, "agent")
+        result = await structure_prescription_text(extracted_text, timeout=deadline.budget("agent"))
+
+        if result.get("status") == "failed":
+            fail_job(job_id, result.get("error", "Unknown error"))
+            return
+
+        prescription_id = await run_db(store_prescription, file_path, content_hash, extracted_text, result)
+        complete_job(job_id, record_id=prescription_id, result={
+            "data": result.get("structured_data") or {}
+        })
+
+    except Exception as e:
+        print(f"Error processing prescription: {str(e)}")
+        print(traceback.format_exc())
+        fail_job(job_id, str(e))
+
+
+async def process_lab_report_upload(
+    file_path: str,
+    content_hash: str,
+    on_stage: Optional[Callable[[str], None]] = None
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    OCR a stored lab report image, run lab_report_agent and store the Report.
+    OCR and agent calls share one request deadline, split into per-stage budgets.
+    Returns (record_id, result); raises on failure.
+    """
+    deadline = Deadline()
+    if on_stage:
+        on_stage("ocr")
+    print(f"Processing lab report: {file_path}")
+    extracted_text = await run_in_stage(
+        "ocr", extract_document_text, file_path, display_name="LabReport", timeout=deadline.budget("ocr")
+    )
+
+    if on_stage:
+        on_stage("agent")
+    result = await structure_lab_report_text(extracted_text, timeout=deadline.budget("agent"))
+
+    if result.get("status") == "failed":
+        raise Exception(result.get("error", "Unknown error"))
+
+    record_id = await run_db(store_lab_report, file_path, content_hash, extracted_text, result)
+    return record_id, {"data": result.get("structured_data") or {}}
+
+
+async def run_lab_report_job(job_id: str, file_path: str, content_hash: str) -> None:
+    """
+    Background job: OCR a lab report image, run lab_report_agent and store the Report.
+    """
+    try:
+        record_id, result = await process_lab_report_upload(
+            file_path, content_hash, on_stage=lambda stage: set_stage(job_id, stage)
+        )
+        complete_job(job_id, record_id=record_id, result=result)
+
+    except Exception as e:
+        print(f"Error processing lab report: {str(e)}")
+        print(traceback.format_exc())
+        fail_job(job_id, str(e))
+
+
+async def run_lab_report_batch_job(job_id: str, files: List[Dict[str, str]]) -> None:
+    """
+    Background job for a stack of lab report pages: every file goes through OCR and the
+    lab report agent concurrently, bounded by LAB_BATCH_CONCURRENCY (and by the stage
+    executors), so the batch takes about as long as its slowest page.
+    Each entry of files has filename, file_path and content_hash; the job result lists
+    per-file record ids or errors in the same order.
+    """
+    semaphore = asyncio.Semaphore(LAB_BATCH_CONCURRENCY)
+    completed = 0
+    set_stage(job_id, "ocr")
+    set_progress(job_id, 0, len(files))
+
+    async def process_one(item: Dict[str, str]) -> Dict[str, Any]:
+        nonlocal completed
+        async with semaphore:
+            try:
+                cached = await run_db(reuse_cached_result, "lab_report", item["file_path"], item["content_hash"])
+                if cached is not None:
+                    record_id, result = cached
+                else:
+                    record_id, result = await process_lab_report_upload(item["file_path"], item["content_hash"])
+                entry = {"filename": item["filename"], "status": "completed", "id": record_id, **result}
+            except Exception as e:
+                print(f"Error processing lab report {item['filename']}: {str(e)}")
+                entry = {"filename": item["filename"], "status": "failed", "id": None, "error": str(e)}
+            finally:
+                completed += 1
+                set_progress(job_id, completed, len(files))
+            return entry
+
+    try:
+        # A stack of pages is backfill: its OCR and agent calls yield to single uploads
+        with request_priority(BACKGROUND):
+            results = await asyncio.gather(*(process_one(item) for item in files))
+        failed = sum(1 for entry in results if entry["status"] == "failed")
+        complete_job(job_id, result={
+            "files": results,
+            "succeeded": len(results) - failed,
+            "failed": failed
+        })
+
+    except Exception as e:
+        print(f"Error processing lab report batch: {str(e)}")
+        print(traceback.format_exc())
+        fail_job(job_id, str(e))
+
+
+async def run_insurance_consultation_job(job_id: str, file_path: str, transcript_dir: str, content_hash: str) -> None:
+    """
+    Background job: transcribe an insurance consultation recording.
+    Only the transcript is cached; there is no database record, so the job has no record id.
+    """
+    try:
+        set_stage(job_id, "transcribing")
+        print(f"Transcribing insurance consultation: {file_path}")
+        transcript = await run_in_stage("transcription", transcribe_audio, file_path, output_dir=transcript_dir)
+
+        await run_db(remember_processed_upload, "insurance_consultation", content_hash, file_path, transcript=transcript)
+        complete_job(job_id, result={
+            "file_path": file_path,
+            "transcript": transcript
+        })
+
+    except Exception as e:
+        print(f"Error processing insurance consultation: {str(e)}")
+        fail_job(job_id, str(e))
@@ -0,0 +1,164 @@
+import os
+import uuid
+import hashlib
+import logging
+import zipfile
+from typing import NamedTuple, Optional, List, Tuple
+
+from fastapi import UploadFile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Uploads are copied to disk in fixed-size chunks, so peak memory per upload is one chunk
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Per upload type size limits (in MB), configurable through the environment
+MAX_UPLOAD_BYTES = {
+    "checkin": int(os.getenv("MAX_CHECKIN_UPLOAD_MB", "200")) * 1024 * 1024,
+    "insurance_consultation": int(os.getenv("MAX_INSURANCE_UPLOAD_MB", "200")) * 1024 * 1024,
+    "prescription": int(os.getenv("MAX_PRESCRIPTION_UPLOAD_MB", "20")) * 1024 * 1024,
+    "lab_report": int(os.getenv("MAX_LAB_REPORT_UPLOAD_MB", "20")) * 1024 * 1024,
+    "lab_report_batch": int(os.getenv("MAX_LAB_BATCH_UPLOAD_MB", "200")) * 1024 * 1024,
+}
+
+# Lab report batches: document types accepted inside zip archives and the maximum number of pages
+LAB_REPORT_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".pdf"}
+MAX_LAB_BATCH_FILES = int(os.getenv("MAX_LAB_BATCH_FILES", "50"))
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the size limit for its type."""
+
+    def __init__(self, upload_type: str, max_bytes: int):
+        self.upload_type = upload_type
+        self.max_bytes = max_bytes
+        super().__init__(f"{upload_type} upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+
+class StoredUpload(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+
+class StreamingUploadWriter:
+    """
+    Writes chunks to a temporary file in dest_dir while hashing them, then atomically
+    renames it into place on commit. Without an explicit filename the file is stored
+    content-addressed as <sha256><suffix>, so identical uploads share one file and
+    different uploads with the same name never overwrite each other.
+    """
+
+    def __init__(self, dest_dir: str, upload_type: str, filename: Optional[str] = None, suffix: str = ""):
+        self.dest_dir = dest_dir
+        self.upload_type = upload_type
+        self.filename = filename
+        self.suffix = suffix
+        self.max_bytes = MAX_UPLOAD_BYTES.get(upload_type, MAX_UPLOAD_BYTES["prescription"])
+        self.temp_path = os.path.join(dest_dir, f".upload-{uuid.uuid4().hex}.part")
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(self.temp_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(self.upload_type, self.max_bytes)
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> StoredUpload:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        sha256 = self._hash.hexdigest()
+        dest_path = os.path.join(self.dest_dir, self.filename or f"{sha256}{self.suffix}")
+        os.replace(self.temp_path, dest_path)
+        return StoredUpload(path=dest_path, sha256=sha256, size=self.size)
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.unlink(self.temp_path)
+
+
+def upload_suffix(filename: Optional[str]) -> str:
+    """File extension of a client-supplied filename, lower-cased ('' if none)."""
+    return os.path.splitext(os.path.basename(filename or ""))[1].lower()
+
+
+async def save_upload(file: UploadFile, dest_dir: str, upload_type: str, filename: Optional[str] = None) -> StoredUpload:
+    """
+    Stream an UploadFile to dest_dir in UPLOAD_CHUNK_SIZE chunks.
+    Enforces the size limit for upload_type and computes a SHA-256 of the content on the fly.
+    The file is stored under its content hash (keeping the original extension)
+    unless an explicit filename is given.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    # Never trust client-supplied directories in the filename
+    safe_name = os.path.basename(filename) if filename else None
+    writer = StreamingUploadWriter(dest_dir, upload_type, filename=safe_name, suffix=upload_suffix(file.filename))
+
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+        stored = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+
+    logger.info(f"Saved {upload_type} upload to {stored.path} ({stored.size} bytes, sha256 {stored.sha256[:12]})")
+    return stored
+
+
+def save_fileobj(fileobj, dest_dir: str, upload_type: str, suffix: str = "") -> StoredUpload:
+    """
+    Synchronous counterpart of save_upload for file-like objects (e.g. members of a
+    zip archive), with the same chunking, hashing, size limit and content addressing.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    writer = StreamingUploadWriter(dest_dir, upload_type, suffix=suffix)
+
+    try:
+        while True:
+            chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+        stored = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+
+    logger.info(f"Saved {upload_type} file to {stored.path} ({stored.size} bytes, sha256 {stored.sha256[:12]})")
+    return stored
+
+
+def extract_lab_report_archive(archive_path: str, dest_dir: str) -> List[Tuple[str, StoredUpload]]:
+    """
+    Stream every lab report document in a zip archive into the content-addressed store.
+    Directories, hidden/macOS metadata entries and unsupported file types are skipped.
+    Returns (member name, stored upload) pairs; raises ValueError for too many documents.
+    """
+    extracted = []
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not os.path.basename(info.filename).startswith(".")
+            and "__MACOSX" not in info.filename
+            and upload_suffix(info.filename) in LAB_REPORT_SUFFIXES
+        ]
+        if len(members) > MAX_LAB_BATCH_FILES:
+            raise ValueError(f"Archive contains {len(members)} documents; the limit is {MAX_LAB_BATCH_FILES}")
+
+        for info in members:
+            with archive.open(info) as member:
+                stored = save_fileobj(member, dest_dir, "lab_report", suffix=upload_suffix(info.filename))
+            extracted.append((os.path.basename(info.filename), stored))
+
+    return extracted
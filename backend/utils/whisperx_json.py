@@ -0,0 +1,195 @@
+import os
+import json
+import uuid
+from typing import Dict, Any, Iterator
+
+# Text read from the raw WhisperX JSON per refill
+READ_CHUNK_SIZE = 64 * 1024
+
+# Word-level data dropped while parsing: per-segment "words" and the top-level "word_segments"
+DROPPED_SEGMENT_KEYS = {"words"}
+DROPPED_TOP_LEVEL_KEYS = {"word_segments"}
+
+_WHITESPACE = " \t\n\r"
+_VALUE_TERMINATORS = _WHITESPACE + ",:]}"
+_decoder = json.JSONDecoder()
+
+
+class JsonStream:
+    """
+    Minimal incremental JSON reader over a text file.
+    Objects and arrays can be walked key by key / element by element, values can be
+    decoded individually, and unwanted values are skipped by scanning without ever
+    being materialised, so memory stays bounded by the largest value actually kept.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Append more text to the buffer (dropping consumed text). False at end of file."""
+        if self._eof:
+            return False
+        chunk = self._f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character, without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self._pos}, found '{self._buf[self._pos]}'")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # In valid JSON a value is always followed by a delimiter; without one in
+                # the buffer yet, a number like "1." may continue in the next chunk
+                if (end < len(self._buf) and self._buf[end] in _VALUE_TERMINATORS) or self._eof or not self._fill():
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def skip_value(self) -> None:
+        """Consume the next JSON value without building it."""
+        if self._peek() not in "{[":
+            self.read_value()
+            return
+
+        depth = 0
+        in_string = False
+        escaped = False
+        while True:
+            buf = self._buf
+            for i in range(self._pos, len(buf)):
+                char = buf[i]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char in "{[":
+                    depth += 1
+                elif char in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        self._pos = i + 1
+                        return
+            self._pos = len(buf)
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Walk an object, yielding its keys. The caller must consume each value
+        (read_value / skip_value / nested iteration) before advancing.
+        """
+        self._expect("{")
+        first = True
+        while True:
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            if not first:
+                self._expect(",")
+            first = False
+            key = self.read_value()
+            self._expect(":")
+            yield key
+
+    def iter_array(self) -> Iterator[None]:
+        """
+        Walk an array, yielding once per element. The caller must consume each element.
+        """
+        self._expect("[")
+        first = True
+        while True:
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            if not first:
+                self._expect(",")
+            first = False
+            yield None
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def clean_whisperx_json(raw_path: str, output_path: str) -> Dict[str, Any]:
+    """
+    Stream a raw WhisperX JSON dump, dropping word-level data as it is parsed, and write
+    the compact cleaned transcript to output_path in the same pass (temp file + rename,
+    so raw_path and output_path may be the same file).
+    Memory use is proportional to the cleaned transcript, not the raw dump.
+    """
+    temp_path = f"{output_path}.{uuid.uuid4().hex[:8]}.tmp"
+    transcript: Dict[str, Any] = {}
+
+    try:
+        with open(raw_path, "r", encoding="utf-8") as src, open(temp_path, "w", encoding="utf-8") as out:
+            stream = JsonStream(src)
+            out.write("{")
+            first_key = True
+
+            for key in stream.iter_object():
+                if key in DROPPED_TOP_LEVEL_KEYS:
+                    stream.skip_value()
+                    continue
+
+                out.write(("" if first_key else ",") + _dump(key) + ":")
+                first_key = False
+
+                if key == "segments":
+                    segments = []
+                    out.write("[")
+                    for _ in stream.iter_array():
+                        segment = {}
+                        for segment_key in stream.iter_object():
+                            if segment_key in DROPPED_SEGMENT_KEYS:
+                                stream.skip_value()
+                            else:
+                                segment[segment_key] = stream.read_value()
+                        out.write(("," if segments else "") + _dump(segment))
+                        segments.append(segment)
+                    out.write("]")
+                    transcript["segments"] = segments
+                else:
+                    value = stream.read_value()
+                    out.write(_dump(value))
+                    transcript[key] = value
+
+            out.write("}")
+
+        os.replace(temp_path, output_path)
+        return transcript
+
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)